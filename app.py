@@ -1,6 +1,7 @@
 import logging
 import secrets
 import traceback
+import click
 from flask import Flask, render_template, jsonify, request
 from flask_migrate import Migrate
 from flask_wtf import CSRFProtect
@@ -14,6 +15,9 @@ from routes.insights_routes import insights_bp
 from routes.income_routes import income_bp
 from routes.shareIncome_routes import shareIncome_bp
 from routes.error_routes import error_bp
+from utils import (cache, conditional, diagnostics, jobs, llm, ocr,
+                   receipt_batch)
+from utils.rollups import rebuild_rollups
 
 from config import Config
 
@@ -25,6 +29,13 @@ def register_extensions(app):
     db.init_app(app)
     migrate.init_app(app, db)
     csrf.init_app(app)
+    diagnostics.init_app(app)
+    conditional.init_app(app)
+    cache.init_app(app)
+    ocr.init_app(app)
+    llm.init_app(app)
+    jobs.init_app(app)
+    receipt_batch.init_app(app)
 
 
 def register_blueprints(app):
@@ -66,6 +77,17 @@ def register_error_handlers(app):
         return render_template('not_found.html', error=str(e)), 404
 
 
+def register_commands(app):
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--user-id', type=int, default=None,
+                  help='Only rebuild rollups for this user.')
+    def rebuild_rollups_command(user_id):
+        """Recompute the daily insights rollups from raw expenses/incomes."""
+        written = rebuild_rollups(user_id)
+        click.echo(f"Rebuilt {written} rollup rows.")
+
+
 def create_app(testing=False):
     app = Flask(__name__)
     app.config.from_object(Config)
@@ -77,6 +99,8 @@ def create_app(testing=False):
         # Use in-memory SQLite database for testing
         app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
         app.config["WTF_CSRF_ENABLED"] = False
+        # Tests opt in to the receipt cache with their own directory
+        app.config["RECEIPT_CACHE"] = None
 
     register_extensions(app)
 
@@ -84,6 +108,7 @@ def create_app(testing=False):
         init_db()
         register_blueprints(app)
         register_error_handlers(app)
+        register_commands(app)
 
     return app
 
@@ -0,0 +1,96 @@
+"""
+Benchmark set-based bulk deletes (utils.bulk.delete_records).
+
+Usage:
+    python benchmarks/bulk_delete.py [--sizes 10 100 1000 10000]
+
+For each size, that many expenses are created in an in-memory SQLite
+database; half are covered by bulk shares of 10 and a tenth also have a
+single share, so the share rewrite has work to do. Reports the time and
+the number of SQL statements of deleting all of them in one transaction.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+from sqlalchemy import event, insert, select  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models.models import db, Expense, User  # noqa: E402
+from utils.bulk import delete_records  # noqa: E402
+from utils.rollups import rebuild_rollups  # noqa: E402
+from utils.shares import create_share  # noqa: E402
+
+START = datetime(2024, 1, 1)
+
+
+def populate(owner, friend, size):
+    db.session.execute(insert(Expense), [{
+        'user_id': owner.id,
+        'amount': 10.0 + i % 50,
+        'category': ['Food', 'Bills', 'Shopping'][i % 3],
+        'date': START + timedelta(hours=i * 7),
+    } for i in range(size)])
+    ids = db.session.scalars(
+        select(Expense.id).where(Expense.user_id == owner.id).order_by(
+            Expense.id)).all()
+    shared = ids[:size // 2]
+    for i in range(0, len(shared), 10):
+        create_share('expense', shared[i:i + 10], friend.id,
+                     is_bulk_share=True)
+    for expense_id in ids[::10]:
+        create_share('expense', [expense_id], friend.id)
+    db.session.commit()
+    rebuild_rollups(owner.id)
+    return ids
+
+
+def measure(owner, ids):
+    statements = []
+
+    def count(*args):
+        statements.append(args[2])
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        began = time.perf_counter()
+        delete_records(Expense, owner.id, ids)
+        db.session.commit()
+        elapsed = time.perf_counter() - began
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    return elapsed * 1000, len(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10, 100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_app(testing=True)
+    with app.app_context():
+        db.create_all()
+        owner = User(username='bench_owner', password='x', role='user')
+        friend = User(username='bench_friend', password='x', role='user')
+        db.session.add_all([owner, friend])
+        db.session.commit()
+
+        print(f"{'ids':>7} {'ms':>10} {'ms/id':>8} {'statements':>11}")
+        for size in args.sizes:
+            runs = []
+            for _ in range(args.repeat):
+                runs.append(measure(owner, populate(owner, friend, size)))
+            ms = statistics.median(run[0] for run in runs)
+            print(f'{size:7} {ms:10.1f} {ms / size:8.3f} {runs[0][1]:11}')
+
+
+if __name__ == '__main__':
+    main()
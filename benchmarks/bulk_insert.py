@@ -0,0 +1,70 @@
+"""
+Benchmark POST /api/expenses/bulk (utils.bulk.insert_records).
+
+Usage:
+    python benchmarks/bulk_insert.py [--sizes 1000 10000 100000]
+
+Each size is posted once through the test client against an in-memory
+SQLite database, including validation, the chunked INSERT ... RETURNING,
+the rollup and change-log updates, the commit and the JSON response.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+from app import create_app  # noqa: E402
+from models.models import db, User  # noqa: E402
+
+CATEGORIES = ['Food', 'Transportation', 'Entertainment', 'Shopping', 'Bills']
+START = datetime(2020, 1, 1)
+
+
+def rows(size, rng):
+    return [{
+        'date': (START + timedelta(minutes=rng.randrange(5 * 365 * 1440))
+                 ).strftime('%Y-%m-%dT%H:%M:%S'),
+        'amount': round(rng.uniform(1, 300), 2),
+        'category': rng.choice(CATEGORIES),
+        'description': f'Imported row {i}',
+    } for i in range(size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    app = create_app(testing=True)
+    rng = random.Random(0)
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        print(f"{'rows':>8} {'seconds':>9} {'rows/s':>10}")
+        for size in args.sizes:
+            user = User(username=f'bench_bulk_{size}', password='x',
+                        role='user')
+            db.session.add(user)
+            db.session.commit()
+            with client.session_transaction() as session:
+                session['user'] = {'id': user.id, 'username': user.username,
+                                   'role': 'user', 'permission': 'basic'}
+
+            body = json.dumps(rows(size, rng))
+            began = time.perf_counter()
+            response = client.post('/api/expenses/bulk', data=body,
+                                   content_type='application/json')
+            elapsed = time.perf_counter() - began
+            assert response.status_code == 200, response.data[:200]
+            print(f'{size:8} {elapsed:9.2f} {size / elapsed:10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark streaming exports against the full GET /api/expenses listing.
+
+Usage:
+    python benchmarks/export.py [--rows 10000 100000]
+
+For each size, that many expenses are created in an in-memory SQLite
+database, then each endpoint's response is read chunk by chunk through the
+test client. Reports the time and the peak memory allocated by Python
+(tracemalloc) while producing the response.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models.models import db, Expense, User  # noqa: E402
+
+URLS = [
+    ('listing (JSON)', '/api/expenses'),
+    ('export CSV', '/api/expenses/export?format=csv'),
+    ('export NDJSON', '/api/expenses/export?format=ndjson'),
+]
+START = datetime(2020, 1, 1)
+
+
+def consume(client, url):
+    tracemalloc.start()
+    began = time.perf_counter()
+    response = client.get(url, buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    elapsed = time.perf_counter() - began
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    response.close()
+    assert response.status_code == 200
+    return elapsed, peak / 2 ** 20, size / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    app = create_app(testing=True)
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        print(f"{'rows':>8} {'endpoint':16} {'seconds':>8} {'peak MB':>8} "
+              f"{'body MB':>8}")
+        for count in args.rows:
+            user = User(username=f'bench_export_{count}', password='x',
+                        role='user')
+            db.session.add(user)
+            db.session.commit()
+            db.session.execute(insert(Expense), [{
+                'user_id': user.id,
+                'amount': 10.0 + i % 90,
+                'category': 'Food',
+                'description': f'Benchmark expense {i}',
+                'date': START + timedelta(minutes=37 * i),
+            } for i in range(count)])
+            db.session.commit()
+            with client.session_transaction() as session:
+                session['user'] = {'id': user.id, 'username': user.username,
+                                   'role': 'user', 'permission': 'basic'}
+
+            for name, url in URLS:
+                seconds, peak, body = consume(client, url)
+                print(f'{count:8} {name:16} {seconds:8.2f} {peak:8.1f} '
+                      f'{body:8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""
+Benchmark create_app() start-up time, import cost and memory.
+
+Usage:
+    python benchmarks/startup.py [--repeat 5]        # print a report
+    python benchmarks/startup.py --save-baseline     # store the results
+    python benchmarks/startup.py --check             # fail on regressions
+
+Every run is a fresh interpreter, so nothing is cached between runs. Wall
+time is split into importing app.py (blueprints, utils, third-party
+packages), register_extensions, init_db and register_blueprints. Peak RSS
+comes from getrusage. One extra run per scenario uses -X importtime for the
+per-module breakdown.
+
+"libraries loaded" additionally imports easyocr and openai after
+create_app(), which is what the first receipt costs a worker now that they
+are loaded lazily.
+
+Baselines are stored in benchmarks/baselines/startup.json and depend on the
+machine; save them again after an intended change or on new hardware.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baselines', 'startup.json')
+
+CHILD = """
+import json, resource, sys, time
+timings = {{}}
+start = time.perf_counter()
+import app as app_module
+timings['import_app'] = time.perf_counter() - start
+
+
+def timed(name, fn):
+    def wrapper(*args, **kwargs):
+        began = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings[name] = time.perf_counter() - began
+    return wrapper
+
+
+for name in ('register_extensions', 'init_db', 'register_blueprints'):
+    setattr(app_module, name, timed(name, getattr(app_module, name)))
+app_module.create_app()
+if {load_libraries}:
+    began = time.perf_counter()
+    import easyocr, openai
+    timings['libraries'] = time.perf_counter() - began
+timings['total'] = time.perf_counter() - start
+print(json.dumps({{
+    'timings': timings,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'torch': 'torch' in sys.modules,
+}}))
+"""
+
+SCENARIOS = [
+    ('receipt reading off', {'OCR_ENABLED': 'false'}, False),
+    ('receipt reading on', {'OCR_ENABLED': 'true'}, False),
+    ('on, libraries loaded', {'OCR_ENABLED': 'true'}, True),
+]
+PHASES = ['import_app', 'register_extensions', 'init_db',
+          'register_blueprints', 'libraries', 'total']
+
+# Project modules whose import time is tracked against the baseline
+PROJECT_MODULES = re.compile(r'^(app|config|routes|utils|models|forms)(\.|$)')
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+# A result regresses when it exceeds the baseline by the relative tolerance
+# and by these absolute margins, so timer noise does not fail the check
+MIN_SECONDS = 0.05
+MIN_RSS_MB = 5
+MIN_IMPORT_MS = 20
+
+
+def child_env(env_overrides, database):
+    return {**os.environ, 'SECRET_KEY': 'benchmark',
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+            'OCR_WARM_UP_LANGUAGES': '', **env_overrides}
+
+
+def run(env_overrides, load_libraries, database, importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', CHILD.format(load_libraries=load_libraries)]
+    process = subprocess.run(command, cwd=ROOT,
+                             env=child_env(env_overrides, database),
+                             capture_output=True, text=True, check=True)
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    if importtime:
+        result['imports'] = parse_importtime(process.stderr)
+    return result
+
+
+def parse_importtime(stderr):
+    """
+    Cumulative import time in ms of project modules and of the packages
+    imported directly at the top level or by a project module.
+    """
+    imports = {}
+    # importtime prints children before their parent, so parents are
+    # resolved from the indentation of the lines that follow
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            entries.append((len(match[3]) // 2, match[4],
+                            int(match[2]) / 1000))
+    parents = {}
+    stack = []
+    for depth, name, cumulative in reversed(entries):
+        del stack[depth:]
+        parents[name] = stack[-1] if stack else None
+        stack.append(name)
+    for depth, name, cumulative in entries:
+        parent = parents.get(name)
+        if (PROJECT_MODULES.match(name) or parent is None
+                or PROJECT_MODULES.match(parent)):
+            imports[name] = round(max(cumulative, imports.get(name, 0)), 1)
+    return imports
+
+
+def prepare_database(database):
+    # A migrated database with an admin, so init_db does its usual lookups
+    code = ('from app import create_app\n'
+            'from models.models import db, init_db\n'
+            'app = create_app()\n'
+            'with app.app_context():\n'
+            '    db.create_all()\n'
+            '    init_db()\n')
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                   env=child_env({}, database), capture_output=True,
+                   check=True)
+
+
+def measure(repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'startup.db')
+        prepare_database(database)
+        for name, env, load_libraries in SCENARIOS:
+            runs = [run(env, load_libraries, database) for _ in range(repeat)]
+            breakdown = run(env, load_libraries, database, importtime=True)
+            results[name] = {
+                'timings': {
+                    phase: round(statistics.median(
+                        r['timings'][phase] for r in runs), 4)
+                    for phase in PHASES if phase in runs[0]['timings']
+                },
+                'peak_rss_mb': round(statistics.median(
+                    r['peak_rss_mb'] for r in runs), 1),
+                'torch': runs[0]['torch'],
+                'imports': breakdown['imports'],
+            }
+    return results
+
+
+def report(results, top):
+    print(f"{'scenario':24} " + ' '.join(f'{p[:12]:>12}' for p in PHASES)
+          + f" {'RSS MB':>8} {'torch':>6}")
+    for name, result in results.items():
+        timings = result['timings']
+        print(f'{name:24} '
+              + ' '.join(f"{timings[p]:12.3f}" if p in timings else f"{'-':>12}"
+                         for p in PHASES)
+              + f" {result['peak_rss_mb']:8.1f}"
+              + f" {'yes' if result['torch'] else 'no':>6}")
+
+    for name, result in results.items():
+        print(f'\nSlowest imports ({name}), cumulative ms:')
+        slowest = sorted(result['imports'].items(), key=lambda item: -item[1])
+        for module, ms in slowest[:top]:
+            print(f'  {ms:9.1f}  {module}')
+
+
+def regressions(results, baseline, tolerance):
+    problems = []
+
+    def check(label, value, base, margin, unit):
+        if value > base * (1 + tolerance) and value - base > margin:
+            problems.append(f'{label}: {value:.3f}{unit} '
+                            f'(baseline {base:.3f}{unit})')
+
+    for name, base in baseline['results'].items():
+        result = results.get(name)
+        if result is None:
+            continue
+        for phase, seconds in base['timings'].items():
+            if phase in result['timings']:
+                check(f'{name} {phase}', result['timings'][phase], seconds,
+                      MIN_SECONDS, 's')
+        check(f'{name} peak RSS', result['peak_rss_mb'], base['peak_rss_mb'],
+              MIN_RSS_MB, 'MB')
+        if result['torch'] and not base['torch']:
+            problems.append(f'{name}: torch is now imported at start-up')
+        for module, ms in base['imports'].items():
+            if PROJECT_MODULES.match(module) and module in result['imports']:
+                check(f'{name} import {module}', result['imports'][module],
+                      ms, MIN_IMPORT_MS, 'ms')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10,
+                        help='slowest imports to list per scenario')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true',
+                        help='exit 1 if results regress against the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative slowdown (default 25%%)')
+    args = parser.parse_args()
+
+    results = measure(args.repeat)
+    report(results, args.top)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+        with open(BASELINE, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat,
+                       'results': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nBaseline saved to {os.path.relpath(BASELINE, ROOT)}')
+
+    if args.check:
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+        problems = regressions(results, baseline, args.tolerance)
+        if problems:
+            print('\nRegressions against the baseline:')
+            for problem in problems:
+                print(f'  {problem}')
+            sys.exit(1)
+        print('\nNo regressions against the baseline.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark statement imports against posting the same rows as JSON.
+
+Usage:
+    python benchmarks/statement_import.py [--rows 10000 100000]
+
+For each size, a CSV statement with that many rows is generated and
+uploaded to POST /api/expenses/import for a fresh user, then uploaded again
+(every row is now a duplicate). The same rows are also posted as one JSON
+list to POST /api/expenses/bulk for another user. Reports the time and the
+peak memory allocated by Python (tracemalloc) while the request is handled;
+the upload body itself is built before measuring. Times include the
+tracemalloc overhead, so compare them with each other rather than with
+benchmarks/bulk_insert.py.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+from app import create_app  # noqa: E402
+from models.models import db, User  # noqa: E402
+
+START = datetime(2024, 1, 1)
+
+
+def make_rows(count):
+    return [((START + timedelta(minutes=5 * i)).strftime('%Y-%m-%dT%H:%M:%S'),
+             f'{10.0 + i % 90:.2f}', f'Benchmark expense {i}')
+            for i in range(count)]
+
+
+def make_csv(rows):
+    lines = ['Date,Description,Amount']
+    lines += [f'{date},{description},{amount}'
+              for date, amount, description in rows]
+    return '\n'.join(lines).encode()
+
+
+def login(client, name):
+    user = User(username=name, password='x', role='user')
+    db.session.add(user)
+    db.session.commit()
+    with client.session_transaction() as session:
+        session['user'] = {'id': user.id, 'username': user.username,
+                           'role': 'user', 'permission': 'basic'}
+
+
+def measure(send):
+    tracemalloc.start()
+    began = time.perf_counter()
+    response = send()
+    body = response.get_data(as_text=True)
+    elapsed = time.perf_counter() - began
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert response.status_code == 200, body[:200]
+    return elapsed, peak / 2 ** 20, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    app = create_app(testing=True)
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        print(f"{'rows':>8} {'request':18} {'seconds':>8} {'rows/s':>8} "
+              f"{'peak MB':>8} {'inserted':>9}")
+        for count in args.rows:
+            rows = make_rows(count)
+            statement = make_csv(rows)
+            payload = json.dumps([
+                {'date': date, 'amount': amount, 'category': 'Other',
+                 'description': description}
+                for date, amount, description in rows])
+
+            def upload():
+                return client.post(
+                    '/api/expenses/import', content_type='multipart/form-data',
+                    data={'file': (io.BytesIO(statement), 'statement.csv')})
+
+            login(client, f'bench_import_{count}')
+            results = [('import CSV',) + measure(upload),
+                       ('re-import CSV',) + measure(upload)]
+            login(client, f'bench_bulk_{count}')
+            results.append(('bulk JSON',) + measure(lambda: client.post(
+                '/api/expenses/bulk', data=payload,
+                content_type='application/json')))
+
+            for name, seconds, peak, body in results:
+                if name == 'bulk JSON':
+                    inserted = len(json.loads(body)['expenses'])
+                else:
+                    inserted = json.loads(body.splitlines()[-1])['inserted']
+                print(f'{count:8} {name:18} {seconds:8.2f} '
+                      f'{count / seconds:8.0f} {peak:8.1f} {inserted:9}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark time bucketing in SQL (utils.buckets.bucket_start) against
+fetching the rows and bucketing them in Python.
+
+Usage:
+    python benchmarks/time_buckets.py [--rows 1000 10000 100000]
+
+Runs against an in-memory SQLite database, or the database in
+SQLALCHEMY_DATABASE_URI with --database (its expense table gets rows for a
+throwaway user, which are removed afterwards).
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+from sqlalchemy import func, insert  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models.models import db, Expense, User  # noqa: E402
+from utils.buckets import bucket_of, bucket_start  # noqa: E402
+
+UNITS = ['day', 'week', 'month', 'quarter']
+START = datetime(2022, 1, 1)
+END = datetime(2025, 1, 1)
+
+
+def in_sql(user_id, unit):
+    key = bucket_start(Expense.date, unit)
+    return dict(db.session.query(key, func.sum(Expense.amount)).filter(
+        Expense.user_id == user_id,
+        Expense.date >= START,
+        Expense.date < END
+    ).group_by(key).all())
+
+
+def in_python(user_id, unit):
+    totals = {}
+    rows = db.session.query(Expense.date, Expense.amount).filter(
+        Expense.user_id == user_id,
+        Expense.date >= START,
+        Expense.date < END
+    )
+    for moment, amount in rows:
+        start = bucket_of(moment, unit)
+        totals[start] = totals.get(start, 0.0) + amount
+    return totals
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - began)
+    return statistics.median(samples) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database', action='store_true',
+                        help='use SQLALCHEMY_DATABASE_URI instead of memory')
+    args = parser.parse_args()
+
+    app = create_app(testing=not args.database)
+    rng = random.Random(0)
+    span = (END - START).total_seconds()
+    with app.app_context():
+        db.create_all()
+        print(f"{'rows':>8} {'unit':8} {'SQL ms':>9} {'Python ms':>10} "
+              f"{'speed-up':>9}")
+        for count in args.rows:
+            user = User(username=f'bucket_bench_{count}', password='x',
+                        role='user')
+            db.session.add(user)
+            db.session.flush()
+            db.session.execute(insert(Expense), [{
+                'user_id': user.id,
+                'amount': round(rng.uniform(1, 200), 2),
+                'category': 'Food',
+                'date': START + timedelta(seconds=rng.uniform(0, span)),
+            } for _ in range(count)])
+
+            for unit in UNITS:
+                sql_ms, sql_totals = timed(lambda: in_sql(user.id, unit),
+                                           args.repeat)
+                python_ms, python_totals = timed(
+                    lambda: in_python(user.id, unit), args.repeat)
+                assert sql_totals.keys() == python_totals.keys()
+                print(f'{count:8} {unit:8} {sql_ms:9.2f} {python_ms:10.2f} '
+                      f'{python_ms / sql_ms:8.1f}x')
+            db.session.rollback()
+
+
+if __name__ == '__main__':
+    main()
@@ -14,4 +14,84 @@ class Config:
         "False").lower() in ("true", "1", "t")
     WTF_CSRF_ENABLED = os.getenv("WTF_CSRF_ENABLED",
                                  "True").lower() in ("true", "1", "t")
+    # Fraction of requests (0-1) to diagnose without an explicit opt-in
+    DIAGNOSTICS_SAMPLE_RATE = float(os.getenv("DIAGNOSTICS_SAMPLE_RATE", "0"))
+    # Insights result cache: 'memory' (LRU + TTL) or 'none'
+    INSIGHTS_CACHE_BACKEND = os.getenv("INSIGHTS_CACHE_BACKEND", "memory")
+    INSIGHTS_CACHE_MAX_ENTRIES = int(
+        os.getenv("INSIGHTS_CACHE_MAX_ENTRIES", "1024"))
+    INSIGHTS_CACHE_TTL = int(os.getenv("INSIGHTS_CACHE_TTL", "300"))
+    # First day of weekly insights buckets: 0 is Monday ... 6 is Sunday
+    INSIGHTS_WEEK_START = int(os.getenv("INSIGHTS_WEEK_START", "0"))
+    # Rows per INSERT batch of the bulk expense/income endpoints
+    BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "1000"))
+    # Receipt reading (OCR and LLM extraction); off, the receipt endpoints
+    # answer 503. The libraries are only imported when a receipt is read.
+    OCR_ENABLED = os.getenv("OCR_ENABLED", "True").lower() in ("true", "1", "t")
+    # EasyOCR readers kept loaded per process, and the language sets to load
+    # at startup (comma separated, e.g. "en"): in each pool worker, which
+    # starts the process pool with the app, or in the background of the web
+    # process with the thread pool
+    OCR_MAX_READERS = int(os.getenv("OCR_MAX_READERS", "2"))
+    OCR_WARM_UP_LANGUAGES = [
+        lang.strip()
+        for lang in os.getenv("OCR_WARM_UP_LANGUAGES", "").split(",")
+        if lang.strip()
+    ]
+    # Receipt OCR job pool ('process' or 'thread') and its queue limits
+    OCR_JOB_EXECUTOR = os.getenv("OCR_JOB_EXECUTOR", "process")
+    OCR_JOB_WORKERS = int(os.getenv("OCR_JOB_WORKERS", "2"))
+    OCR_JOB_MAX_PENDING = int(os.getenv("OCR_JOB_MAX_PENDING", "8"))
+    OCR_JOB_MAX_PENDING_PER_USER = int(
+        os.getenv("OCR_JOB_MAX_PENDING_PER_USER", "2"))
+    OCR_JOB_RESULT_TTL = int(os.getenv("OCR_JOB_RESULT_TTL", "600"))
+    # Receipt image preprocessing before OCR (see utils.ocr.PREPROCESS_DEFAULTS)
+    OCR_PREPROCESS = {
+        'exif_rotate': os.getenv("OCR_EXIF_ROTATE",
+                                 "True").lower() in ("true", "1", "t"),
+        'target_long_side': int(os.getenv("OCR_TARGET_LONG_SIDE", "1600")),
+        'grayscale': os.getenv("OCR_GRAYSCALE",
+                               "True").lower() in ("true", "1", "t"),
+        'autocontrast': os.getenv("OCR_AUTOCONTRAST",
+                                  "True").lower() in ("true", "1", "t"),
+        'crop': os.getenv("OCR_CROP", "False").lower() in ("true", "1", "t"),
+    }
+    # Receipt extraction backend: 'openai', or 'local' for a canned JSON
+    # answer after LLM_LOCAL_LATENCY seconds (offline load tests)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+    LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4.1-nano")
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "10"))
+    LLM_LOCAL_LATENCY = float(os.getenv("LLM_LOCAL_LATENCY", "0"))
+    LLM_LOCAL_RESPONSE = os.getenv("LLM_LOCAL_RESPONSE")
+    # Limits on receipt extraction calls: seconds per attempt and in total,
+    # retries, concurrent calls across the OCR job pool; after
+    # LLM_BREAKER_THRESHOLD failures in a row the LLM is skipped for
+    # LLM_BREAKER_RESET seconds and receipts return the raw OCR text (or 503
+    # if LLM_FALLBACK is off)
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "15"))
+    LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "30"))
+    LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+    LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "4"))
+    LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+    LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+    LLM_FALLBACK = os.getenv("LLM_FALLBACK",
+                             "True").lower() in ("true", "1", "t")
+    # Multi-receipt uploads: files per request (also capped by the pending
+    # job limits, as each file is a job), receipts per LLM call
+    OCR_BATCH_MAX_FILES = int(os.getenv("OCR_BATCH_MAX_FILES", "20"))
+    LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "5"))
+    # Receipts the local parser reads with at least this confidence (0-1)
+    # skip the LLM; above 1 always uses the LLM
+    RECEIPT_PARSER_MIN_CONFIDENCE = float(
+        os.getenv("RECEIPT_PARSER_MIN_CONFIDENCE", "0.8"))
+    # On-disk cache of OCR text and LLM extractions, keyed by content hash;
+    # an empty directory or a size of 0 disables it
+    RECEIPT_CACHE = {
+        'directory': os.getenv(
+            "RECEIPT_CACHE_DIR",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "instance", "receipt_cache")),
+        'max_bytes': int(os.getenv("RECEIPT_CACHE_MAX_BYTES",
+                                   str(64 * 1024 * 1024))),
+    }
     DEBUG = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
@@ -0,0 +1,121 @@
+"""Add share item tables
+
+Revision ID: 07f14736db68
+Revises: 5c767a4ca1fd
+Create Date: 2026-10-18 09:12:04.518327
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '07f14736db68'
+down_revision = '5c767a4ca1fd'
+branch_labels = None
+depends_on = None
+
+
+def _parse_ids(csv_ids):
+    ids = []
+    for part in (csv_ids or '').split(','):
+        part = part.strip()
+        if part.isdigit() and int(part) not in ids:
+            ids.append(int(part))
+    return ids
+
+
+def _backfill_items(share_table, item_table, fk, csv_column):
+    # Every share gets one item per covered record; bulk shares take theirs
+    # from the old comma-separated column, single shares from the anchor.
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text(f'SELECT id, {fk}, shared_with_id, is_bulk_share, {csv_column} '
+                f'FROM {share_table}')).fetchall()
+    items = []
+    for share_id, anchor_id, shared_with_id, is_bulk, csv_ids in rows:
+        ids = _parse_ids(csv_ids) if is_bulk else []
+        if not ids:
+            ids = [anchor_id]
+        items.extend({
+            'share_id': share_id,
+            fk: item_id,
+            'shared_with_id': shared_with_id
+        } for item_id in ids)
+    if items:
+        conn.execute(
+            sa.text(f'INSERT INTO {item_table} (share_id, {fk}, shared_with_id) '
+                    f'VALUES (:share_id, :{fk}, :shared_with_id)'), items)
+
+
+def _rebuild_csv(share_table, item_table, fk, csv_column):
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text(f'SELECT share_id, {fk} FROM {item_table} '
+                f'ORDER BY share_id, {fk}')).fetchall()
+    grouped = {}
+    for share_id, item_id in rows:
+        grouped.setdefault(share_id, []).append(str(item_id))
+    for share_id, ids in grouped.items():
+        if len(ids) > 1:
+            conn.execute(
+                sa.text(f'UPDATE {share_table} SET {csv_column} = :ids '
+                        f'WHERE id = :id'), {'ids': ','.join(ids), 'id': share_id})
+
+
+def upgrade():
+    op.create_table('shared_expense_item',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('share_id', sa.Integer(), nullable=False),
+    sa.Column('expense_id', sa.Integer(), nullable=False),
+    sa.Column('shared_with_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['expense_id'], ['expense.id'], ),
+    sa.ForeignKeyConstraint(['share_id'], ['shared_expense.id'], ),
+    sa.ForeignKeyConstraint(['shared_with_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('share_id', 'expense_id', name='uq_shared_expense_item')
+    )
+    op.create_index('ix_shared_expense_item_expense_user', 'shared_expense_item',
+                    ['expense_id', 'shared_with_id'], unique=False)
+    op.create_table('shared_income_item',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('share_id', sa.Integer(), nullable=False),
+    sa.Column('income_id', sa.Integer(), nullable=False),
+    sa.Column('shared_with_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['income_id'], ['income.id'], ),
+    sa.ForeignKeyConstraint(['share_id'], ['shared_income.id'], ),
+    sa.ForeignKeyConstraint(['shared_with_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('share_id', 'income_id', name='uq_shared_income_item')
+    )
+    op.create_index('ix_shared_income_item_income_user', 'shared_income_item',
+                    ['income_id', 'shared_with_id'], unique=False)
+
+    _backfill_items('shared_expense', 'shared_expense_item', 'expense_id',
+                    'bulk_expense_ids')
+    _backfill_items('shared_income', 'shared_income_item', 'income_id',
+                    'bulk_income_ids')
+
+    with op.batch_alter_table('shared_expense', schema=None) as batch_op:
+        batch_op.drop_column('bulk_expense_ids')
+
+    with op.batch_alter_table('shared_income', schema=None) as batch_op:
+        batch_op.drop_column('bulk_income_ids')
+
+
+def downgrade():
+    with op.batch_alter_table('shared_income', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('bulk_income_ids', sa.VARCHAR(length=500), nullable=True))
+
+    with op.batch_alter_table('shared_expense', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('bulk_expense_ids', sa.VARCHAR(length=500), nullable=True))
+
+    _rebuild_csv('shared_expense', 'shared_expense_item', 'expense_id',
+                 'bulk_expense_ids')
+    _rebuild_csv('shared_income', 'shared_income_item', 'income_id',
+                 'bulk_income_ids')
+
+    op.drop_index('ix_shared_income_item_income_user', table_name='shared_income_item')
+    op.drop_table('shared_income_item')
+    op.drop_index('ix_shared_expense_item_expense_user', table_name='shared_expense_item')
+    op.drop_table('shared_expense_item')
@@ -12,6 +12,9 @@ class User(db.Model):
     password = db.Column(db.String(120), nullable=False)
     role = db.Column(db.String(20), nullable=False)
     permission = db.Column(db.String(20), default='basic')
+    # Bumped on every write to the user's records; see utils.changes
+    data_version = db.Column(db.Integer, nullable=False, default=0,
+                             server_default='0')
     expenses = db.relationship('Expense', backref='user', lazy=True)
     incomes = db.relationship('Income', backref='user', lazy=True)
 
@@ -26,6 +29,14 @@ class Expense(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     type = db.Column(db.String(10), nullable=False, default='expense')
 
+    __table_args__ = (
+        db.Index('ix_expense_user_date', 'user_id', 'date'),
+        db.Index('ix_expense_user_type_date_category', 'user_id', 'type',
+                 'date', 'category', 'amount'),
+        db.Index('ix_expense_user_category_date', 'user_id', 'category',
+                 'date'),
+    )
+
 
 class Income(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -38,6 +49,14 @@ class Income(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     type = db.Column(db.String(10), nullable=False, default='income')
 
+    __table_args__ = (
+        db.Index('ix_income_user_date', 'user_id', 'date'),
+        db.Index('ix_income_user_date_category', 'user_id', 'date',
+                 'category', 'amount'),
+        db.Index('ix_income_user_category_date', 'user_id', 'category',
+                 'date'),
+    )
+
 
 class SharedExpense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -45,12 +64,36 @@ class SharedExpense(db.Model):
     shared_with_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date_shared = db.Column(db.DateTime, default=datetime.utcnow)
     is_bulk_share = db.Column(db.Boolean, default=False)
-    bulk_expense_ids = db.Column(db.String(500))  # Store comma-separated expense IDs for bulk shares
     is_repeat = db.Column(db.Boolean, default=False)  # Flag to indicate if this is a repeat share
 
     # Define relationships with backrefs
     expense = db.relationship('Expense', backref='shares')
     shared_with = db.relationship('User', backref='shared_expenses')
+    items = db.relationship('SharedExpenseItem', backref='share',
+                            cascade='all, delete-orphan', lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_shared_expense_shared_with_bulk', 'shared_with_id',
+                 'is_bulk_share'),
+        db.Index('ix_shared_expense_expense_id', 'expense_id'),
+    )
+
+    @property
+    def item_ids(self):
+        return sorted(item.expense_id for item in self.items)
+
+
+class SharedExpenseItem(db.Model):
+    # One row per expense covered by a share (single shares have exactly one)
+    id = db.Column(db.Integer, primary_key=True)
+    share_id = db.Column(db.Integer, db.ForeignKey('shared_expense.id'), nullable=False)
+    expense_id = db.Column(db.Integer, db.ForeignKey('expense.id'), nullable=False)
+    shared_with_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_shared_expense_item_expense_user', 'expense_id', 'shared_with_id'),
+        db.UniqueConstraint('share_id', 'expense_id', name='uq_shared_expense_item'),
+    )
 
 class SharedIncome(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -58,12 +101,76 @@ class SharedIncome(db.Model):
     shared_with_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date_shared = db.Column(db.DateTime, default=datetime.utcnow)
     is_bulk_share = db.Column(db.Boolean, default=False)
-    bulk_income_ids = db.Column(db.String(500))  # Store comma-separated expense IDs for bulk shares
     is_repeat = db.Column(db.Boolean, default=False)  # Flag to indicate if this is a repeat share
 
     # Define relationships with backrefs
     income = db.relationship('Income', backref='shares')
     shared_with = db.relationship('User', backref='shared_income')
+    items = db.relationship('SharedIncomeItem', backref='share',
+                            cascade='all, delete-orphan', lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_shared_income_shared_with_bulk', 'shared_with_id',
+                 'is_bulk_share'),
+        db.Index('ix_shared_income_income_id', 'income_id'),
+    )
+
+    @property
+    def item_ids(self):
+        return sorted(item.income_id for item in self.items)
+
+
+class SharedIncomeItem(db.Model):
+    # One row per income covered by a share (single shares have exactly one)
+    id = db.Column(db.Integer, primary_key=True)
+    share_id = db.Column(db.Integer, db.ForeignKey('shared_income.id'), nullable=False)
+    income_id = db.Column(db.Integer, db.ForeignKey('income.id'), nullable=False)
+    shared_with_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_shared_income_item_income_user', 'income_id', 'shared_with_id'),
+        db.UniqueConstraint('share_id', 'income_id', name='uq_shared_income_item'),
+    )
+
+
+class ShareVisibility(db.Model):
+    # Records a recipient can see through any share; share_count tracks how
+    # many share groups grant access. Kept in sync by utils.shares
+    recipient_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)  # 'expense' or 'income'
+    item_id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    share_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_share_visibility_recipient_owner', 'recipient_id', 'kind',
+                 'owner_id', 'item_id'),
+    )
+
+
+class RecordChange(db.Model):
+    # Delta-sync change log: the version at which each of a user's records
+    # last changed, kept as a tombstone once deleted. Kept by utils.changes
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)  # 'expense' or 'income'
+    item_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        db.Index('ix_record_change_user_kind_version', 'user_id', 'kind',
+                 'version'),
+    )
+
+
+class DailyRollup(db.Model):
+    # Per-day category totals for insights, kept in sync by utils.rollups
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)  # 'expense' or 'income'
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    count = db.Column(db.Integer, nullable=False, default=0)
 
 
 def init_db():
@@ -72,6 +179,10 @@ def init_db():
     if not inspector.has_table("user"):
         print("User table does not exist yet. Skipping admin creation.")
         return
+    columns = {column['name'] for column in inspector.get_columns("user")}
+    if not set(User.__table__.columns.keys()) <= columns:
+        print("User table is not migrated yet. Skipping admin creation.")
+        return
     
     # Create default admin user if not exists
     admin = User.query.filter_by(username='admin').first()
@@ -1,28 +1,92 @@
-from flask import Blueprint, session, jsonify, request
+from flask import (Blueprint, Response, session, jsonify, request, current_app,
+                   stream_with_context, url_for)
+import json
+import math
 from datetime import datetime
-from models.models import db, Expense, User, SharedExpense
-from utils.llm import process_receipt
-from utils.ocr import ocr_image
+from models.models import db, Expense, User
+from utils.jobs import (QueueFull, get_queue, receipt_job_callback,
+                        run_receipt_job)
+from utils import conditional, export, importer, llm, receipt_cache
+from utils.receipt_batch import ReceiptBatch, batch_job_callback, get_batches
+from utils.receipt_parser import stats as receipt_stats
 from utils.decorators import csrf_required
+from utils.rollups import records_added
+from utils.changes import records_changed, changes_since
+from utils.listing import parse_list_args, filtered_query, fetch_page
+from utils.shares import create_share, individually_shared_ids
+from utils.bulk import delete_records, insert_records, validate_records
 
 expense_bp = Blueprint('expense', __name__)
 
 
+def serialize_expense(e):
+    return {
+        'id': e.id,
+        'amount': e.amount,
+        'category': e.category,
+        'description': e.description,
+        'date': e.date.astimezone().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
 @expense_bp.route('/api/expenses', methods=['GET'])
 def get_expenses():
     if 'user' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
 
+    try:
+        filters = parse_list_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     user_id = session['user']['id']
-    expenses = Expense.query.filter_by(user_id=user_id).order_by(
-        Expense.date.desc()).all()
-    return jsonify([{
-        'id': e.id,
-        'amount': e.amount,
-        'category': e.category,
-        'description': e.description,
-        'date': e.date.astimezone().strftime('%Y-%m-%d %H:%M:%S')
-    } for e in expenses])
+    query = filtered_query(Expense, user_id, filters)
+
+    # Without limit/cursor the full list is returned, as before
+    if not filters['paginated']:
+        return jsonify([serialize_expense(e) for e in query.all()])
+
+    expenses, next_cursor = fetch_page(Expense, query, filters)
+    return jsonify({
+        'expenses': [serialize_expense(e) for e in expenses],
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    })
+
+
+@expense_bp.route('/api/expenses/changes', methods=['GET'])
+def get_expense_changes():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'error': 'Invalid since version'}), 400
+
+    version, changed, deleted_ids = changes_since('expense',
+                                                  session['user']['id'], since)
+    return jsonify({
+        'version': version,
+        'changed': [serialize_expense(e) for e in changed],
+        'deleted': deleted_ids
+    })
+
+
+@expense_bp.route('/api/expenses/export', methods=['GET'])
+def export_expenses():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    try:
+        filters = parse_list_args(request.args)
+        fmt = export.parse_format(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Streamed in batches, so any number of rows fits in constant memory
+    statement = export.own_records(Expense, session['user']['id'], filters)
+    return export.export_response(statement, export.COLUMNS, fmt, 'expenses')
 
 
 @expense_bp.route('/api/expenses', methods=['POST'])
@@ -47,6 +111,8 @@ def add_expense():
                           user_id=session['user']['id'])
 
     db.session.add(new_expense)
+    records_added([new_expense])
+    records_changed([new_expense])
     db.session.commit()
 
     return jsonify({
@@ -67,33 +133,58 @@ def add_expenses_bulk():
         return jsonify({'error': 'Not authenticated'}), 401
 
     data_list = request.get_json()
-    new_expenses = []
-
-    for data in data_list:
-        new_expense = Expense(amount=float(data['amount']),
-                              category=data['category'],
-                              description=data.get('description', ''),
-                              user_id=session['user']['id'],
-                              date=datetime.strptime(data['date'],
-                                                     '%Y-%m-%dT%H:%M:%S'))
-        db.session.add(new_expense)
-        new_expenses.append(new_expense)
-
+    if not isinstance(data_list, list):
+        return jsonify({'error': 'Expected a list of expenses'}), 400
+
+    # Every row is checked first; invalid rows are reported, not inserted
+    records, errors = validate_records(Expense, session['user']['id'],
+                                       data_list)
+    if not records:
+        return jsonify({'error': 'No valid expenses to add',
+                        'errors': errors}), 400
+
+    ids = insert_records(
+        Expense, records,
+        chunk_size=current_app.config.get('BULK_INSERT_CHUNK_SIZE', 1000))
     db.session.commit()
 
     return jsonify({
         'message':
         'Expenses added successfully',
         'expenses': [{
-            'id': e.id,
-            'amount': e.amount,
-            'category': e.category,
-            'description': e.description,
-            'date': e.date.astimezone().strftime('%Y-%m-%d %H:%M:%S')
-        } for e in new_expenses]
+            'id': record_id,
+            'amount': r.amount,
+            'category': r.category,
+            'description': r.description,
+            'date': r.date.strftime('%Y-%m-%d %H:%M:%S')
+        } for record_id, r in zip(ids, records)],
+        'errors': errors
     })
 
 
+@expense_bp.route('/api/expenses/import', methods=['POST'])
+def import_expenses():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    try:
+        progress = importer.start_import(
+            Expense, session['user']['id'], upload, request.form,
+            chunk_size=current_app.config.get('BULK_INSERT_CHUNK_SIZE', 1000))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # One JSON line per committed chunk, so a large statement shows progress
+    # and an interrupted import keeps the chunks already saved
+    return Response(stream_with_context(
+        json.dumps(line) + '\n' for line in progress),
+        mimetype='application/x-ndjson')
+
+
 @expense_bp.route('/api/expenses/delete', methods=['POST'])
 def delete_expense():
     if 'user' not in session:
@@ -102,41 +193,10 @@ def delete_expense():
     data = request.get_json()
     expense_id = data.get('id')
 
-    # Find the expense belonging to the current user
-    expense = Expense.query.filter_by(id=expense_id,
-                                      user_id=session['user']['id']).first()
-    if not expense:
-        return jsonify({'error': 'Expense not found'}), 404
-
     try:
-        # Delete all related SharedExpense records before deleting the expense itself
-        SharedExpense.query.filter_by(expense_id=expense_id).delete()
-        # --- Bulk share cleanup logic ---
-        bulk_shares = SharedExpense.query.filter(
-            SharedExpense.is_bulk_share == True,
-            SharedExpense.bulk_expense_ids.like(f'%{expense_id}%')).all()
-        for share in bulk_shares:
-            ids = [
-                int(i) for i in share.bulk_expense_ids.split(',')
-                if i and int(i) != int(expense_id)
-            ]
-            if len(ids) == 0:
-                db.session.delete(share)
-            elif len(ids) == 1:
-                existing = SharedExpense.query.filter_by(
-                    expense_id=ids[0],
-                    shared_with_id=share.shared_with_id,
-                    is_bulk_share=False).first()
-                if existing:
-                    db.session.delete(share)
-                else:
-                    share.is_bulk_share = False
-                    share.expense_id = ids[0]
-                    share.bulk_expense_ids = None
-            else:
-                share.bulk_expense_ids = ','.join(map(str, ids))
-        # --- End bulk share cleanup ---
-        db.session.delete(expense)
+        # Also drops the expense from every share that references it
+        if not delete_records(Expense, session['user']['id'], [expense_id]):
+            return jsonify({'error': 'Expense not found'}), 404
         db.session.commit()
         return jsonify({'message': 'Expense deleted successfully'})
     except Exception as e:
@@ -155,42 +215,10 @@ def bulk_delete_expenses():
     if not expense_ids:
         return jsonify({'error': 'No expense IDs provided'}), 400
 
-    expenses = Expense.query.filter(
-        Expense.id.in_(expense_ids),
-        Expense.user_id == session['user']['id']).all()
-
-    if not expenses:
-        return jsonify({'error': 'No matching expenses found'}), 404
-
     try:
-        for expense in expenses:
-            SharedExpense.query.filter_by(expense_id=expense.id).delete()
-            # --- Bulk share cleanup logic ---
-            bulk_shares = SharedExpense.query.filter(
-                SharedExpense.is_bulk_share == True,
-                SharedExpense.bulk_expense_ids.like(f'%{expense.id}%')).all()
-            for share in bulk_shares:
-                ids = [
-                    int(i) for i in share.bulk_expense_ids.split(',')
-                    if i and int(i) != int(expense.id)
-                ]
-                if len(ids) == 0:
-                    db.session.delete(share)
-                elif len(ids) == 1:
-                    existing = SharedExpense.query.filter_by(
-                        expense_id=ids[0],
-                        shared_with_id=share.shared_with_id,
-                        is_bulk_share=False).first()
-                    if existing:
-                        db.session.delete(share)
-                    else:
-                        share.is_bulk_share = False
-                        share.expense_id = ids[0]
-                        share.bulk_expense_ids = None
-                else:
-                    share.bulk_expense_ids = ','.join(map(str, ids))
-            # --- End bulk share cleanup ---
-            db.session.delete(expense)
+        # Set-based: the statement count does not grow with the selection
+        if not delete_records(Expense, session['user']['id'], expense_ids):
+            return jsonify({'error': 'No matching expenses found'}), 404
         db.session.commit()
         return jsonify({'message': 'Selected expenses deleted successfully'})
     except Exception as e:
@@ -198,12 +226,15 @@ def bulk_delete_expenses():
         return jsonify({'error': f'Failed to delete expense: {str(e)}'}), 500
 
 
-@csrf_required
 @expense_bp.route('/api/expenses/by-ocr', methods=['POST'])
+@csrf_required
 def ocr_receipt():
     if 'user' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
 
+    if not current_app.config.get('OCR_ENABLED', True):
+        return jsonify({'error': 'Receipt reading is disabled'}), 503
+
     if 'file' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
 
@@ -211,15 +242,176 @@ def ocr_receipt():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
 
+    image_bytes = file.read()
+    preprocess = current_app.config.get('OCR_PREPROCESS')
+    cache_settings = current_app.config.get('RECEIPT_CACHE')
+
+    # A receipt seen before is answered from the cache without a job
+    result = receipt_cache.cached_extraction(
+        receipt_cache.from_settings(cache_settings), image_bytes,
+        preprocess=preprocess)
+    if result is not None:
+        receipt_stats.record('cache')
+        return jsonify({'job_id': None, 'status': 'done', 'result': result,
+                        'error': None})
+
+    # While the LLM keeps failing, fail fast or read receipts without it
+    breaker = llm.get_breaker()
+    fallback = current_app.config.get('LLM_FALLBACK', True)
+    llm_allowed = breaker.allow()
+    if not llm_allowed and not fallback:
+        response = jsonify(
+            {'error': 'Receipt reading is temporarily unavailable'})
+        response.headers['Retry-After'] = str(math.ceil(breaker.retry_after()))
+        return response, 503
+    llm_settings = (llm.settings_from_config(current_app.config)
+                    if llm_allowed else None)
+
+    # OCR and extraction run on the job pool; the client polls for the result
     try:
-        # Read file directly into memory
-        file_stream = file.read()
-        text = ocr_image(
-            file_stream)  # Pass the file stream to the OCR function
-        result = process_receipt(text)
-        return jsonify({'result': result})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        job_id = get_queue().submit(
+            session['user']['id'], run_receipt_job, image_bytes, llm_settings,
+            preprocess, cache_settings,
+            current_app.config.get('RECEIPT_PARSER_MIN_CONFIDENCE'), fallback,
+            on_done=receipt_job_callback(breaker, llm_allowed))
+    except QueueFull as e:
+        if llm_allowed:
+            breaker.release()
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    response = jsonify({'job_id': job_id, 'status': 'queued'})
+    response.headers['Location'] = url_for('expense.ocr_job_status',
+                                           job_id=job_id)
+    return response, 202
+
+
+@expense_bp.route('/api/expenses/by-ocr/batch', methods=['POST'])
+@csrf_required
+def ocr_receipt_batch():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    if not current_app.config.get('OCR_ENABLED', True):
+        return jsonify({'error': 'Receipt reading is disabled'}), 503
+
+    files = [f for f in request.files.getlist('files') if f.filename]
+    if not files:
+        return jsonify({'error': 'No files uploaded'}), 400
+    # Every receipt is a job of its own under the per-user pending limit,
+    # so a larger batch could never be accepted; the client splits it
+    queue = get_queue()
+    max_files = min(current_app.config.get('OCR_BATCH_MAX_FILES', 20),
+                    queue.max_pending_per_user, queue.max_pending)
+    if len(files) > max_files:
+        return jsonify({
+            'error': f'At most {max_files} receipts can be uploaded at once',
+            'max_files': max_files
+        }), 400
+
+    # Same breaker handling as a single receipt
+    breaker = llm.get_breaker()
+    fallback = current_app.config.get('LLM_FALLBACK', True)
+    llm_allowed = breaker.allow()
+    if not llm_allowed and not fallback:
+        response = jsonify(
+            {'error': 'Receipt reading is temporarily unavailable'})
+        response.headers['Retry-After'] = str(math.ceil(breaker.retry_after()))
+        return response, 503
+
+    preprocess = current_app.config.get('OCR_PREPROCESS')
+    cache_settings = current_app.config.get('RECEIPT_CACHE')
+    batch = ReceiptBatch(
+        queue, session['user']['id'], [f.filename for f in files],
+        llm.settings_from_config(current_app.config) if llm_allowed else None,
+        cache_settings, fallback, current_app.config.get('LLM_BATCH_SIZE', 5),
+        on_complete=batch_job_callback(breaker, llm_allowed))
+
+    # Receipts seen before are answered without a job; the others are read
+    # one per job across the pool, and the texts the parser cannot read go
+    # to the LLM in follow-up jobs of LLM_BATCH_SIZE
+    cache = receipt_cache.from_settings(cache_settings)
+    cached = {}
+    images = []
+    for index, f in enumerate(files):
+        image_bytes = f.read()
+        result = receipt_cache.cached_extraction(cache, image_bytes,
+                                                 preprocess=preprocess)
+        if result is not None:
+            cached[index] = result
+        else:
+            images.append((index, image_bytes))
+    try:
+        queue.submit_many(batch.user_id, batch.read_jobs(
+            images, preprocess,
+            current_app.config.get('RECEIPT_PARSER_MIN_CONFIDENCE')))
+    except QueueFull as e:
+        if llm_allowed:
+            breaker.release()
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    for index, result in cached.items():
+        batch.add_line(index, result, source='cache')
+
+    # The client polls for lines as receipts finish and saves the confirmed
+    # rows in one go through /api/expenses/bulk
+    batch_id = get_batches().add(batch)
+    response = jsonify({'batch_id': batch_id, 'status': 'running',
+                        'files': len(files)})
+    response.headers['Location'] = url_for('expense.ocr_batch_status',
+                                           batch_id=batch_id)
+    return response, 202
+
+
+@expense_bp.route('/api/expenses/by-ocr/batch/<batch_id>', methods=['GET'])
+@conditional.exempt
+def ocr_batch_status(batch_id):
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    batch = get_batches().get(batch_id, session['user']['id'])
+    if batch is None:
+        return jsonify({'error': 'Batch not found'}), 404
+    # Lines finished after the first `since`, in the order they finished
+    return jsonify(batch.status(request.args.get('since', 0, type=int)))
+
+
+@expense_bp.route('/api/expenses/by-ocr/<job_id>', methods=['GET'])
+@conditional.exempt
+def ocr_job_status(job_id):
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    status = get_queue().status(job_id, session['user']['id'])
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(status)
+
+
+@expense_bp.route('/api/expenses/ocr-status', methods=['GET'])
+@conditional.exempt
+def ocr_status():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    # Until the readers are loaded where receipts are read (the pool's
+    # workers by default), a receipt also pays for model loading
+    languages = current_app.config.get('OCR_WARM_UP_LANGUAGES') or ['en']
+    return jsonify({'ready': get_queue().readers_ready(languages),
+                    'enabled': current_app.config.get('OCR_ENABLED', True)})
+
+
+@expense_bp.route('/api/expenses/ocr-stats', methods=['GET'])
+@conditional.exempt
+def ocr_stats():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    # How receipts were answered, and whether the LLM is being skipped
+    return jsonify({**receipt_stats.snapshot(),
+                    'llm_breaker': llm.get_breaker().snapshot()})
 
 
 @expense_bp.route('/api/expenses/<int:expense_id>/share', methods=['POST'])
@@ -240,16 +432,11 @@ def share_expense(expense_id):
         return jsonify({'error': 'Expense not found or unauthorized'}), 404
 
     # Check if already shared
-    existing_share = SharedExpense.query.filter_by(
-        expense_id=expense_id, shared_with_id=shared_with_user.id).first()
-
-    if existing_share:
+    if individually_shared_ids('expense', [expense_id], shared_with_user.id):
         return jsonify(
             {'error': 'This expense is already shared with this user'}), 400
 
-    shared_expense = SharedExpense(expense_id=expense_id,
-                                   shared_with_id=shared_with_user.id)
-    db.session.add(shared_expense)
+    create_share('expense', [expense_id], shared_with_user.id)
     db.session.commit()
 
     return jsonify({'message': 'Expense shared successfully'})
@@ -282,14 +469,11 @@ def bulk_share_expenses():
     # Check for existing shares and create new ones
     shared_count = 0
     already_shared = []
+    existing_ids = individually_shared_ids(
+        'expense', [expense.id for expense in expenses], shared_with_user.id)
     for expense in expenses:
-        existing_share = SharedExpense.query.filter_by(
-            expense_id=expense.id, shared_with_id=shared_with_user.id).first()
-
-        if not existing_share:
-            shared_expense = SharedExpense(expense_id=expense.id,
-                                           shared_with_id=shared_with_user.id)
-            db.session.add(shared_expense)
+        if expense.id not in existing_ids:
+            create_share('expense', [expense.id], shared_with_user.id)
             shared_count += 1
         else:
             already_shared.append(expense.id)
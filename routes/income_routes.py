@@ -1,26 +1,86 @@
-from flask import Blueprint, session, jsonify, request
+from flask import (Blueprint, Response, session, jsonify, request, current_app,
+                   stream_with_context)
+import json
 from datetime import datetime
-from models.models import db, Income, SharedIncome
+from models.models import db, Income
 from utils.decorators import csrf_required
+from utils.rollups import records_added
+from utils.changes import records_changed, changes_since
+from utils.listing import parse_list_args, filtered_query, fetch_page
+from utils import export, importer
+from utils.bulk import delete_records, insert_records, validate_records
 
 income_bp = Blueprint('income', __name__)
 
 
+def serialize_income(e):
+    return {
+        'id': e.id,
+        'amount': e.amount,
+        'category': e.category,
+        'description': e.description,
+        'date': e.date.astimezone().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
 @income_bp.route('/api/incomes', methods=['GET'])
 def get_income():
     if 'user' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
 
+    try:
+        filters = parse_list_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     user_id = session['user']['id']
-    income = Income.query.filter_by(user_id=user_id).order_by(
-        Income.date.desc()).all()
-    return jsonify([{
-        'id': e.id,
-        'amount': e.amount,
-        'category': e.category,
-        'description': e.description,
-        'date': e.date.astimezone().strftime('%Y-%m-%d %H:%M:%S')
-    } for e in income])
+    query = filtered_query(Income, user_id, filters)
+
+    # Without limit/cursor the full list is returned, as before
+    if not filters['paginated']:
+        return jsonify([serialize_income(e) for e in query.all()])
+
+    income, next_cursor = fetch_page(Income, query, filters)
+    return jsonify({
+        'incomes': [serialize_income(e) for e in income],
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    })
+
+
+@income_bp.route('/api/incomes/changes', methods=['GET'])
+def get_income_changes():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'error': 'Invalid since version'}), 400
+
+    version, changed, deleted_ids = changes_since('income',
+                                                  session['user']['id'], since)
+    return jsonify({
+        'version': version,
+        'changed': [serialize_income(e) for e in changed],
+        'deleted': deleted_ids
+    })
+
+
+@income_bp.route('/api/incomes/export', methods=['GET'])
+def export_incomes():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    try:
+        filters = parse_list_args(request.args)
+        fmt = export.parse_format(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Streamed in batches, so any number of rows fits in constant memory
+    statement = export.own_records(Income, session['user']['id'], filters)
+    return export.export_response(statement, export.COLUMNS, fmt, 'incomes')
 
 
 @income_bp.route('/api/incomes', methods=['POST'])
@@ -45,6 +105,8 @@ def add_income():
                         user_id=session['user']['id'])
 
     db.session.add(new_income)
+    records_added([new_income])
+    records_changed([new_income])
     db.session.commit()
 
     return jsonify({
@@ -65,33 +127,58 @@ def add_incomes_bulk():
         return jsonify({'error': 'Not authenticated'}), 401
 
     data_list = request.get_json()
-    new_incomes = []
-
-    for data in data_list:
-        new_income = Income(amount=float(data['amount']),
-                            category=data['category'],
-                            description=data.get('description', ''),
-                            user_id=session['user']['id'],
-                            date=datetime.strptime(data['date'],
-                                                   '%Y-%m-%dT%H:%M:%S'))
-        db.session.add(new_income)
-        new_incomes.append(new_income)
-
+    if not isinstance(data_list, list):
+        return jsonify({'error': 'Expected a list of incomes'}), 400
+
+    # Every row is checked first; invalid rows are reported, not inserted
+    records, errors = validate_records(Income, session['user']['id'],
+                                       data_list)
+    if not records:
+        return jsonify({'error': 'No valid incomes to add',
+                        'errors': errors}), 400
+
+    ids = insert_records(
+        Income, records,
+        chunk_size=current_app.config.get('BULK_INSERT_CHUNK_SIZE', 1000))
     db.session.commit()
 
     return jsonify({
         'message':
         'Incomes added successfully',
         'incomes': [{
-            'id': e.id,
-            'amount': e.amount,
-            'category': e.category,
-            'description': e.description,
-            'date': e.date.astimezone().strftime('%Y-%m-%d %H:%M:%S')
-        } for e in new_incomes]
+            'id': record_id,
+            'amount': r.amount,
+            'category': r.category,
+            'description': r.description,
+            'date': r.date.strftime('%Y-%m-%d %H:%M:%S')
+        } for record_id, r in zip(ids, records)],
+        'errors': errors
     })
 
 
+@income_bp.route('/api/incomes/import', methods=['POST'])
+def import_incomes():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    try:
+        progress = importer.start_import(
+            Income, session['user']['id'], upload, request.form,
+            chunk_size=current_app.config.get('BULK_INSERT_CHUNK_SIZE', 1000))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # One JSON line per committed chunk, so a large statement shows progress
+    # and an interrupted import keeps the chunks already saved
+    return Response(stream_with_context(
+        json.dumps(line) + '\n' for line in progress),
+        mimetype='application/x-ndjson')
+
+
 @income_bp.route('/api/incomes/delete', methods=['POST'])
 def delete_income():
     if 'user' not in session:
@@ -100,58 +187,10 @@ def delete_income():
     data = request.get_json()
     income_id = data.get('id')
 
-    income = Income.query.filter_by(id=income_id,
-                                    user_id=session['user']['id']).first()
-    if not income:
-        return jsonify({'error': 'Income not found'}), 404
-
     try:
-        # Find all bulk shares containing this income
-        bulk_shares = SharedIncome.query.filter(
-            SharedIncome.is_bulk_share == True,
-            SharedIncome.bulk_income_ids.like(f'%{income_id}%')).all()
-
-        for bulk_share in bulk_shares:
-            # Get all income IDs in this bulk share
-            income_ids = [
-                int(id) for id in bulk_share.bulk_income_ids.split(',')
-            ]
-            # Remove the deleted income from the list
-            income_ids.remove(income_id)
-            if len(income_ids) == 1:
-                # If only one income remains, check if it's already shared individually
-                remaining_income_id = income_ids[0]
-                existing_single_share = SharedIncome.query.filter_by(
-                    income_id=remaining_income_id,
-                    shared_with_id=bulk_share.shared_with_id,
-                    is_bulk_share=False).first()
-                if existing_single_share:
-                    # If already shared individually, delete the bulk share
-                    db.session.delete(bulk_share)
-                else:
-                    # Convert to single share
-                    new_single_share = SharedIncome(
-                        income_id=remaining_income_id,
-                        shared_with_id=bulk_share.shared_with_id,
-                        is_bulk_share=False,
-                        is_repeat=False)
-                    db.session.add(new_single_share)
-                    db.session.delete(bulk_share)
-            else:
-                # Update the bulk share with remaining income IDs
-                bulk_share.bulk_income_ids = ','.join(
-                    map(str, sorted(income_ids)))
-                # Update is_repeat flag
-                bulk_share.is_repeat = any(
-                    SharedIncome.query.filter_by(
-                        income_id=id,
-                        shared_with_id=bulk_share.shared_with_id,
-                        is_bulk_share=False).first() is not None
-                    for id in income_ids)
-        # Delete all single shares of this income
-        SharedIncome.query.filter_by(income_id=income_id).delete()
-        # Delete the income
-        db.session.delete(income)
+        # Also drops the income from every share that references it
+        if not delete_records(Income, session['user']['id'], [income_id]):
+            return jsonify({'error': 'Income not found'}), 404
         db.session.commit()
         return jsonify({'message': 'Income deleted successfully'})
     except Exception as e:
@@ -171,59 +210,9 @@ def bulk_delete_incomes():
         return jsonify({'error': 'No income IDs provided'}), 400
 
     try:
-        # Get all incomes to be deleted
-        incomes = Income.query.filter(
-            Income.id.in_(income_ids),
-            Income.user_id == session['user']['id']).all()
-        if not incomes:
+        # Set-based: the statement count does not grow with the selection
+        if not delete_records(Income, session['user']['id'], income_ids):
             return jsonify({'error': 'No matching incomes found'}), 404
-        # Process each income
-        for income in incomes:
-            # Find all bulk shares containing this income
-            bulk_shares = SharedIncome.query.filter(
-                SharedIncome.is_bulk_share == True,
-                SharedIncome.bulk_income_ids.like(f'%{income.id}%')).all()
-            for bulk_share in bulk_shares:
-                # Get all income IDs in this bulk share
-                share_income_ids = [
-                    int(id) for id in bulk_share.bulk_income_ids.split(',')
-                ]
-                # Remove the deleted income from the list
-                share_income_ids.remove(income.id)
-                if len(share_income_ids) == 1:
-                    # If only one income remains, check if it's already shared individually
-                    remaining_income_id = share_income_ids[0]
-                    existing_single_share = SharedIncome.query.filter_by(
-                        income_id=remaining_income_id,
-                        shared_with_id=bulk_share.shared_with_id,
-                        is_bulk_share=False).first()
-                    if existing_single_share:
-                        # If already shared individually, delete the bulk share
-                        db.session.delete(bulk_share)
-                    else:
-                        # Convert to single share
-                        new_single_share = SharedIncome(
-                            income_id=remaining_income_id,
-                            shared_with_id=bulk_share.shared_with_id,
-                            is_bulk_share=False,
-                            is_repeat=False)
-                        db.session.add(new_single_share)
-                        db.session.delete(bulk_share)
-                else:
-                    # Update the bulk share with remaining income IDs
-                    bulk_share.bulk_income_ids = ','.join(
-                        map(str, sorted(share_income_ids)))
-                    # Update is_repeat flag
-                    bulk_share.is_repeat = any(
-                        SharedIncome.query.filter_by(
-                            income_id=id,
-                            shared_with_id=bulk_share.shared_with_id,
-                            is_bulk_share=False).first() is not None
-                        for id in share_income_ids)
-            # Delete all single shares of this income
-            SharedIncome.query.filter_by(income_id=income.id).delete()
-            # Delete the income
-            db.session.delete(income)
         db.session.commit()
         return jsonify({'message': 'Selected incomes deleted successfully'})
     except Exception as e:
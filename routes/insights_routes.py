@@ -1,8 +1,14 @@
 import logging
-from flask import Blueprint, session, jsonify, request, redirect, url_for, render_template
-from datetime import datetime, timedelta
-from models.models import db, Expense, Income, SharedExpense, SharedIncome, User
-from sqlalchemy import func, or_
+from flask import (Blueprint, session, jsonify, request, redirect, url_for,
+                   render_template, current_app)
+from datetime import date, datetime, timedelta
+from models.models import (db, Expense, Income, User, DailyRollup,
+                           ShareVisibility)
+from sqlalchemy import func, or_, and_
+from utils import buckets, conditional, diagnostics, shared_insights
+from utils.buckets import bucket_start
+from utils.cache import cached_response, get_cache
+from utils.changes import current_version
 
 insights_bp = Blueprint('insights', __name__)
 
@@ -63,46 +69,15 @@ def parse_date_range():
         
         logging.debug(f"Parsed date range: {start_date_obj} to {end_date_obj} (query will use < {next_day})")
         
-        # Check if we have data in this date range (for debugging)
-        if 'user' in session:
-            user_id = session['user']['id']
-            
-            # Check specifically for today's data
+        # Diagnosed requests record the resolved range; query counts and
+        # timings come from utils.diagnostics instead of extra COUNT queries
+        if diagnostics.active():
             today_start = datetime(today.year, today.month, today.day, 0, 0, 0)
-            today_end = today_start + timedelta(days=1)
-            
-            today_expense_count = Expense.query.filter(
-                Expense.user_id == user_id,
-                Expense.date >= today_start,
-                Expense.date < today_end
-            ).count()
-            
-            today_income_count = Income.query.filter(
-                Income.user_id == user_id,
-                Income.date >= today_start,
-                Income.date < today_end
-            ).count()
-            
-            logging.debug(f"Today's data counts: expenses={today_expense_count}, income={today_income_count}")
-            
-            # Check if today's data is included in the date range
-            today_in_range = (start_date_obj <= today_start < next_day)
-            logging.debug(f"Is today in the selected date range? {today_in_range}")
-            
-            # Get data for the full date range
-            expense_count = Expense.query.filter(
-                Expense.user_id == user_id,
-                Expense.date >= start_date_obj,
-                Expense.date < next_day
-            ).count()
-            
-            income_count = Income.query.filter(
-                Income.user_id == user_id,
-                Income.date >= start_date_obj,
-                Income.date < next_day
-            ).count()
-            
-            logging.debug(f"Data counts in full range: expenses={expense_count}, income={income_count}")
+            diagnostics.note('date_range', {
+                'start': start_date_obj.isoformat(),
+                'end_exclusive': next_day.isoformat(),
+                'today_in_range': start_date_obj <= today_start < next_day
+            })
         
         # Return start date and the next day at 00:00:00 for proper comparison
         return start_date_obj, next_day
@@ -110,7 +85,133 @@ def parse_date_range():
         logging.error(f"Date parsing error: {e}")
         raise ValueError('Invalid date format. Use YYYY-MM-DD.')
 
+def rollup_filters(user_id, kind, start_date, end_date):
+    """
+    Filter DailyRollup rows for one user and kind in [start_date, end_date).
+    Both bounds are midnights, so comparing whole days is exact.
+    """
+    return (
+        DailyRollup.user_id == user_id,
+        DailyRollup.kind == kind,
+        DailyRollup.day >= start_date.date(),
+        DailyRollup.day < end_date.date()
+    )
+
+def week_start():
+    return current_app.config.get('INSIGHTS_WEEK_START', buckets.MONDAY)
+
+def rollup_by_bucket(user_id, kind, start_date, end_date, unit):
+    """
+    Sum the daily rollups per day/week/month/quarter/year.
+    Returns {bucket start date: total} in date order.
+    """
+    key = bucket_start(DailyRollup.day, unit, week_start())
+    rows = db.session.query(
+        key, func.sum(DailyRollup.total)
+    ).filter(
+        *rollup_filters(user_id, kind, start_date, end_date)
+    ).group_by(key).order_by(key).all()
+    return {start: float(total) for start, total in rows}
+
+def rollup_by_month(user_id, kind, start_date, end_date):
+    """
+    Sum the daily rollups per calendar month.
+    Returns parallel lists of "Mon YYYY" labels and totals.
+    """
+    totals = rollup_by_bucket(user_id, kind, start_date, end_date, 'month')
+    return ([buckets.label(month, 'month') for month in totals],
+            list(totals.values()))
+
+def parse_sharer_id():
+    """
+    Read the required sharer_id query argument.
+    Raises ValueError with a client-facing message when missing or invalid.
+    """
+    sharer_id = request.args.get('sharer_id')
+    if not sharer_id:
+        raise ValueError('No sharer ID provided')
+    try:
+        return int(sharer_id)
+    except ValueError:
+        raise ValueError('Invalid sharer ID')
+
+def shared_summary_response(user_id, start_date, end_date, sharer_id, sharer_name):
+    # 'all' combines every sharer
+    owner_id = None if sharer_id == 'all' else sharer_id
+    expense = shared_insights.summary('expense', user_id, start_date, end_date, owner_id)
+    income = shared_insights.summary('income', user_id, start_date, end_date, owner_id)
+    return {
+        'expense': expense,
+        'income': income,
+        'sharer': {
+            'id': sharer_id,
+            'name': sharer_name
+        },
+        'debug': {
+            'unique_expenses': expense['totalEntries'],
+            'unique_incomes': income['totalEntries']
+        }
+    }
+
+def shared_top_categories_response(kind, user_id, start_date, end_date, sharer_id=None):
+    labels, values, entries = shared_insights.top_categories(
+        kind, user_id, start_date, end_date, sharer_id)
+    return {
+        'labels': labels,
+        'values': values,
+        'debug': {
+            'unique_expenses' if kind == 'expense' else 'unique_incomes': entries
+        }
+    }
+
+def shared_by_month_response(user_id, start_date, end_date, sharer_id=None):
+    data_type = request.args.get('type', 'expense')  # 'expense' or 'income'
+    kind = 'expense' if data_type == 'expense' else 'income'
+    labels, values, entries = shared_insights.by_month(
+        kind, user_id, start_date, end_date, sharer_id)
+    return {
+        'labels': labels,
+        'values': values,
+        'debug': {
+            'data_type': data_type,
+            'unique_items': entries
+        }
+    }
+
+def shared_comparison_response(user_id, start_date, end_date, sharer_id=None):
+    labels, income, expense, expense_count, income_count = \
+        shared_insights.comparison(user_id, start_date, end_date, sharer_id)
+    return {
+        'labels': labels,
+        'income': income,
+        'expense': expense,
+        'debug': {
+            'unique_expenses': expense_count,
+            'unique_incomes': income_count
+        }
+    }
+
+def insights_cache_key():
+    """
+    Result cache key for the current request, or None to bypass the cache.
+    The user's data version moves on every write to their records or
+    incoming shares, so stale entries are never hit again and age out.
+    """
+    if 'user' not in session:
+        return None
+    try:
+        start_date, end_date = parse_date_range()
+    except ValueError:
+        return None
+    user_id = session['user']['id']
+    args = tuple(sorted(
+        (name, value) for name, value in request.args.items(multi=True)
+        if name not in ('startDate', 'endDate', 'diagnostics')))
+    return (user_id, current_version(user_id), request.endpoint,
+            start_date, end_date, date.today(), args)
+
 @insights_bp.route('/api/insights', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_insights():
     if 'user' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
@@ -120,61 +221,33 @@ def get_insights():
         return jsonify({'error': str(e)}), 400
 
     user_id = session['user']['id']
+    filters = rollup_filters(user_id, 'expense', start_date, end_date)
 
     category_expenses = db.session.query(
-        Expense.category,
-        func.sum(Expense.amount).label('total')
-    ).filter(
-        Expense.user_id == user_id,
-        Expense.type == 'expense',
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).group_by(Expense.category).all()
+        DailyRollup.category,
+        func.sum(DailyRollup.total).label('total')
+    ).filter(*filters).group_by(DailyRollup.category).all()
 
     category_labels = [item[0] for item in category_expenses]
     category_values = [float(item[1]) for item in category_expenses]
 
     date_category_expenses = db.session.query(
-        func.date(Expense.date).label('date'),
-        Expense.category,
-        func.sum(Expense.amount).label('total')
-    ).filter(
-        Expense.user_id == user_id,
-        Expense.type == 'expense',
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).group_by(func.date(Expense.date), Expense.category).all()
+        DailyRollup.day,
+        DailyRollup.category,
+        DailyRollup.total
+    ).filter(*filters).order_by(DailyRollup.day).all()
 
     date_category_data = {}
-    for date, category, total in date_category_expenses:
-        if date not in date_category_data:
-            date_category_data[date] = {}
-        date_category_data[date][category] = float(total)
-
-    expenses = db.session.query(
-        func.date(Expense.date).label('date'),
-        func.sum(Expense.amount).label('total')
-    ).filter(
-        Expense.user_id == user_id,
-        Expense.type == 'expense',
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).group_by(func.date(Expense.date)).order_by(func.date(Expense.date)).all()
-
-    date_labels = []
-    date_values = []
-    
-    for expense_date, expense_total in expenses:
-
-        if hasattr(expense_date, 'strftime'):
-
-            date_str = expense_date.strftime('%Y-%m-%d')
-        else:
+    date_totals = {}
+    for day, category, total in date_category_expenses:
+        date_str = buckets.label(day, 'day')
+        if date_str not in date_category_data:
+            date_category_data[date_str] = {}
+        date_category_data[date_str][category] = float(total)
+        date_totals[date_str] = date_totals.get(date_str, 0.0) + float(total)
 
-            date_str = str(expense_date)
-        
-        date_labels.append(date_str)
-        date_values.append(float(expense_total))
+    date_labels = list(date_totals.keys())
+    date_values = list(date_totals.values())
     
     totalAmount = sum(date_values)
     
@@ -186,6 +259,7 @@ def get_insights():
     })
 
 @insights_bp.route('/api/insights/summary', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_expense_summary():
     if 'user' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
@@ -196,39 +270,26 @@ def get_expense_summary():
 
     user_id = session['user']['id']
 
-    total_entries = Expense.query.filter(
-        Expense.user_id == user_id,
-        Expense.type == 'expense',
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).count()
-
-    total_amount = db.session.query(func.sum(Expense.amount)).filter(
-        Expense.user_id == user_id,
-        Expense.type == 'expense',
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).scalar() or 0.0
-
     category_distribution = db.session.query(
-        Expense.category, func.sum(Expense.amount)
+        DailyRollup.category,
+        func.sum(DailyRollup.total),
+        func.sum(DailyRollup.count)
     ).filter(
-        Expense.user_id == user_id,
-        Expense.type == 'expense',
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).group_by(Expense.category).all()
+        *rollup_filters(user_id, 'expense', start_date, end_date)
+    ).group_by(DailyRollup.category).all()
 
     labels = [item[0] for item in category_distribution]
     values = [float(item[1]) for item in category_distribution]
+    total_entries = sum(int(item[2]) for item in category_distribution)
 
     return jsonify({
         'totalEntries': total_entries,
-        'totalAmount': float(total_amount),
+        'totalAmount': float(sum(values)),
         'categoryDistribution': {'labels': labels, 'values': values}
     })
 
 @insights_bp.route('/api/income-summary', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_income_summary():
     if 'user' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
@@ -239,29 +300,25 @@ def get_income_summary():
 
     user_id = session['user']['id']
 
-    total_income = db.session.query(func.sum(Income.amount)).filter(
-        Income.user_id == user_id,
-        Income.date >= start_date,
-        Income.date < end_date
-    ).scalar() or 0.0
-
     category_distribution = db.session.query(
-        Income.category, func.sum(Income.amount)
+        DailyRollup.category, func.sum(DailyRollup.total)
     ).filter(
-        Income.user_id == user_id,
-        Income.date >= start_date,
-        Income.date < end_date
-    ).group_by(Income.category).all()
+        *rollup_filters(user_id, 'income', start_date, end_date)
+    ).group_by(DailyRollup.category).all()
 
     labels = [item[0] for item in category_distribution]
     values = [float(item[1]) for item in category_distribution]
 
     return jsonify({
-        'totalAmount': float(total_income),
+        'totalAmount': float(sum(values)),
         'categoryDistribution': {'labels': labels, 'values': values}
     })
 
+PERIOD_UNITS = {'daily': 'day', 'weekly': 'week', 'monthly': 'month',
+                'quarterly': 'quarter', 'yearly': 'year'}
+
 @insights_bp.route('/api/income-expense-comparison', methods=['GET'])
+@cached_response(insights_cache_key)
 def income_expense_comparison():
     if 'user' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
@@ -272,148 +329,17 @@ def income_expense_comparison():
 
     user_id = session['user']['id']
     
-    # Get period parameter (daily, weekly, monthly)
+    # Period of each point: daily, weekly, monthly, quarterly or yearly
     period = request.args.get('period', 'daily')
-    
-    # Handle different periods for data aggregation
-    if period == 'weekly':
-        # Weekly aggregation
-        # Get income data by week
-        income_data = db.session.query(
-            func.date_trunc('week', Income.date).label('week_start'),
-            func.sum(Income.amount).label('total')
-        ).filter(
-            Income.user_id == user_id,
-            Income.date >= start_date,
-            Income.date < end_date
-        ).group_by(func.date_trunc('week', Income.date)).order_by(func.date_trunc('week', Income.date)).all()
-        
-        # Get expense data by week
-        expense_data = db.session.query(
-            func.date_trunc('week', Expense.date).label('week_start'),
-            func.sum(Expense.amount).label('total')
-        ).filter(
-            Expense.user_id == user_id,
-            Expense.type == 'expense',
-            Expense.date >= start_date,
-            Expense.date < end_date
-        ).group_by(func.date_trunc('week', Expense.date)).order_by(func.date_trunc('week', Expense.date)).all()
-        
-        # Create maps for date values to amounts
-        date_set = set()
-        income_map = {}
-        for date_val, amount in income_data:
-            if hasattr(date_val, 'strftime'):
-                # Format as "Week of YYYY-MM-DD"
-                date_str = f"Week of {date_val.strftime('%Y-%m-%d')}"
-            else:
-                date_str = f"Week of {str(date_val)}"
-            
-            date_set.add(date_str)
-            income_map[date_str] = float(amount)
-        
-        expense_map = {}
-        for date_val, amount in expense_data:
-            if hasattr(date_val, 'strftime'):
-                date_str = f"Week of {date_val.strftime('%Y-%m-%d')}"
-            else:
-                date_str = f"Week of {str(date_val)}"
-            
-            date_set.add(date_str)
-            expense_map[date_str] = float(amount)
-        
-    elif period == 'monthly':
-        # Monthly aggregation
-        # Get income data by month
-        income_data = db.session.query(
-            func.date_trunc('month', Income.date).label('month_start'),
-            func.sum(Income.amount).label('total')
-        ).filter(
-            Income.user_id == user_id,
-            Income.date >= start_date,
-            Income.date < end_date
-        ).group_by(func.date_trunc('month', Income.date)).order_by(func.date_trunc('month', Income.date)).all()
-        
-        # Get expense data by month
-        expense_data = db.session.query(
-            func.date_trunc('month', Expense.date).label('month_start'),
-            func.sum(Expense.amount).label('total')
-        ).filter(
-            Expense.user_id == user_id,
-            Expense.type == 'expense',
-            Expense.date >= start_date,
-            Expense.date < end_date
-        ).group_by(func.date_trunc('month', Expense.date)).order_by(func.date_trunc('month', Expense.date)).all()
-        
-        # Create maps for date values to amounts
-        date_set = set()
-        income_map = {}
-        for date_val, amount in income_data:
-            if hasattr(date_val, 'strftime'):
-                date_str = date_val.strftime('%b %Y')  # e.g. "Jan 2023"
-            else:
-                date_str = str(date_val)
-            
-            date_set.add(date_str)
-            income_map[date_str] = float(amount)
-        
-        expense_map = {}
-        for date_val, amount in expense_data:
-            if hasattr(date_val, 'strftime'):
-                date_str = date_val.strftime('%b %Y')  # e.g. "Jan 2023"
-            else:
-                date_str = str(date_val)
-            
-            date_set.add(date_str)
-            expense_map[date_str] = float(amount)
-        
-    else:  # Default to daily
-        # Daily aggregation (existing implementation)
-        # Get income data
-        income_data = db.session.query(
-            func.date(Income.date).label('date'),
-            func.sum(Income.amount).label('total')
-        ).filter(
-            Income.user_id == user_id,
-            Income.date >= start_date,
-            Income.date < end_date
-        ).group_by(func.date(Income.date)).all()
+    unit = PERIOD_UNITS.get(period, 'day')
 
-        # Get expense data
-        expense_data = db.session.query(
-            func.date(Expense.date).label('date'),
-            func.sum(Expense.amount).label('total')
-        ).filter(
-            Expense.user_id == user_id,
-            Expense.type == 'expense',
-            Expense.date >= start_date,
-            Expense.date < end_date
-        ).group_by(func.date(Expense.date)).all()
-
-        date_set = set()
-        income_map = {}
-        for date_val, amount in income_data:
-            if hasattr(date_val, 'strftime'):
-                date_str = date_val.strftime('%Y-%m-%d')
-            else:
-                date_str = str(date_val)
-            
-            date_set.add(date_str)
-            income_map[date_str] = float(amount)
-        
-        expense_map = {}
-        for date_val, amount in expense_data:
-            if hasattr(date_val, 'strftime'):
-                date_str = date_val.strftime('%Y-%m-%d')
-            else:
-                date_str = str(date_val)
-            
-            date_set.add(date_str)
-            expense_map[date_str] = float(amount)
-  
-    date_list = sorted(date_set)
-    income_list = [income_map.get(d, 0.0) for d in date_list]
-    expense_list = [expense_map.get(d, 0.0) for d in date_list]
+    income_map = rollup_by_bucket(user_id, 'income', start_date, end_date, unit)
+    expense_map = rollup_by_bucket(user_id, 'expense', start_date, end_date,
+                                   unit)
+    starts = sorted(set(income_map) | set(expense_map))
+    date_list = [buckets.label(start, unit) for start in starts]
+    income_list = [income_map.get(start, 0.0) for start in starts]
+    expense_list = [expense_map.get(start, 0.0) for start in starts]
 
     return jsonify({
         'labels': date_list,
@@ -431,6 +357,7 @@ def insights_page():
     return render_template('insight.html')
 
 @insights_bp.route('/api/insights/debug', methods=['GET'])
+@conditional.exempt
 def debug_insights():
     """
     Diagnostic endpoint to help understand date handling and data availability.
@@ -563,6 +490,7 @@ def debug_insights():
         }), 400
 
 @insights_bp.route('/api/insights/date-diagnostic', methods=['GET'])
+@conditional.exempt
 def date_diagnostic():
     """
     Diagnostic endpoint to help understand date assignment to months.
@@ -573,59 +501,42 @@ def date_diagnostic():
     
     user_id = session['user']['id']
     
-    # Get all dates with expenses or income for this user
-    expense_dates = db.session.query(func.date(Expense.date)).filter(
+    # Totals per day with expenses or income for this user
+    expense_day = bucket_start(Expense.date, 'day')
+    expense_by_day = dict(db.session.query(
+        expense_day, func.sum(Expense.amount)
+    ).filter(
         Expense.user_id == user_id
-    ).group_by(func.date(Expense.date)).order_by(func.date(Expense.date)).all()
-    
-    income_dates = db.session.query(func.date(Income.date)).filter(
+    ).group_by(expense_day).all())
+
+    income_day = bucket_start(Income.date, 'day')
+    income_by_day = dict(db.session.query(
+        income_day, func.sum(Income.amount)
+    ).filter(
         Income.user_id == user_id
-    ).group_by(func.date(Income.date)).order_by(func.date(Income.date)).all()
-    
+    ).group_by(income_day).all())
+
     # Combine and sort all dates
-    all_dates = set([d[0] for d in expense_dates] + [d[0] for d in income_dates])
-    sorted_dates = sorted(all_dates)
-    
+    sorted_dates = sorted(set(expense_by_day) | set(income_by_day))
+
     # For each date, determine which month period it belongs to
     date_assignments = []
-    
+
     for date_val in sorted_dates:
-        # Get expense amounts for this date
-        expense_amount = db.session.query(func.sum(Expense.amount)).filter(
-            Expense.user_id == user_id,
-            func.date(Expense.date) == date_val
-        ).scalar() or 0.0
-        
-        # Get income amounts for this date
-        income_amount = db.session.query(func.sum(Income.amount)).filter(
-            Income.user_id == user_id,
-            func.date(Income.date) == date_val
-        ).scalar() or 0.0
-        
-        # Create month ranges to test
+        expense_amount = expense_by_day.get(date_val) or 0.0
+        income_amount = income_by_day.get(date_val) or 0.0
+
+        # Month ranges to test
         date_obj = date_val
-        current_year = date_obj.year
-        current_month = date_obj.month
-        
-        # This month range
-        this_month_start = datetime(current_year, current_month, 1)
-        if current_month == 12:
-            this_month_end = datetime(current_year + 1, 1, 1)
-        else:
-            this_month_end = datetime(current_year, current_month + 1, 1)
-        
-        # Previous month range
-        if current_month == 1:
-            prev_month_start = datetime(current_year - 1, 12, 1)
-            prev_month_end = datetime(current_year, 1, 1)
-        else:
-            prev_month_start = datetime(current_year, current_month - 1, 1)
-            prev_month_end = datetime(current_year, current_month, 1)
-        
+        moment = datetime.combine(date_obj, datetime.min.time())
+        this_month_start, this_month_end = buckets.bucket_range(date_obj, 'month')
+        prev_month_start, prev_month_end = buckets.bucket_range(
+            this_month_start - timedelta(days=1), 'month')
+
         # Check which periods this date falls into
-        in_this_month = this_month_start <= date_obj < this_month_end
-        in_prev_month = prev_month_start <= date_obj < prev_month_end
-        
+        in_this_month = this_month_start <= moment < this_month_end
+        in_prev_month = prev_month_start <= moment < prev_month_end
+
         date_assignments.append({
             'date': date_val.strftime('%Y-%m-%d'),
             'expenses': float(expense_amount),
@@ -645,6 +556,7 @@ def date_diagnostic():
     })
 
 @insights_bp.route('/api/income-by-month', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_income_by_month():
     """
     Get income data aggregated by month.
@@ -659,34 +571,7 @@ def get_income_by_month():
     
     user_id = session['user']['id']
     
-    # Query to get income by month
-    income_by_month = db.session.query(
-        func.strftime('%Y-%m', Income.date).label('month'),
-        func.sum(Income.amount).label('total')
-    ).filter(
-        Income.user_id == user_id,
-        Income.date >= start_date,
-        Income.date < end_date
-    ).group_by(
-        func.strftime('%Y-%m', Income.date)
-    ).order_by(
-        func.strftime('%Y-%m', Income.date)
-    ).all()
-    
-    # Format the results
-    labels = []
-    values = []
-    
-    for month, total in income_by_month:
-        # Format month as "Mon YYYY"
-        try:
-            date_obj = datetime.strptime(month, '%Y-%m')
-            month_label = date_obj.strftime('%b %Y')
-        except:
-            month_label = month
-            
-        labels.append(month_label)
-        values.append(float(total))
+    labels, values = rollup_by_month(user_id, 'income', start_date, end_date)
     
     # Log for debugging
     logging.debug(f"Income by month: {list(zip(labels, values))}")
@@ -697,6 +582,7 @@ def get_income_by_month():
     })
 
 @insights_bp.route('/api/expenses-by-month', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_expenses_by_month():
     """
     Get expense data aggregated by month.
@@ -712,37 +598,7 @@ def get_expenses_by_month():
 
     user_id = session['user']['id']
     
-    # Extract month and year from expense dates
-    # Use date_trunc to ensure correct month assignment
-    expenses_by_month = db.session.query(
-        func.extract('year', Expense.date).label('year'),
-        func.extract('month', Expense.date).label('month'),
-        func.sum(Expense.amount).label('total')
-    ).filter(
-        Expense.user_id == user_id,
-        Expense.type == 'expense',
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).group_by(
-        func.extract('year', Expense.date),
-        func.extract('month', Expense.date)
-    ).order_by(
-        func.extract('year', Expense.date),
-        func.extract('month', Expense.date)
-    ).all()
-    
-    # Format the results
-    month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    labels = []
-    values = []
-    
-    for year, month, total in expenses_by_month:
-        # Month from SQL is 1-indexed
-        month_idx = int(month) - 1  # Convert to 0-indexed for our array
-        if 0 <= month_idx < 12:
-            month_name = month_names[month_idx]
-            labels.append(f"{month_name} {int(year)}")
-            values.append(float(total))
+    labels, values = rollup_by_month(user_id, 'expense', start_date, end_date)
     
     # Log for debugging
     logging.debug(f"Expenses by month: {list(zip(labels, values))}")
@@ -752,10 +608,22 @@ def get_expenses_by_month():
         'values': values
     })
 
+# period-summary periods: (bucket unit, how many buckets back from now)
+SUMMARY_PERIODS = {
+    'week': ('week', 0),
+    'month': ('month', 0),
+    'prev-month': ('month', 1),
+    'quarter': ('quarter', 0),
+    'year': ('year', 0),
+}
+
+
 @insights_bp.route('/api/insights/period-summary', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_period_summary():
     """
-    Get summary data for a specific period (This Month, Last Month, This Year)
+    Get summary data for a specific period (This Week, This Month, Last
+    Month, This Quarter, This Year)
     This is a specialized endpoint to ensure consistent period data.
     """
     if 'user' not in session:
@@ -764,75 +632,44 @@ def get_period_summary():
     period = request.args.get('period', 'month')  # Default to this month
     logging.debug(f"Getting period summary for: {period}")
     
-    # Calculate date range based on period
-    today = datetime.now()
-    
-    if period == 'month':
-        # This month - from 1st of current month to today
-        start_date = datetime(today.year, today.month, 1)
-        end_date = datetime(today.year, today.month + 1, 1)
-    elif period == 'prev-month':
-        # Last month - from 1st to last day of previous month
-        if today.month == 1:
-            # If January, previous month is December of last year
-            start_date = datetime(today.year - 1, 12, 1)
-            end_date = datetime(today.year, 1, 1)
-        else:
-            start_date = datetime(today.year, today.month - 1, 1)
-            end_date = datetime(today.year, today.month, 1)
-    elif period == 'year':
-        # This year - from January 1st to today
-        start_date = datetime(today.year, 1, 1)
-        end_date = datetime(today.year + 1, 1, 1)
-    else:
+    # Calculate date range based on period: the current bucket, or the one
+    # `back` buckets before it
+    if period not in SUMMARY_PERIODS:
         return jsonify({'error': 'Invalid period specified'}), 400
+    unit, back = SUMMARY_PERIODS[period]
+    start_date, end_date = buckets.bucket_range(datetime.now(), unit,
+                                                week_start())
+    for _ in range(back):
+        start_date, end_date = buckets.bucket_range(
+            start_date - timedelta(days=1), unit, week_start())
     
     logging.debug(f"Period {period} date range: {start_date} to {end_date}")
     
     user_id = session['user']['id']
     
-    # Get expense summary
-    total_expense_amount = db.session.query(func.sum(Expense.amount)).filter(
-        Expense.user_id == user_id,
-        Expense.type == 'expense',
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).scalar() or 0.0
-    
-    # Get income summary
-    total_income_amount = db.session.query(func.sum(Income.amount)).filter(
-        Income.user_id == user_id,
-        Income.date >= start_date,
-        Income.date < end_date
-    ).scalar() or 0.0
-    
-    # Get expense category distribution
+    # Get expense category distribution and counts
     category_distribution = db.session.query(
-        Expense.category, func.sum(Expense.amount)
+        DailyRollup.category,
+        func.sum(DailyRollup.total),
+        func.sum(DailyRollup.count)
     ).filter(
-        Expense.user_id == user_id,
-        Expense.type == 'expense',
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).group_by(Expense.category).all()
+        *rollup_filters(user_id, 'expense', start_date, end_date)
+    ).group_by(DailyRollup.category).all()
     
     labels = [item[0] for item in category_distribution]
     values = [float(item[1]) for item in category_distribution]
+    total_expense_amount = sum(values)
+    expense_count = sum(int(item[2]) for item in category_distribution)
     
-    # Get expense count
-    expense_count = Expense.query.filter(
-        Expense.user_id == user_id,
-        Expense.type == 'expense',
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).count()
-    
-    # Get income count
-    income_count = Income.query.filter(
-        Income.user_id == user_id,
-        Income.date >= start_date,
-        Income.date < end_date
-    ).count()
+    # Get income summary
+    total_income_amount, income_count = db.session.query(
+        func.sum(DailyRollup.total),
+        func.sum(DailyRollup.count)
+    ).filter(
+        *rollup_filters(user_id, 'income', start_date, end_date)
+    ).one()
+    total_income_amount = total_income_amount or 0.0
+    income_count = int(income_count or 0)
     
     logging.debug(f"Period {period} summary - Expenses: {total_expense_amount}, Income: {total_income_amount}")
     logging.debug(f"Period {period} counts - Expenses: {expense_count}, Income: {income_count}")
@@ -867,6 +704,7 @@ def expense_summary_api():
     return get_expense_summary()
 
 @insights_bp.route('/api/insights/top-categories', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_top_expense_categories():
     """
     Get top 5 expense categories by amount.
@@ -883,13 +721,10 @@ def get_top_expense_categories():
 
     # Get top 5 expense categories
     top_categories = db.session.query(
-        Expense.category, func.sum(Expense.amount).label('total')
+        DailyRollup.category, func.sum(DailyRollup.total).label('total')
     ).filter(
-        Expense.user_id == user_id,
-        Expense.type == 'expense',
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).group_by(Expense.category).order_by(db.desc('total')).limit(5).all()
+        *rollup_filters(user_id, 'expense', start_date, end_date)
+    ).group_by(DailyRollup.category).order_by(db.desc('total')).limit(5).all()
 
     labels = [item[0] for item in top_categories]
     values = [float(item[1]) for item in top_categories]
@@ -900,6 +735,7 @@ def get_top_expense_categories():
     })
 
 @insights_bp.route('/api/insights/top-income-categories', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_top_income_categories():
     """
     Get top 5 income categories by amount.
@@ -916,12 +752,10 @@ def get_top_income_categories():
 
     # Get top 5 income categories
     top_categories = db.session.query(
-        Income.category, func.sum(Income.amount).label('total')
+        DailyRollup.category, func.sum(DailyRollup.total).label('total')
     ).filter(
-        Income.user_id == user_id,
-        Income.date >= start_date,
-        Income.date < end_date
-    ).group_by(Income.category).order_by(db.desc('total')).limit(5).all()
+        *rollup_filters(user_id, 'income', start_date, end_date)
+    ).group_by(DailyRollup.category).order_by(db.desc('total')).limit(5).all()
 
     labels = [item[0] for item in top_categories]
     values = [float(item[1]) for item in top_categories]
@@ -932,6 +766,7 @@ def get_top_income_categories():
     })
 
 @insights_bp.route('/api/shared-insights/users', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_shared_insight_users():
     """
     Get list of users who have shared data with the current user.
@@ -942,38 +777,21 @@ def get_shared_insight_users():
     
     user_id = session['user']['id']
     
-    # Get users who shared expenses with current user
-    expense_sharers = db.session.query(
-        User.id, User.username
-    ).join(
-        Expense, User.id == Expense.user_id
-    ).join(
-        SharedExpense, SharedExpense.expense_id == Expense.id
-    ).filter(
-        SharedExpense.shared_with_id == user_id
-    ).distinct().all()
-    
-    # Get users who shared income with current user
-    income_sharers = db.session.query(
+    # Get users who shared expenses or income with current user
+    sharers = db.session.query(
         User.id, User.username
     ).join(
-        Income, User.id == Income.user_id
-    ).join(
-        SharedIncome, SharedIncome.income_id == Income.id
+        ShareVisibility, ShareVisibility.owner_id == User.id
     ).filter(
-        SharedIncome.shared_with_id == user_id
+        ShareVisibility.recipient_id == user_id
     ).distinct().all()
     
-    # Combine and deduplicate
-    all_sharers = {}
-    for user_id, username in expense_sharers + income_sharers:
-        all_sharers[user_id] = username
-    
-    result = [{"id": user_id, "username": username} for user_id, username in all_sharers.items()]
+    result = [{"id": sharer_id, "username": username} for sharer_id, username in sharers]
     
     return jsonify(result)
 
 @insights_bp.route('/api/shared-insights/summary', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_shared_insights_summary():
     """
     Get summary of shared data from a specific user.
@@ -984,177 +802,21 @@ def get_shared_insights_summary():
     
     try:
         start_date, end_date = parse_date_range()
+        sharer_id = parse_sharer_id()
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     
     user_id = session['user']['id']
-    sharer_id = request.args.get('sharer_id')
-    
-    if not sharer_id:
-        return jsonify({'error': 'No sharer ID provided'}), 400
-    
-    try:
-        sharer_id = int(sharer_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid sharer ID'}), 400
-    
-    # Process all shared expenses, including those in bulk shares
-    all_shared_expenses = []
-    
-    # Get directly shared expenses
-    direct_shared_expenses = db.session.query(Expense).join(
-        SharedExpense, SharedExpense.expense_id == Expense.id
-    ).filter(
-        Expense.user_id == sharer_id,
-        SharedExpense.shared_with_id == user_id,
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).all()
-    
-    all_shared_expenses.extend(direct_shared_expenses)
-    
-    # Get bulk shared expenses from this specific sharer
-    bulk_shares = db.session.query(SharedExpense).filter(
-        SharedExpense.shared_with_id == user_id,
-        SharedExpense.is_bulk_share == True
-    ).join(
-        Expense, Expense.id == SharedExpense.expense_id
-    ).filter(
-        Expense.user_id == sharer_id
-    ).all()
-    
-    # Process each bulk share
-    for bulk_share in bulk_shares:
-        if bulk_share.bulk_expense_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_expense_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_expenses = db.session.query(Expense).filter(
-                        Expense.id.in_(bulk_ids),
-                        Expense.user_id == sharer_id,
-                        Expense.date >= start_date,
-                        Expense.date < end_date
-                    ).all()
-                    all_shared_expenses.extend(bulk_expenses)
-            except Exception as e:
-                logging.error(f"Error processing bulk expense share {bulk_share.id}: {str(e)}")
-    
-    # Process all shared incomes, including those in bulk shares
-    all_shared_incomes = []
-    
-    # Get directly shared incomes
-    direct_shared_incomes = db.session.query(Income).join(
-        SharedIncome, SharedIncome.income_id == Income.id
-    ).filter(
-        Income.user_id == sharer_id,
-        SharedIncome.shared_with_id == user_id,
-        Income.date >= start_date,
-        Income.date < end_date
-    ).all()
-    
-    all_shared_incomes.extend(direct_shared_incomes)
-    
-    # Get bulk shared incomes from this specific sharer
-    bulk_income_shares = db.session.query(SharedIncome).filter(
-        SharedIncome.shared_with_id == user_id,
-        SharedIncome.is_bulk_share == True
-    ).join(
-        Income, Income.id == SharedIncome.income_id
-    ).filter(
-        Income.user_id == sharer_id
-    ).all()
-    
-    # Process each bulk income share
-    for bulk_share in bulk_income_shares:
-        if bulk_share.bulk_income_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_income_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_incomes = db.session.query(Income).filter(
-                        Income.id.in_(bulk_ids),
-                        Income.user_id == sharer_id,
-                        Income.date >= start_date,
-                        Income.date < end_date
-                    ).all()
-                    all_shared_incomes.extend(bulk_incomes)
-            except Exception as e:
-                logging.error(f"Error processing bulk income share {bulk_share.id}: {str(e)}")
-    
-    # Deduplicate expenses and incomes
-    unique_expense_ids = set()
-    unique_expenses = []
-    for expense in all_shared_expenses:
-        if expense.id not in unique_expense_ids:
-            unique_expense_ids.add(expense.id)
-            unique_expenses.append(expense)
-    
-    unique_income_ids = set()
-    unique_incomes = []
-    for income in all_shared_incomes:
-        if income.id not in unique_income_ids:
-            unique_income_ids.add(income.id)
-            unique_incomes.append(income)
-    
-    # Calculate expense summary
-    total_expense_entries = len(unique_expenses)
-    total_expense_amount = sum(float(expense.amount) for expense in unique_expenses)
-    
-    # Calculate expense category distribution
-    expense_category_totals = {}
-    for expense in unique_expenses:
-        category = expense.category
-        if category not in expense_category_totals:
-            expense_category_totals[category] = 0
-        expense_category_totals[category] += float(expense.amount)
-    
-    expense_labels = list(expense_category_totals.keys())
-    expense_values = [expense_category_totals[category] for category in expense_labels]
-    
-    # Calculate income summary
-    total_income_entries = len(unique_incomes)
-    total_income_amount = sum(float(income.amount) for income in unique_incomes)
-    
-    # Calculate income category distribution
-    income_category_totals = {}
-    for income in unique_incomes:
-        category = income.category
-        if category not in income_category_totals:
-            income_category_totals[category] = 0
-        income_category_totals[category] += float(income.amount)
-    
-    income_labels = list(income_category_totals.keys())
-    income_values = [income_category_totals[category] for category in income_labels]
     
     # Get sharer's username
     sharer = User.query.get(sharer_id)
     sharer_name = sharer.username if sharer else "Unknown User"
     
-    return jsonify({
-        'expense': {
-            'totalEntries': total_expense_entries,
-            'totalAmount': total_expense_amount,
-            'categoryDistribution': {'labels': expense_labels, 'values': expense_values}
-        },
-        'income': {
-            'totalEntries': total_income_entries,
-            'totalAmount': total_income_amount,
-            'categoryDistribution': {'labels': income_labels, 'values': income_values}
-        },
-        'sharer': {
-            'id': sharer_id,
-            'name': sharer_name
-        },
-        'debug': {
-            'direct_expenses': len(direct_shared_expenses),
-            'bulk_expenses': len(all_shared_expenses) - len(direct_shared_expenses),
-            'unique_expenses': len(unique_expenses),
-            'direct_incomes': len(direct_shared_incomes),
-            'bulk_incomes': len(all_shared_incomes) - len(direct_shared_incomes),
-            'unique_incomes': len(unique_incomes)
-        }
-    })
+    return jsonify(shared_summary_response(user_id, start_date, end_date,
+                                           sharer_id, sharer_name))
 
 @insights_bp.route('/api/shared-insights/top-income-categories', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_shared_insights_top_income_categories():
     """
     Get top income categories from shared data.
@@ -1164,98 +826,15 @@ def get_shared_insights_top_income_categories():
     
     try:
         start_date, end_date = parse_date_range()
+        sharer_id = parse_sharer_id()
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     
-    user_id = session['user']['id']
-    sharer_id = request.args.get('sharer_id')
-    
-    if not sharer_id:
-        return jsonify({'error': 'No sharer ID provided'}), 400
-    
-    try:
-        sharer_id = int(sharer_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid sharer ID'}), 400
-    
-    # Process all shared incomes, including those in bulk shares
-    all_shared_incomes = []
-    
-    # Get directly shared incomes
-    direct_shared_incomes = db.session.query(Income).join(
-        SharedIncome, SharedIncome.income_id == Income.id
-    ).filter(
-        Income.user_id == sharer_id,
-        SharedIncome.shared_with_id == user_id,
-        Income.date >= start_date,
-        Income.date < end_date
-    ).all()
-    
-    all_shared_incomes.extend(direct_shared_incomes)
-    
-    # Get bulk shared incomes from this specific sharer
-    bulk_income_shares = db.session.query(SharedIncome).filter(
-        SharedIncome.shared_with_id == user_id,
-        SharedIncome.is_bulk_share == True
-    ).join(
-        Income, Income.id == SharedIncome.income_id
-    ).filter(
-        Income.user_id == sharer_id
-    ).all()
-    
-    # Process each bulk income share
-    for bulk_share in bulk_income_shares:
-        if bulk_share.bulk_income_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_income_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_incomes = db.session.query(Income).filter(
-                        Income.id.in_(bulk_ids),
-                        Income.user_id == sharer_id,
-                        Income.date >= start_date,
-                        Income.date < end_date
-                    ).all()
-                    all_shared_incomes.extend(bulk_incomes)
-            except Exception as e:
-                logging.error(f"Error processing bulk income share {bulk_share.id}: {str(e)}")
-    
-    # Deduplicate incomes
-    unique_income_ids = set()
-    unique_incomes = []
-    for income in all_shared_incomes:
-        if income.id not in unique_income_ids:
-            unique_income_ids.add(income.id)
-            unique_incomes.append(income)
-    
-    # Calculate category distribution
-    category_totals = {}
-    for income in unique_incomes:
-        category = income.category
-        if category not in category_totals:
-            category_totals[category] = 0
-        category_totals[category] += float(income.amount)
-    
-    # Sort categories by total amount
-    sorted_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
-    
-    # Take top 10 categories
-    top_categories = sorted_categories[:10]
-    
-    # Format results
-    labels = [category for category, _ in top_categories]
-    values = [total for _, total in top_categories]
-    
-    return jsonify({
-        'labels': labels,
-        'values': values,
-        'debug': {
-            'direct_incomes': len(direct_shared_incomes),
-            'bulk_incomes': len(all_shared_incomes) - len(direct_shared_incomes),
-            'unique_incomes': len(unique_incomes)
-        }
-    })
+    return jsonify(shared_top_categories_response(
+        'income', session['user']['id'], start_date, end_date, sharer_id))
 
 @insights_bp.route('/api/shared-insights/top-categories', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_shared_insights_top_categories():
     """
     Get top categories from shared data.
@@ -1265,98 +844,15 @@ def get_shared_insights_top_categories():
     
     try:
         start_date, end_date = parse_date_range()
+        sharer_id = parse_sharer_id()
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     
-    user_id = session['user']['id']
-    sharer_id = request.args.get('sharer_id')
-    
-    if not sharer_id:
-        return jsonify({'error': 'No sharer ID provided'}), 400
-    
-    try:
-        sharer_id = int(sharer_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid sharer ID'}), 400
-    
-    # Process all shared expenses, including those in bulk shares
-    all_shared_expenses = []
-    
-    # Get directly shared expenses
-    direct_shared_expenses = db.session.query(Expense).join(
-        SharedExpense, SharedExpense.expense_id == Expense.id
-    ).filter(
-        Expense.user_id == sharer_id,
-        SharedExpense.shared_with_id == user_id,
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).all()
-    
-    all_shared_expenses.extend(direct_shared_expenses)
-    
-    # Get bulk shared expenses from this specific sharer
-    bulk_shares = db.session.query(SharedExpense).filter(
-        SharedExpense.shared_with_id == user_id,
-        SharedExpense.is_bulk_share == True
-    ).join(
-        Expense, Expense.id == SharedExpense.expense_id
-    ).filter(
-        Expense.user_id == sharer_id
-    ).all()
-    
-    # Process each bulk share
-    for bulk_share in bulk_shares:
-        if bulk_share.bulk_expense_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_expense_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_expenses = db.session.query(Expense).filter(
-                        Expense.id.in_(bulk_ids),
-                        Expense.user_id == sharer_id,
-                        Expense.date >= start_date,
-                        Expense.date < end_date
-                    ).all()
-                    all_shared_expenses.extend(bulk_expenses)
-            except Exception as e:
-                logging.error(f"Error processing bulk expense share {bulk_share.id}: {str(e)}")
-    
-    # Deduplicate expenses
-    unique_expense_ids = set()
-    unique_expenses = []
-    for expense in all_shared_expenses:
-        if expense.id not in unique_expense_ids:
-            unique_expense_ids.add(expense.id)
-            unique_expenses.append(expense)
-    
-    # Calculate category distribution
-    category_totals = {}
-    for expense in unique_expenses:
-        category = expense.category
-        if category not in category_totals:
-            category_totals[category] = 0
-        category_totals[category] += float(expense.amount)
-    
-    # Sort categories by total amount
-    sorted_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
-    
-    # Take top 10 categories
-    top_categories = sorted_categories[:10]
-    
-    # Format results
-    labels = [category for category, _ in top_categories]
-    values = [total for _, total in top_categories]
-    
-    return jsonify({
-        'labels': labels,
-        'values': values,
-        'debug': {
-            'direct_expenses': len(direct_shared_expenses),
-            'bulk_expenses': len(all_shared_expenses) - len(direct_shared_expenses),
-            'unique_expenses': len(unique_expenses)
-        }
-    })
+    return jsonify(shared_top_categories_response(
+        'expense', session['user']['id'], start_date, end_date, sharer_id))
 
 @insights_bp.route('/api/shared-insights/by-month', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_shared_insights_by_month():
     """
     Get monthly data for shared expenses and incomes.
@@ -1366,149 +862,15 @@ def get_shared_insights_by_month():
     
     try:
         start_date, end_date = parse_date_range()
+        sharer_id = parse_sharer_id()
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     
-    user_id = session['user']['id']
-    sharer_id = request.args.get('sharer_id')
-    data_type = request.args.get('type', 'expense')  # 'expense' or 'income'
-    
-    if not sharer_id:
-        return jsonify({'error': 'No sharer ID provided'}), 400
-    
-    try:
-        sharer_id = int(sharer_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid sharer ID'}), 400
-    
-    # Determine which model and shared model to use based on data_type
-    if data_type == 'expense':
-        # Process all shared expenses, including those in bulk shares
-        all_shared_items = []
-        
-        # Get directly shared expenses
-        direct_shared_items = db.session.query(Expense).join(
-            SharedExpense, SharedExpense.expense_id == Expense.id
-        ).filter(
-            Expense.user_id == sharer_id,
-            SharedExpense.shared_with_id == user_id,
-            Expense.date >= start_date,
-            Expense.date < end_date
-        ).all()
-        
-        all_shared_items.extend(direct_shared_items)
-        
-        # Get bulk shared expenses from this specific sharer
-        bulk_shares = db.session.query(SharedExpense).filter(
-            SharedExpense.shared_with_id == user_id,
-            SharedExpense.is_bulk_share == True
-        ).join(
-            Expense, Expense.id == SharedExpense.expense_id
-        ).filter(
-            Expense.user_id == sharer_id
-        ).all()
-        
-        # Process each bulk share
-        for bulk_share in bulk_shares:
-            if bulk_share.bulk_expense_ids:
-                try:
-                    bulk_ids = [int(id) for id in bulk_share.bulk_expense_ids.split(',') if id.strip()]
-                    if bulk_ids:
-                        bulk_items = db.session.query(Expense).filter(
-                            Expense.id.in_(bulk_ids),
-                            Expense.user_id == sharer_id,
-                            Expense.date >= start_date,
-                            Expense.date < end_date
-                        ).all()
-                        all_shared_items.extend(bulk_items)
-                except Exception as e:
-                    logging.error(f"Error processing bulk expense share {bulk_share.id}: {str(e)}")
-    else:
-        # Process all shared incomes, including those in bulk shares
-        all_shared_items = []
-        
-        # Get directly shared incomes
-        direct_shared_items = db.session.query(Income).join(
-            SharedIncome, SharedIncome.income_id == Income.id
-        ).filter(
-            Income.user_id == sharer_id,
-            SharedIncome.shared_with_id == user_id,
-            Income.date >= start_date,
-            Income.date < end_date
-        ).all()
-        
-        all_shared_items.extend(direct_shared_items)
-        
-        # Get bulk shared incomes from this specific sharer
-        bulk_shares = db.session.query(SharedIncome).filter(
-            SharedIncome.shared_with_id == user_id,
-            SharedIncome.is_bulk_share == True
-        ).join(
-            Income, Income.id == SharedIncome.income_id
-        ).filter(
-            Income.user_id == sharer_id
-        ).all()
-        
-        # Process each bulk share
-        for bulk_share in bulk_shares:
-            if bulk_share.bulk_income_ids:
-                try:
-                    bulk_ids = [int(id) for id in bulk_share.bulk_income_ids.split(',') if id.strip()]
-                    if bulk_ids:
-                        bulk_items = db.session.query(Income).filter(
-                            Income.id.in_(bulk_ids),
-                            Income.user_id == sharer_id,
-                            Income.date >= start_date,
-                            Income.date < end_date
-                        ).all()
-                        all_shared_items.extend(bulk_items)
-                except Exception as e:
-                    logging.error(f"Error processing bulk income share {bulk_share.id}: {str(e)}")
-    
-    # Deduplicate items
-    unique_item_ids = set()
-    unique_items = []
-    for item in all_shared_items:
-        if item.id not in unique_item_ids:
-            unique_item_ids.add(item.id)
-            unique_items.append(item)
-    
-    # Group by month
-    data_by_month = {}
-    for item in unique_items:
-        year = item.date.year
-        month = item.date.month
-        month_key = f"{year}-{month:02d}"
-        
-        if month_key not in data_by_month:
-            data_by_month[month_key] = 0
-        
-        data_by_month[month_key] += float(item.amount)
-    
-    # Format results
-    months = []
-    values = []
-    
-    # Sort month keys
-    sorted_months = sorted(data_by_month.keys())
-    
-    for month_key in sorted_months:
-        year, month = month_key.split('-')
-        month_date = datetime(int(year), int(month), 1)
-        month_name = month_date.strftime('%b %Y')  # e.g. "Jan 2023"
-        months.append(month_name)
-        values.append(data_by_month[month_key])
-    
-    return jsonify({
-        'labels': months,
-        'values': values,
-        'debug': {
-            'data_type': data_type,
-            'unique_items': len(unique_items)
-        }
-    })
+    return jsonify(shared_by_month_response(
+        session['user']['id'], start_date, end_date, sharer_id))
 
 @insights_bp.route('/api/shared-insights/comparison', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_shared_insights_comparison():
     """
     Get date-wise income & expense comparison for shared data.
@@ -1518,159 +880,20 @@ def get_shared_insights_comparison():
     
     try:
         start_date, end_date = parse_date_range()
+        sharer_id = parse_sharer_id()
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     
-    user_id = session['user']['id']
-    sharer_id = request.args.get('sharer_id')
-    
-    if not sharer_id:
-        return jsonify({'error': 'No sharer ID provided'}), 400
-    
-    try:
-        sharer_id = int(sharer_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid sharer ID'}), 400
-    
-    # Process all shared expenses, including those in bulk shares
-    all_shared_expenses = []
-    
-    # Get directly shared expenses
-    direct_shared_expenses = db.session.query(Expense).join(
-        SharedExpense, SharedExpense.expense_id == Expense.id
-    ).filter(
-        Expense.user_id == sharer_id,
-        SharedExpense.shared_with_id == user_id,
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).all()
-    
-    all_shared_expenses.extend(direct_shared_expenses)
-    
-    # Get bulk shared expenses from this specific sharer
-    bulk_shares = db.session.query(SharedExpense).filter(
-        SharedExpense.shared_with_id == user_id,
-        SharedExpense.is_bulk_share == True
-    ).join(
-        Expense, Expense.id == SharedExpense.expense_id
-    ).filter(
-        Expense.user_id == sharer_id
-    ).all()
-    
-    # Process each bulk share
-    for bulk_share in bulk_shares:
-        if bulk_share.bulk_expense_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_expense_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_expenses = db.session.query(Expense).filter(
-                        Expense.id.in_(bulk_ids),
-                        Expense.user_id == sharer_id,
-                        Expense.date >= start_date,
-                        Expense.date < end_date
-                    ).all()
-                    all_shared_expenses.extend(bulk_expenses)
-            except Exception as e:
-                logging.error(f"Error processing bulk expense share {bulk_share.id}: {str(e)}")
-    
-    # Process all shared incomes, including those in bulk shares
-    all_shared_incomes = []
-    
-    # Get directly shared incomes
-    direct_shared_incomes = db.session.query(Income).join(
-        SharedIncome, SharedIncome.income_id == Income.id
-    ).filter(
-        Income.user_id == sharer_id,
-        SharedIncome.shared_with_id == user_id,
-        Income.date >= start_date,
-        Income.date < end_date
-    ).all()
-    
-    all_shared_incomes.extend(direct_shared_incomes)
-    
-    # Get bulk shared incomes from this specific sharer
-    bulk_income_shares = db.session.query(SharedIncome).filter(
-        SharedIncome.shared_with_id == user_id,
-        SharedIncome.is_bulk_share == True
-    ).join(
-        Income, Income.id == SharedIncome.income_id
-    ).filter(
-        Income.user_id == sharer_id
-    ).all()
-    
-    # Process each bulk income share
-    for bulk_share in bulk_income_shares:
-        if bulk_share.bulk_income_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_income_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_incomes = db.session.query(Income).filter(
-                        Income.id.in_(bulk_ids),
-                        Income.user_id == sharer_id,
-                        Income.date >= start_date,
-                        Income.date < end_date
-                    ).all()
-                    all_shared_incomes.extend(bulk_incomes)
-            except Exception as e:
-                logging.error(f"Error processing bulk income share {bulk_share.id}: {str(e)}")
-    
-    # Deduplicate expenses and incomes
-    unique_expense_ids = set()
-    unique_expenses = []
-    for expense in all_shared_expenses:
-        if expense.id not in unique_expense_ids:
-            unique_expense_ids.add(expense.id)
-            unique_expenses.append(expense)
-    
-    unique_income_ids = set()
-    unique_incomes = []
-    for income in all_shared_incomes:
-        if income.id not in unique_income_ids:
-            unique_income_ids.add(income.id)
-            unique_incomes.append(income)
-    
-    # Group expenses by date
-    expense_by_date = {}
-    for expense in unique_expenses:
-        date_str = expense.date.strftime('%Y-%m-%d')
-        if date_str not in expense_by_date:
-            expense_by_date[date_str] = 0
-        expense_by_date[date_str] += float(expense.amount)
-    
-    # Group incomes by date
-    income_by_date = {}
-    for income in unique_incomes:
-        date_str = income.date.strftime('%Y-%m-%d')
-        if date_str not in income_by_date:
-            income_by_date[date_str] = 0
-        income_by_date[date_str] += float(income.amount)
-    
-    # Combine all dates
-    all_dates = sorted(set(list(expense_by_date.keys()) + list(income_by_date.keys())))
-    
-    # Create expense and income arrays
-    expense_values = [expense_by_date.get(date_str, 0) for date_str in all_dates]
-    income_values = [income_by_date.get(date_str, 0) for date_str in all_dates]
-    
-    return jsonify({
-        'labels': all_dates,
-        'income': income_values,
-        'expense': expense_values,
-        'series': [
-            {'name': 'Income', 'data': income_values},
-            {'name': 'Expenses', 'data': expense_values}
-        ],
-        'debug': {
-            'direct_expenses': len(direct_shared_expenses),
-            'bulk_expenses': len(all_shared_expenses) - len(direct_shared_expenses),
-            'unique_expenses': len(unique_expenses),
-            'direct_incomes': len(direct_shared_incomes),
-            'bulk_incomes': len(all_shared_incomes) - len(direct_shared_incomes),
-            'unique_incomes': len(unique_incomes)
-        }
-    })
+    result = shared_comparison_response(session['user']['id'], start_date,
+                                        end_date, sharer_id)
+    result['series'] = [
+        {'name': 'Income', 'data': result['income']},
+        {'name': 'Expenses', 'data': result['expense']}
+    ]
+    return jsonify(result)
 
 @insights_bp.route('/api/shared-insights/top-categories-all', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_shared_insights_top_categories_all():
     """
     Get top categories from all shared data combined.
@@ -1683,80 +906,11 @@ def get_shared_insights_top_categories_all():
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     
-    user_id = session['user']['id']
-    
-    # Process all shared expenses, including those in bulk shares
-    all_shared_expenses = []
-    
-    # Get directly shared expenses
-    direct_shared_expenses = db.session.query(Expense).join(
-        SharedExpense, SharedExpense.expense_id == Expense.id
-    ).filter(
-        SharedExpense.shared_with_id == user_id,
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).all()
-    
-    all_shared_expenses.extend(direct_shared_expenses)
-    
-    # Get bulk shared expenses
-    bulk_shares = db.session.query(SharedExpense).filter(
-        SharedExpense.shared_with_id == user_id,
-        SharedExpense.is_bulk_share == True
-    ).all()
-    
-    # Process each bulk share
-    for bulk_share in bulk_shares:
-        if bulk_share.bulk_expense_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_expense_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_expenses = db.session.query(Expense).filter(
-                        Expense.id.in_(bulk_ids),
-                        Expense.date >= start_date,
-                        Expense.date < end_date
-                    ).all()
-                    all_shared_expenses.extend(bulk_expenses)
-            except Exception as e:
-                logging.error(f"Error processing bulk expense share {bulk_share.id}: {str(e)}")
-    
-    # Deduplicate expenses
-    unique_expense_ids = set()
-    unique_expenses = []
-    for expense in all_shared_expenses:
-        if expense.id not in unique_expense_ids:
-            unique_expense_ids.add(expense.id)
-            unique_expenses.append(expense)
-    
-    # Calculate category distribution
-    category_totals = {}
-    for expense in unique_expenses:
-        category = expense.category
-        if category not in category_totals:
-            category_totals[category] = 0
-        category_totals[category] += float(expense.amount)
-    
-    # Sort categories by total amount
-    sorted_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
-    
-    # Take top 10 categories
-    top_categories = sorted_categories[:10]
-    
-    # Format results
-    labels = [category for category, _ in top_categories]
-    values = [total for _, total in top_categories]
-    
-    return jsonify({
-        'labels': labels,
-        'values': values,
-        'debug': {
-            'direct_expenses': len(direct_shared_expenses),
-            'bulk_expenses': len(all_shared_expenses) - len(direct_shared_expenses),
-            'unique_expenses': len(unique_expenses)
-        }
-    })
+    return jsonify(shared_top_categories_response(
+        'expense', session['user']['id'], start_date, end_date))
 
 @insights_bp.route('/api/shared-insights/top-income-categories-all', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_shared_insights_top_income_categories_all():
     """
     Get top income categories from all shared data combined.
@@ -1769,80 +923,11 @@ def get_shared_insights_top_income_categories_all():
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     
-    user_id = session['user']['id']
-    
-    # Process all shared incomes, including those in bulk shares
-    all_shared_incomes = []
-    
-    # Get directly shared incomes
-    direct_shared_incomes = db.session.query(Income).join(
-        SharedIncome, SharedIncome.income_id == Income.id
-    ).filter(
-        SharedIncome.shared_with_id == user_id,
-        Income.date >= start_date,
-        Income.date < end_date
-    ).all()
-    
-    all_shared_incomes.extend(direct_shared_incomes)
-    
-    # Get bulk shared incomes
-    bulk_income_shares = db.session.query(SharedIncome).filter(
-        SharedIncome.shared_with_id == user_id,
-        SharedIncome.is_bulk_share == True
-    ).all()
-    
-    # Process each bulk income share
-    for bulk_share in bulk_income_shares:
-        if bulk_share.bulk_income_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_income_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_incomes = db.session.query(Income).filter(
-                        Income.id.in_(bulk_ids),
-                        Income.date >= start_date,
-                        Income.date < end_date
-                    ).all()
-                    all_shared_incomes.extend(bulk_incomes)
-            except Exception as e:
-                logging.error(f"Error processing bulk income share {bulk_share.id}: {str(e)}")
-    
-    # Deduplicate incomes
-    unique_income_ids = set()
-    unique_incomes = []
-    for income in all_shared_incomes:
-        if income.id not in unique_income_ids:
-            unique_income_ids.add(income.id)
-            unique_incomes.append(income)
-    
-    # Calculate category distribution
-    category_totals = {}
-    for income in unique_incomes:
-        category = income.category
-        if category not in category_totals:
-            category_totals[category] = 0
-        category_totals[category] += float(income.amount)
-    
-    # Sort categories by total amount
-    sorted_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
-    
-    # Take top 10 categories
-    top_categories = sorted_categories[:10]
-    
-    # Format results
-    labels = [category for category, _ in top_categories]
-    values = [total for _, total in top_categories]
-    
-    return jsonify({
-        'labels': labels,
-        'values': values,
-        'debug': {
-            'direct_incomes': len(direct_shared_incomes),
-            'bulk_incomes': len(all_shared_incomes) - len(direct_shared_incomes),
-            'unique_incomes': len(unique_incomes)
-        }
-    })
+    return jsonify(shared_top_categories_response(
+        'income', session['user']['id'], start_date, end_date))
 
 @insights_bp.route('/api/shared-insights/comparison-all', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_shared_insights_comparison_all():
     """
     Get date-wise income & expense comparison for all shared data combined.
@@ -1855,129 +940,8 @@ def get_shared_insights_comparison_all():
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     
-    user_id = session['user']['id']
-    
-    # Process all shared expenses, including those in bulk shares
-    all_shared_expenses = []
-    
-    # Get directly shared expenses
-    direct_shared_expenses = db.session.query(Expense).join(
-        SharedExpense, SharedExpense.expense_id == Expense.id
-    ).filter(
-        SharedExpense.shared_with_id == user_id,
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).all()
-    
-    all_shared_expenses.extend(direct_shared_expenses)
-    
-    # Get bulk shared expenses
-    bulk_shares = db.session.query(SharedExpense).filter(
-        SharedExpense.shared_with_id == user_id,
-        SharedExpense.is_bulk_share == True
-    ).all()
-    
-    # Process each bulk share
-    for bulk_share in bulk_shares:
-        if bulk_share.bulk_expense_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_expense_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_expenses = db.session.query(Expense).filter(
-                        Expense.id.in_(bulk_ids),
-                        Expense.date >= start_date,
-                        Expense.date < end_date
-                    ).all()
-                    all_shared_expenses.extend(bulk_expenses)
-            except Exception as e:
-                logging.error(f"Error processing bulk expense share {bulk_share.id}: {str(e)}")
-    
-    # Process all shared incomes, including those in bulk shares
-    all_shared_incomes = []
-    
-    # Get directly shared incomes
-    direct_shared_incomes = db.session.query(Income).join(
-        SharedIncome, SharedIncome.income_id == Income.id
-    ).filter(
-        SharedIncome.shared_with_id == user_id,
-        Income.date >= start_date,
-        Income.date < end_date
-    ).all()
-    
-    all_shared_incomes.extend(direct_shared_incomes)
-    
-    # Get bulk shared incomes
-    bulk_income_shares = db.session.query(SharedIncome).filter(
-        SharedIncome.shared_with_id == user_id,
-        SharedIncome.is_bulk_share == True
-    ).all()
-    
-    # Process each bulk income share
-    for bulk_share in bulk_income_shares:
-        if bulk_share.bulk_income_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_income_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_incomes = db.session.query(Income).filter(
-                        Income.id.in_(bulk_ids),
-                        Income.date >= start_date,
-                        Income.date < end_date
-                    ).all()
-                    all_shared_incomes.extend(bulk_incomes)
-            except Exception as e:
-                logging.error(f"Error processing bulk income share {bulk_share.id}: {str(e)}")
-    
-    # Deduplicate expenses and incomes
-    unique_expense_ids = set()
-    unique_expenses = []
-    for expense in all_shared_expenses:
-        if expense.id not in unique_expense_ids:
-            unique_expense_ids.add(expense.id)
-            unique_expenses.append(expense)
-    
-    unique_income_ids = set()
-    unique_incomes = []
-    for income in all_shared_incomes:
-        if income.id not in unique_income_ids:
-            unique_income_ids.add(income.id)
-            unique_incomes.append(income)
-    
-    # Group expenses by date
-    expense_by_date = {}
-    for expense in unique_expenses:
-        date_str = expense.date.strftime('%Y-%m-%d')
-        if date_str not in expense_by_date:
-            expense_by_date[date_str] = 0
-        expense_by_date[date_str] += float(expense.amount)
-    
-    # Group incomes by date
-    income_by_date = {}
-    for income in unique_incomes:
-        date_str = income.date.strftime('%Y-%m-%d')
-        if date_str not in income_by_date:
-            income_by_date[date_str] = 0
-        income_by_date[date_str] += float(income.amount)
-    
-    # Combine all dates
-    all_dates = sorted(set(list(expense_by_date.keys()) + list(income_by_date.keys())))
-    
-    # Create expense and income arrays
-    expense_values = [expense_by_date.get(date_str, 0) for date_str in all_dates]
-    income_values = [income_by_date.get(date_str, 0) for date_str in all_dates]
-    
-    return jsonify({
-        'labels': all_dates,
-        'income': income_values,
-        'expense': expense_values,
-        'debug': {
-            'direct_expenses': len(direct_shared_expenses),
-            'bulk_expenses': len(all_shared_expenses) - len(direct_shared_expenses),
-            'unique_expenses': len(unique_expenses),
-            'direct_incomes': len(direct_shared_incomes),
-            'bulk_incomes': len(all_shared_incomes) - len(direct_shared_incomes),
-            'unique_incomes': len(unique_incomes)
-        }
-    })
+    return jsonify(shared_comparison_response(session['user']['id'],
+                                              start_date, end_date))
 
 @insights_bp.route('/api/shared-insights/raw-data', methods=['GET'])
 def get_shared_insights_raw_data():
@@ -1995,193 +959,51 @@ def get_shared_insights_raw_data():
     user_id = session['user']['id']
     sharer_id = request.args.get('sharer_id')
     
-    # Get all shared expenses
-    all_shared_expenses = []
-    
-    # Direct shared expenses query
-    direct_expenses_query = db.session.query(
-        Expense.id, 
-        Expense.amount, 
-        Expense.category, 
-        Expense.date,
-        Expense.user_id.label('sharer_id'),
-        SharedExpense.id.label('share_id'),
-        SharedExpense.is_bulk_share,
-        SharedExpense.bulk_expense_ids
-    ).join(
-        SharedExpense, SharedExpense.expense_id == Expense.id
-    ).filter(
-        SharedExpense.shared_with_id == user_id,
-        Expense.date >= start_date,
-        Expense.date < end_date
-    )
-    
     # Filter by sharer if specified
     if sharer_id and sharer_id != 'all':
         try:
             sharer_id = int(sharer_id)
-            direct_expenses_query = direct_expenses_query.filter(Expense.user_id == sharer_id)
         except ValueError:
-            pass
-    
-    direct_expenses = direct_expenses_query.all()
+            sharer_id = None
+    else:
+        sharer_id = None
     
-    # Convert to dictionaries for JSON serialization
     result = []
-    for expense in direct_expenses:
-        expense_dict = {
-            'id': expense.id,
-            'amount': float(expense.amount),
-            'category': expense.category,
-            'date': expense.date.strftime('%Y-%m-%d'),
-            'sharer_id': expense.sharer_id,
-            'share_id': expense.share_id,
-            'is_bulk_share': expense.is_bulk_share,
-            'type': 'expense'
-        }
-        
-        if expense.is_bulk_share and expense.bulk_expense_ids:
-            expense_dict['bulk_ids'] = expense.bulk_expense_ids
-        
-        result.append(expense_dict)
-    
-    # Get all bulk shared expenses
-    bulk_shares = db.session.query(SharedExpense).filter(
-        SharedExpense.shared_with_id == user_id,
-        SharedExpense.is_bulk_share == True
-    )
-    
-    if sharer_id and sharer_id != 'all':
-        bulk_shares = bulk_shares.join(Expense, Expense.id == SharedExpense.expense_id).filter(Expense.user_id == sharer_id)
-    
-    bulk_shares = bulk_shares.all()
-    
-    # Add bulk shared expenses to result
-    for bulk_share in bulk_shares:
-        if bulk_share.bulk_expense_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_expense_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_expenses = db.session.query(
-                        Expense.id, 
-                        Expense.amount, 
-                        Expense.category, 
-                        Expense.date,
-                        Expense.user_id.label('sharer_id')
-                    ).filter(
-                        Expense.id.in_(bulk_ids),
-                        Expense.date >= start_date,
-                        Expense.date < end_date
-                    ).all()
-                    
-                    for expense in bulk_expenses:
-                        # Check if this expense is already in the result (to avoid duplicates)
-                        if not any(e['id'] == expense.id and e['type'] == 'expense' for e in result):
-                            expense_dict = {
-                                'id': expense.id,
-                                'amount': float(expense.amount),
-                                'category': expense.category,
-                                'date': expense.date.strftime('%Y-%m-%d'),
-                                'sharer_id': expense.sharer_id,
-                                'share_id': bulk_share.id,
-                                'is_bulk_share': True,
-                                'from_bulk_share': True,
-                                'type': 'expense'
-                            }
-                            result.append(expense_dict)
-            except Exception as e:
-                logging.error(f"Error processing bulk expense share {bulk_share.id}: {str(e)}")
-    
-    # Similar process for incomes
-    direct_incomes_query = db.session.query(
-        Income.id, 
-        Income.amount, 
-        Income.category, 
-        Income.date,
-        Income.user_id.label('sharer_id'),
-        SharedIncome.id.label('share_id'),
-        SharedIncome.is_bulk_share,
-        SharedIncome.bulk_income_ids
-    ).join(
-        SharedIncome, SharedIncome.income_id == Income.id
-    ).filter(
-        SharedIncome.shared_with_id == user_id,
-        Income.date >= start_date,
-        Income.date < end_date
-    )
-    
-    if sharer_id and sharer_id != 'all':
-        direct_incomes_query = direct_incomes_query.filter(Income.user_id == sharer_id)
-    
-    direct_incomes = direct_incomes_query.all()
-    
-    for income in direct_incomes:
-        income_dict = {
-            'id': income.id,
-            'amount': float(income.amount),
-            'category': income.category,
-            'date': income.date.strftime('%Y-%m-%d'),
-            'sharer_id': income.sharer_id,
-            'share_id': income.share_id,
-            'is_bulk_share': income.is_bulk_share,
-            'type': 'income'
-        }
-        
-        if income.is_bulk_share and income.bulk_income_ids:
-            income_dict['bulk_ids'] = income.bulk_income_ids
-        
-        result.append(income_dict)
-    
-    # Get all bulk shared incomes
-    bulk_income_shares = db.session.query(SharedIncome).filter(
-        SharedIncome.shared_with_id == user_id,
-        SharedIncome.is_bulk_share == True
-    )
-    
-    if sharer_id and sharer_id != 'all':
-        bulk_income_shares = bulk_income_shares.join(Income, Income.id == SharedIncome.income_id).filter(Income.user_id == sharer_id)
-    
-    bulk_income_shares = bulk_income_shares.all()
-    
-    # Add bulk shared incomes to result
-    for bulk_share in bulk_income_shares:
-        if bulk_share.bulk_income_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_income_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_incomes = db.session.query(
-                        Income.id, 
-                        Income.amount, 
-                        Income.category, 
-                        Income.date,
-                        Income.user_id.label('sharer_id')
-                    ).filter(
-                        Income.id.in_(bulk_ids),
-                        Income.date >= start_date,
-                        Income.date < end_date
-                    ).all()
-                    
-                    for income in bulk_incomes:
-                        # Check if this income is already in the result (to avoid duplicates)
-                        if not any(i['id'] == income.id and i['type'] == 'income' for i in result):
-                            income_dict = {
-                                'id': income.id,
-                                'amount': float(income.amount),
-                                'category': income.category,
-                                'date': income.date.strftime('%Y-%m-%d'),
-                                'sharer_id': income.sharer_id,
-                                'share_id': bulk_share.id,
-                                'is_bulk_share': True,
-                                'from_bulk_share': True,
-                                'type': 'income'
-                            }
-                            result.append(income_dict)
-            except Exception as e:
-                logging.error(f"Error processing bulk income share {bulk_share.id}: {str(e)}")
+    for kind, model in (('expense', Expense), ('income', Income)):
+        rows = db.session.query(
+            model.id,
+            model.amount,
+            model.category,
+            model.date,
+            ShareVisibility.owner_id,
+            ShareVisibility.share_count
+        ).join(
+            ShareVisibility,
+            and_(ShareVisibility.item_id == model.id, ShareVisibility.kind == kind)
+        ).filter(
+            ShareVisibility.recipient_id == user_id,
+            model.date >= start_date,
+            model.date < end_date
+        )
+        if sharer_id is not None:
+            rows = rows.filter(ShareVisibility.owner_id == sharer_id)
+        
+        # Convert to dictionaries for JSON serialization
+        for row in rows.all():
+            result.append({
+                'id': row.id,
+                'amount': float(row.amount),
+                'category': row.category,
+                'date': row.date.strftime('%Y-%m-%d'),
+                'sharer_id': row.owner_id,
+                'share_count': row.share_count,
+                'type': kind
+            })
     
     return jsonify(result)
 
 @insights_bp.route('/api/shared-insights/by-month-all', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_shared_insights_by_month_all():
     """
     Get monthly data for all shared expenses and incomes combined.
@@ -2194,121 +1016,11 @@ def get_shared_insights_by_month_all():
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     
-    user_id = session['user']['id']
-    data_type = request.args.get('type', 'expense')  # 'expense' or 'income'
-    
-    # Process all shared items, including those in bulk shares
-    all_shared_items = []
-    
-    if data_type == 'expense':
-        # Get directly shared expenses
-        direct_shared_items = db.session.query(Expense).join(
-            SharedExpense, SharedExpense.expense_id == Expense.id
-        ).filter(
-            SharedExpense.shared_with_id == user_id,
-            Expense.date >= start_date,
-            Expense.date < end_date
-        ).all()
-        
-        all_shared_items.extend(direct_shared_items)
-        
-        # Get bulk shared expenses
-        bulk_shares = db.session.query(SharedExpense).filter(
-            SharedExpense.shared_with_id == user_id,
-            SharedExpense.is_bulk_share == True
-        ).all()
-        
-        # Process each bulk share
-        for bulk_share in bulk_shares:
-            if bulk_share.bulk_expense_ids:
-                try:
-                    bulk_ids = [int(id) for id in bulk_share.bulk_expense_ids.split(',') if id.strip()]
-                    if bulk_ids:
-                        bulk_items = db.session.query(Expense).filter(
-                            Expense.id.in_(bulk_ids),
-                            Expense.date >= start_date,
-                            Expense.date < end_date
-                        ).all()
-                        all_shared_items.extend(bulk_items)
-                except Exception as e:
-                    logging.error(f"Error processing bulk expense share {bulk_share.id}: {str(e)}")
-    else:
-        # Get directly shared incomes
-        direct_shared_items = db.session.query(Income).join(
-            SharedIncome, SharedIncome.income_id == Income.id
-        ).filter(
-            SharedIncome.shared_with_id == user_id,
-            Income.date >= start_date,
-            Income.date < end_date
-        ).all()
-        
-        all_shared_items.extend(direct_shared_items)
-        
-        # Get bulk shared incomes
-        bulk_shares = db.session.query(SharedIncome).filter(
-            SharedIncome.shared_with_id == user_id,
-            SharedIncome.is_bulk_share == True
-        ).all()
-        
-        # Process each bulk share
-        for bulk_share in bulk_shares:
-            if bulk_share.bulk_income_ids:
-                try:
-                    bulk_ids = [int(id) for id in bulk_share.bulk_income_ids.split(',') if id.strip()]
-                    if bulk_ids:
-                        bulk_items = db.session.query(Income).filter(
-                            Income.id.in_(bulk_ids),
-                            Income.date >= start_date,
-                            Income.date < end_date
-                        ).all()
-                        all_shared_items.extend(bulk_items)
-                except Exception as e:
-                    logging.error(f"Error processing bulk income share {bulk_share.id}: {str(e)}")
-    
-    # Deduplicate items
-    unique_item_ids = set()
-    unique_items = []
-    for item in all_shared_items:
-        if item.id not in unique_item_ids:
-            unique_item_ids.add(item.id)
-            unique_items.append(item)
-    
-    # Group by month
-    data_by_month = {}
-    for item in unique_items:
-        year = item.date.year
-        month = item.date.month
-        month_key = f"{year}-{month:02d}"
-        
-        if month_key not in data_by_month:
-            data_by_month[month_key] = 0
-        
-        data_by_month[month_key] += float(item.amount)
-    
-    # Format results
-    months = []
-    values = []
-    
-    # Sort month keys
-    sorted_months = sorted(data_by_month.keys())
-    
-    for month_key in sorted_months:
-        year, month = month_key.split('-')
-        month_date = datetime(int(year), int(month), 1)
-        month_name = month_date.strftime('%b %Y')  # e.g. "Jan 2023"
-        months.append(month_name)
-        values.append(data_by_month[month_key])
-    
-    return jsonify({
-        'labels': months,
-        'values': values,
-        'debug': {
-            'data_type': data_type,
-            'unique_items': len(unique_items)
-        }
-    })
+    return jsonify(shared_by_month_response(session['user']['id'],
+                                            start_date, end_date))
 
 @insights_bp.route('/api/shared-insights/summary-all', methods=['GET'])
+@cached_response(insights_cache_key)
 def get_shared_insights_summary_all():
     """
     Get summary of all shared data combined.
@@ -2321,149 +1033,21 @@ def get_shared_insights_summary_all():
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     
-    user_id = session['user']['id']
-    
-    # Process all shared expenses, including those in bulk shares
-    all_shared_expenses = []
-    
-    # Get directly shared expenses
-    direct_shared_expenses = db.session.query(Expense).join(
-        SharedExpense, SharedExpense.expense_id == Expense.id
-    ).filter(
-        SharedExpense.shared_with_id == user_id,
-        Expense.date >= start_date,
-        Expense.date < end_date
-    ).all()
-    
-    all_shared_expenses.extend(direct_shared_expenses)
-    
-    # Get bulk shared expenses
-    bulk_shares = db.session.query(SharedExpense).filter(
-        SharedExpense.shared_with_id == user_id,
-        SharedExpense.is_bulk_share == True
-    ).all()
-    
-    # Process each bulk share
-    for bulk_share in bulk_shares:
-        if bulk_share.bulk_expense_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_expense_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_expenses = db.session.query(Expense).filter(
-                        Expense.id.in_(bulk_ids),
-                        Expense.date >= start_date,
-                        Expense.date < end_date
-                    ).all()
-                    all_shared_expenses.extend(bulk_expenses)
-            except Exception as e:
-                logging.error(f"Error processing bulk expense share {bulk_share.id}: {str(e)}")
-    
-    # Process all shared incomes, including those in bulk shares
-    all_shared_incomes = []
-    
-    # Get directly shared incomes
-    direct_shared_incomes = db.session.query(Income).join(
-        SharedIncome, SharedIncome.income_id == Income.id
-    ).filter(
-        SharedIncome.shared_with_id == user_id,
-        Income.date >= start_date,
-        Income.date < end_date
-    ).all()
-    
-    all_shared_incomes.extend(direct_shared_incomes)
-    
-    # Get bulk shared incomes
-    bulk_income_shares = db.session.query(SharedIncome).filter(
-        SharedIncome.shared_with_id == user_id,
-        SharedIncome.is_bulk_share == True
-    ).all()
-    
-    # Process each bulk income share
-    for bulk_share in bulk_income_shares:
-        if bulk_share.bulk_income_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_income_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    bulk_incomes = db.session.query(Income).filter(
-                        Income.id.in_(bulk_ids),
-                        Income.date >= start_date,
-                        Income.date < end_date
-                    ).all()
-                    all_shared_incomes.extend(bulk_incomes)
-            except Exception as e:
-                logging.error(f"Error processing bulk income share {bulk_share.id}: {str(e)}")
-    
-    # Deduplicate expenses and incomes
-    unique_expense_ids = set()
-    unique_expenses = []
-    for expense in all_shared_expenses:
-        if expense.id not in unique_expense_ids:
-            unique_expense_ids.add(expense.id)
-            unique_expenses.append(expense)
-    
-    unique_income_ids = set()
-    unique_incomes = []
-    for income in all_shared_incomes:
-        if income.id not in unique_income_ids:
-            unique_income_ids.add(income.id)
-            unique_incomes.append(income)
-    
-    # Calculate expense summary
-    total_expense_entries = len(unique_expenses)
-    total_expense_amount = sum(float(expense.amount) for expense in unique_expenses)
-    
-    # Calculate expense category distribution
-    expense_category_totals = {}
-    for expense in unique_expenses:
-        category = expense.category
-        if category not in expense_category_totals:
-            expense_category_totals[category] = 0
-        expense_category_totals[category] += float(expense.amount)
-    
-    expense_labels = list(expense_category_totals.keys())
-    expense_values = [expense_category_totals[category] for category in expense_labels]
-    
-    # Calculate income summary
-    total_income_entries = len(unique_incomes)
-    total_income_amount = sum(float(income.amount) for income in unique_incomes)
-    
-    # Calculate income category distribution
-    income_category_totals = {}
-    for income in unique_incomes:
-        category = income.category
-        if category not in income_category_totals:
-            income_category_totals[category] = 0
-        income_category_totals[category] += float(income.amount)
-    
-    income_labels = list(income_category_totals.keys())
-    income_values = [income_category_totals[category] for category in income_labels]
-    
-    return jsonify({
-        'expense': {
-            'totalEntries': total_expense_entries,
-            'totalAmount': total_expense_amount,
-            'categoryDistribution': {'labels': expense_labels, 'values': expense_values}
-        },
-        'income': {
-            'totalEntries': total_income_entries,
-            'totalAmount': total_income_amount,
-            'categoryDistribution': {'labels': income_labels, 'values': income_values}
-        },
-        'sharer': {
-            'id': 'all',
-            'name': 'All Shared Data'
-        },
-        'debug': {
-            'direct_expenses': len(direct_shared_expenses),
-            'bulk_expenses': len(all_shared_expenses) - len(direct_shared_expenses),
-            'unique_expenses': len(unique_expenses),
-            'direct_incomes': len(direct_shared_incomes),
-            'bulk_incomes': len(all_shared_incomes) - len(direct_shared_incomes),
-            'unique_incomes': len(unique_incomes)
-        }
-    })
+    return jsonify(shared_summary_response(session['user']['id'], start_date,
+                                           end_date, 'all', 'All Shared Data'))
+
+@insights_bp.route('/api/insights/cache-stats', methods=['GET'])
+@conditional.exempt
+def insights_cache_stats():
+    """
+    Hit/miss counters of the insights result cache, for sizing it.
+    """
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    return jsonify(get_cache().stats())
 
 @insights_bp.route('/api/insights/today-debug', methods=['GET'])
+@conditional.exempt
 def today_debug():
     """
     Debug endpoint to specifically check if today's data is being found and processed correctly.
@@ -2493,66 +1077,27 @@ def today_debug():
         Income.date < tomorrow
     ).all()
     
-    # Check shared data for today
-    # Direct shared expenses
-    direct_shared_expenses = db.session.query(Expense).join(
-        SharedExpense, SharedExpense.expense_id == Expense.id
-    ).filter(
-        SharedExpense.shared_with_id == user_id,
-        Expense.date >= today_start,
-        Expense.date < tomorrow
-    ).all()
-    
-    # Bulk shared expenses
-    bulk_shares = db.session.query(SharedExpense).filter(
-        SharedExpense.shared_with_id == user_id,
-        SharedExpense.is_bulk_share == True
-    ).all()
-    
-    bulk_shared_expenses = []
-    for bulk_share in bulk_shares:
-        if bulk_share.bulk_expense_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_expense_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    expenses = db.session.query(Expense).filter(
-                        Expense.id.in_(bulk_ids),
-                        Expense.date >= today_start,
-                        Expense.date < tomorrow
-                    ).all()
-                    bulk_shared_expenses.extend(expenses)
-            except Exception as e:
-                logging.error(f"Error processing bulk expense share {bulk_share.id}: {str(e)}")
-    
-    # Direct shared incomes
-    direct_shared_incomes = db.session.query(Income).join(
-        SharedIncome, SharedIncome.income_id == Income.id
-    ).filter(
-        SharedIncome.shared_with_id == user_id,
-        Income.date >= today_start,
-        Income.date < tomorrow
-    ).all()
-    
-    # Bulk shared incomes
-    bulk_income_shares = db.session.query(SharedIncome).filter(
-        SharedIncome.shared_with_id == user_id,
-        SharedIncome.is_bulk_share == True
-    ).all()
-    
-    bulk_shared_incomes = []
-    for bulk_share in bulk_income_shares:
-        if bulk_share.bulk_income_ids:
-            try:
-                bulk_ids = [int(id) for id in bulk_share.bulk_income_ids.split(',') if id.strip()]
-                if bulk_ids:
-                    incomes = db.session.query(Income).filter(
-                        Income.id.in_(bulk_ids),
-                        Income.date >= today_start,
-                        Income.date < tomorrow
-                    ).all()
-                    bulk_shared_incomes.extend(incomes)
-            except Exception as e:
-                logging.error(f"Error processing bulk income share {bulk_share.id}: {str(e)}")
+    # Shared data for today: one visibility join per kind covers direct
+    # and bulk shares alike
+    shared = {}
+    for kind, model in (('expense', Expense), ('income', Income)):
+        rows = db.session.query(model, ShareVisibility.share_count).join(
+            ShareVisibility,
+            and_(ShareVisibility.item_id == model.id, ShareVisibility.kind == kind)
+        ).filter(
+            ShareVisibility.recipient_id == user_id,
+            model.date >= today_start,
+            model.date < tomorrow
+        ).all()
+        shared[kind] = [{
+            'id': r.id,
+            'date': r.date.isoformat(),
+            'amount': float(r.amount),
+            'category': r.category,
+            'description': r.description,
+            'user_id': r.user_id,
+            'share_count': share_count
+        } for r, share_count in rows]
     
     # Format the data for the response
     personal_expense_details = [{
@@ -2571,42 +1116,6 @@ def today_debug():
         'description': i.description
     } for i in personal_incomes]
     
-    direct_shared_expense_details = [{
-        'id': e.id,
-        'date': e.date.isoformat(),
-        'amount': float(e.amount),
-        'category': e.category,
-        'description': e.description,
-        'user_id': e.user_id
-    } for e in direct_shared_expenses]
-    
-    bulk_shared_expense_details = [{
-        'id': e.id,
-        'date': e.date.isoformat(),
-        'amount': float(e.amount),
-        'category': e.category,
-        'description': e.description,
-        'user_id': e.user_id
-    } for e in bulk_shared_expenses]
-    
-    direct_shared_income_details = [{
-        'id': i.id,
-        'date': i.date.isoformat(),
-        'amount': float(i.amount),
-        'category': i.category,
-        'description': i.description,
-        'user_id': i.user_id
-    } for i in direct_shared_incomes]
-    
-    bulk_shared_income_details = [{
-        'id': i.id,
-        'date': i.date.isoformat(),
-        'amount': float(i.amount),
-        'category': i.category,
-        'description': i.description,
-        'user_id': i.user_id
-    } for i in bulk_shared_incomes]
-    
     # Get date range used in parse_date_range for comparison
     current_start_date, current_end_date = parse_date_range()
     
@@ -2632,31 +1141,18 @@ def today_debug():
         },
         'shared_data': {
             'expenses': {
-                'direct': {
-                    'count': len(direct_shared_expenses),
-                    'details': direct_shared_expense_details
-                },
-                'bulk': {
-                    'count': len(bulk_shared_expenses),
-                    'details': bulk_shared_expense_details
-                },
-                'total': len(direct_shared_expenses) + len(bulk_shared_expenses)
+                'count': len(shared['expense']),
+                'details': shared['expense']
             },
             'incomes': {
-                'direct': {
-                    'count': len(direct_shared_incomes),
-                    'details': direct_shared_income_details
-                },
-                'bulk': {
-                    'count': len(bulk_shared_incomes),
-                    'details': bulk_shared_income_details
-                },
-                'total': len(direct_shared_incomes) + len(bulk_shared_incomes)
+                'count': len(shared['income']),
+                'details': shared['income']
             }
         }
     })
 
 @insights_bp.route('/api/insights/date-debug', methods=['GET'])
+@conditional.exempt
 def date_debug():
     """
     Debug endpoint to specifically check date handling logic.
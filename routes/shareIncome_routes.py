@@ -1,5 +1,9 @@
 from flask import Blueprint, session, jsonify, request
 from models.models import db, Income, SharedIncome, User
+from utils import export
+from utils.listing import parse_list_args
+from utils.shares import (create_share, delete_share, individually_shared_ids,
+                          bulk_shared_ids, find_bulk_share)
 
 shareIncome_bp = Blueprint('shareIncome', __name__)
 
@@ -28,25 +32,12 @@ def share_Income(income_id):
         return jsonify({'error': 'Unauthorized to share this Income'}), 403
 
     # Check if the Income is already shared with the user
-    existing_share = SharedIncome.query.filter_by(
-        income_id=income_id,
-        shared_with_id=shared_with_user.id,
-        is_bulk_share=False
-    ).first()
-    
-    if existing_share:
+    if individually_shared_ids('income', [income_id], shared_with_user.id):
         return jsonify({'error': 'This Income is already shared with this user'}), 400
 
     try:
         # Create a single share record
-        shared_Income = SharedIncome(
-            income_id=income_id,
-            shared_with_id=shared_with_user.id,
-            is_bulk_share=False,
-            is_repeat=False
-        )
-        
-        db.session.add(shared_Income)
+        shared_Income = create_share('income', [income_id], shared_with_user.id)
         db.session.commit()
 
         return jsonify({
@@ -86,54 +77,32 @@ def bulk_share_Incomes():
         # If only one Income is selected, treat it as a single share
         if len(Income_ids) == 1:
             # Check if already shared
-            existing_share = SharedIncome.query.filter_by(
-                income_id=Income_ids[0],
-                shared_with_id=shared_with_user.id,
-                is_bulk_share=False
-            ).first()
-            
-            if existing_share:
+            if individually_shared_ids('income', [Incomes[0].id], shared_with_user.id):
                 return jsonify({'error': 'This Income is already shared with this user'}), 400
 
             # Create single share record
-            shared_Income = SharedIncome(
-                income_id=Income_ids[0],
-                shared_with_id=shared_with_user.id,
-                is_bulk_share=False,
-                is_repeat=False
-            )
+            shared_Income = create_share('income', [Incomes[0].id], shared_with_user.id)
         else:
-            # Sort Income IDs for consistent comparison
-            sorted_Income_ids = sorted(map(int, Income_ids))
-            Income_ids_str = ','.join(map(str, sorted_Income_ids))
+            # Only share Incomes that belong to the current user
+            owned_ids = [income.id for income in Incomes]
 
             # Check if the exact same combination of Incomes is already shared
-            existing_bulk_share = SharedIncome.query.filter(
-                SharedIncome.shared_with_id == shared_with_user.id,
-                SharedIncome.is_bulk_share == True,
-                SharedIncome.bulk_income_ids == Income_ids_str
-            ).first()
-
-            if existing_bulk_share:
+            if find_bulk_share('income', owned_ids, shared_with_user.id):
                 return jsonify({'error': 'These Incomes are already shared with this user'}), 400
 
             # Check if any of the Incomes are already shared individually
-            individually_shared = SharedIncome.query.filter(
-                SharedIncome.income_id.in_(Income_ids),
-                SharedIncome.shared_with_id == shared_with_user.id,
-                SharedIncome.is_bulk_share == False
-            ).all()
+            individually_shared = individually_shared_ids(
+                'income', owned_ids, shared_with_user.id)
 
             # Create bulk share record
-            shared_Income = SharedIncome(
-                income_id=Income_ids[0],
-                shared_with_id=shared_with_user.id,
+            shared_Income = create_share(
+                'income',
+                owned_ids,
+                shared_with_user.id,
                 is_bulk_share=True,
-                bulk_income_ids=Income_ids_str,
                 is_repeat=bool(individually_shared)
             )
-        
-        db.session.add(shared_Income)
+
         db.session.commit()
 
         return jsonify({
@@ -163,31 +132,28 @@ def get_shared_by_me_Incomes():
         if not shared_with_user:
             continue
 
-        if se.is_bulk_share and se.bulk_income_ids:
+        if se.is_bulk_share:
             # Handle bulk shared Incomes
-            income_ids = se.bulk_income_ids.split(',')
+            income_ids = se.item_ids
             bulk_incomes = Income.query.filter(Income.id.in_(income_ids)).all()
             
             # Get total amount and categories
             total_amount = sum(e.amount for e in bulk_incomes)
             categories = list(set(e.category for e in bulk_incomes))
             
+            # Find which of these Incomes are shared individually with the same user
+            individual_ids = individually_shared_ids(
+                'income', income_ids, se.shared_with_id)
+            
             # Get detailed information for each Income
             details = []
             for e in bulk_incomes:
-                # Check if this Income is shared individually with the same user
-                individual_share = SharedIncome.query.filter_by(
-                    income_id=e.id,
-                    shared_with_id=se.shared_with_id,
-                    is_bulk_share=False
-                ).first()
-                
                 details.append({
                     'date': e.date.astimezone().strftime('%Y-%m-%d %H:%M:%S'),
                     'category': e.category,
                     'description': e.description,
                     'amount': e.amount,
-                    'is_repeat': bool(individual_share)
+                    'is_repeat': e.id in individual_ids
                 })
             
             incomes.append({
@@ -207,11 +173,8 @@ def get_shared_by_me_Incomes():
             income = Income.query.get(se.income_id)
             if income:
                 # Check if this income is part of any bulk share with the same user
-                bulk_share = SharedIncome.query.filter(
-                    SharedIncome.shared_with_id == se.shared_with_id,
-                    SharedIncome.is_bulk_share == True,
-                    SharedIncome.bulk_income_ids.like(f'%{se.income_id}%')
-                ).first()
+                bulk_share = bulk_shared_ids(
+                    'income', [se.income_id], se.shared_with_id)
 
                 incomes.append({
                     'id': se.income_id,
@@ -243,12 +206,12 @@ def get_shared_with_me_Incomes():
         single_shares = []
         
         for share in shared_Incomes:
-            if share.is_bulk_share and share.bulk_income_ids:
+            if share.is_bulk_share:
                 # For bulk shares, group by the combination of Incomes
-                key = share.bulk_income_ids
+                Income_ids = share.item_ids
+                key = tuple(Income_ids)
                 if key not in bulk_shares:
                     # Get all Incomes in this bulk share
-                    Income_ids = [int(id) for id in key.split(',')]
                     incomes = Income.query.filter(Income.id.in_(Income_ids)).all()
                     
                     # Calculate total amount and get all categories
@@ -256,14 +219,9 @@ def get_shared_with_me_Incomes():
                     categories = list(set(income.category for income in incomes))
                     
                     # Check if any of these Incomes are already shared individually
-                    is_repeat = any(
-                        SharedIncome.query.filter_by(
-                            income_id=income.id,
-                            shared_with_id=user_id,
-                            is_bulk_share=False
-                        ).first() is not None
-                        for income in incomes
-                    )
+                    individual_ids = individually_shared_ids(
+                        'income', Income_ids, user_id)
+                    is_repeat = bool(individual_ids)
                     
                     # Get the user who shared these Incomes (from the first Income)
                     shared_by_user = User.query.get(incomes[0].user_id) if incomes else None
@@ -283,11 +241,7 @@ def get_shared_with_me_Incomes():
                             'category': income.category,
                             'description': income.description,
                             'amount': income.amount,
-                            'is_repeat': SharedIncome.query.filter_by(
-                                income_id=income.id,
-                                shared_with_id=user_id,
-                                is_bulk_share=False
-                            ).first() is not None
+                            'is_repeat': income.id in individual_ids
                         } for income in incomes]
                     }
             else:
@@ -295,11 +249,7 @@ def get_shared_with_me_Incomes():
                 income = Income.query.get(share.income_id)
                 if income:
                     # Check if this Income is part of any bulk share
-                    is_repeat = SharedIncome.query.filter(
-                        SharedIncome.bulk_income_ids.like(f'%{income.id}%'),
-                        SharedIncome.shared_with_id == user_id,
-                        SharedIncome.is_bulk_share == True
-                    ).first() is not None
+                    is_repeat = bool(bulk_shared_ids('income', [income.id], user_id))
                     
                     # Get the user who shared this income
                     shared_by_user = User.query.get(income.user_id)
@@ -323,6 +273,21 @@ def get_shared_with_me_Incomes():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@shareIncome_bp.route('/api/share/income/export', methods=['GET'])
+def export_shared_incomes():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    try:
+        filters = parse_list_args(request.args)
+        fmt = export.parse_format(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    statement = export.shared_records('income', session['user']['id'], filters)
+    return export.export_response(statement, export.SHARED_COLUMNS, fmt,
+                                  'shared-incomes')
+
 @shareIncome_bp.route('/api/share/income/cancel', methods=['POST'])
 def cancel_shared_Income():
     if 'user' not in session:
@@ -341,8 +306,7 @@ def cancel_shared_Income():
     
     # For bulk shares, allow both the sharer and the recipient to cancel
     if shared_Income.is_bulk_share:
-        Income_ids = [int(id) for id in shared_Income.bulk_income_ids.split(',')]
-        first_Income = Income.query.get(Income_ids[0])
+        first_Income = Income.query.get(shared_Income.item_ids[0])
         if not first_Income or (first_Income.user_id != user_id and shared_Income.shared_with_id != user_id):
             return jsonify({'error': 'Unauthorized to cancel this shared Income'}), 403
     else:
@@ -352,7 +316,7 @@ def cancel_shared_Income():
             return jsonify({'error': 'Unauthorized to cancel this shared income'}), 403
 
     try:
-        db.session.delete(shared_Income)
+        delete_share('income', shared_Income)
         db.session.commit()
         return jsonify({'message': 'Shared income canceled successfully'})
     except Exception as e:
@@ -381,7 +345,7 @@ def bulk_cancel_shares():
 
     # Delete all shared Incomes
     for shared_Income in shared_Incomes:
-        db.session.delete(shared_Income)
+        delete_share('income', shared_Income)
 
     db.session.commit()
 
@@ -1,5 +1,9 @@
 from flask import Blueprint, session, jsonify, request
 from models.models import db, Expense, SharedExpense, User
+from utils import export
+from utils.listing import parse_list_args
+from utils.shares import (create_share, delete_share, individually_shared_ids,
+                          bulk_shared_ids, find_bulk_share)
 
 share_bp = Blueprint('share', __name__)
 
@@ -28,25 +32,12 @@ def share_expense(expense_id):
         return jsonify({'error': 'Unauthorized to share this expense'}), 403
 
     # Check if the expense is already shared with the user
-    existing_share = SharedExpense.query.filter_by(
-        expense_id=expense_id,
-        shared_with_id=shared_with_user.id,
-        is_bulk_share=False
-    ).first()
-    
-    if existing_share:
+    if individually_shared_ids('expense', [expense_id], shared_with_user.id):
         return jsonify({'error': 'This expense is already shared with this user'}), 400
 
     try:
         # Create a single share record
-        shared_expense = SharedExpense(
-            expense_id=expense_id,
-            shared_with_id=shared_with_user.id,
-            is_bulk_share=False,
-            is_repeat=False
-        )
-
-        db.session.add(shared_expense)
+        shared_expense = create_share('expense', [expense_id], shared_with_user.id)
         db.session.commit()
 
         return jsonify({
@@ -86,47 +77,27 @@ def bulk_share_expenses():
         # If only one expense is selected, treat it as a single share
         if len(expense_ids) == 1:
             # Check if already shared
-            existing_share = SharedExpense.query.filter_by(
-                expense_id=expense_ids[0],
-                shared_with_id=shared_with_user.id,
-                is_bulk_share=False
-            ).first()
-            if existing_share:
+            if individually_shared_ids('expense', [expenses[0].id], shared_with_user.id):
                 return jsonify({'error': 'This expense is already shared with this user'}), 400
             # Create single share record
-            shared_expense = SharedExpense(
-                expense_id=expense_ids[0],
-                shared_with_id=shared_with_user.id,
-                is_bulk_share=False,
-                is_repeat=False
-            )
+            shared_expense = create_share('expense', [expenses[0].id], shared_with_user.id)
         else:
-            # Sort expense IDs for consistent comparison
-            sorted_expense_ids = sorted(map(int, expense_ids))
-            expense_ids_str = ','.join(map(str, sorted_expense_ids))
+            # Only share expenses that belong to the current user
+            owned_ids = [expense.id for expense in expenses]
             # Check if the exact same combination of expenses is already shared
-            existing_bulk_share = SharedExpense.query.filter(
-                SharedExpense.shared_with_id == shared_with_user.id,
-                SharedExpense.is_bulk_share == True,
-                SharedExpense.bulk_expense_ids == expense_ids_str
-            ).first()
-            if existing_bulk_share:
+            if find_bulk_share('expense', owned_ids, shared_with_user.id):
                 return jsonify({'error': 'These expenses are already shared with this user'}), 400
             # Check if any of the expenses are already shared individually
-            individually_shared = SharedExpense.query.filter(
-                SharedExpense.expense_id.in_(expense_ids),
-                SharedExpense.shared_with_id == shared_with_user.id,
-                SharedExpense.is_bulk_share == False
-            ).all()
+            individually_shared = individually_shared_ids(
+                'expense', owned_ids, shared_with_user.id)
             # Create bulk share record
-            shared_expense = SharedExpense(
-                expense_id=expense_ids[0],
-                shared_with_id=shared_with_user.id,
+            shared_expense = create_share(
+                'expense',
+                owned_ids,
+                shared_with_user.id,
                 is_bulk_share=True,
-                bulk_expense_ids=expense_ids_str,
                 is_repeat=bool(individually_shared)
             )
-        db.session.add(shared_expense)
         db.session.commit()
         return jsonify({
             'message': f'Successfully shared {len(expenses)} expenses with {shared_with_username}',
@@ -155,31 +126,28 @@ def get_shared_by_me_expenses():
         if not shared_with_user:
             continue
 
-        if se.is_bulk_share and se.bulk_expense_ids:
+        if se.is_bulk_share:
             # Handle bulk shared expenses
-            expense_ids = se.bulk_expense_ids.split(',')
+            expense_ids = se.item_ids
             bulk_expenses = Expense.query.filter(Expense.id.in_(expense_ids)).all()
             
             # Get total amount and categories
             total_amount = sum(e.amount for e in bulk_expenses)
             categories = list(set(e.category for e in bulk_expenses))
             
+            # Find which of these expenses are shared individually with the same user
+            individual_ids = individually_shared_ids(
+                'expense', expense_ids, se.shared_with_id)
+            
             # Get detailed information for each expense
             details = []
             for e in bulk_expenses:
-                # Check if this expense is shared individually with the same user
-                individual_share = SharedExpense.query.filter_by(
-                    expense_id=e.id,
-                    shared_with_id=se.shared_with_id,
-                    is_bulk_share=False
-                ).first()
-                
                 details.append({
                     'date': e.date.astimezone().strftime('%Y-%m-%d %H:%M:%S'),
                     'category': e.category,
                     'description': e.description,
                     'amount': e.amount,
-                    'is_repeat': bool(individual_share)
+                    'is_repeat': e.id in individual_ids
                 })
             
             expenses.append({
@@ -199,11 +167,8 @@ def get_shared_by_me_expenses():
             expense = Expense.query.get(se.expense_id)
             if expense:
                 # Check if this expense is part of any bulk share with the same user
-                bulk_share = SharedExpense.query.filter(
-                    SharedExpense.shared_with_id == se.shared_with_id,
-                    SharedExpense.is_bulk_share == True,
-                    SharedExpense.bulk_expense_ids.like(f'%{se.expense_id}%')
-                ).first()
+                bulk_share = bulk_shared_ids(
+                    'expense', [se.expense_id], se.shared_with_id)
 
                 expenses.append({
                     'id': se.expense_id,
@@ -235,12 +200,12 @@ def get_shared_with_me_expenses():
         single_shares = []
         
         for share in shared_expenses:
-            if share.is_bulk_share and share.bulk_expense_ids:
+            if share.is_bulk_share:
                 # For bulk shares, group by the combination of expenses
-                key = share.bulk_expense_ids
+                expense_ids = share.item_ids
+                key = tuple(expense_ids)
                 if key not in bulk_shares:
                     # Get all expenses in this bulk share
-                    expense_ids = [int(id) for id in key.split(',')]
                     expenses = Expense.query.filter(Expense.id.in_(expense_ids)).all()
                     
                     # Calculate total amount and get all categories
@@ -248,14 +213,9 @@ def get_shared_with_me_expenses():
                     categories = list(set(expense.category for expense in expenses))
                     
                     # Check if any of these expenses are already shared individually
-                    is_repeat = any(
-                        SharedExpense.query.filter_by(
-                            expense_id=expense.id,
-                            shared_with_id=user_id,
-                            is_bulk_share=False
-                        ).first() is not None
-                        for expense in expenses
-                    )
+                    individual_ids = individually_shared_ids(
+                        'expense', expense_ids, user_id)
+                    is_repeat = bool(individual_ids)
                     
                     # Get the user who shared these expenses (from the first expense)
                     shared_by_user = User.query.get(expenses[0].user_id) if expenses else None
@@ -275,11 +235,7 @@ def get_shared_with_me_expenses():
                             'category': expense.category,
                             'description': expense.description,
                             'amount': expense.amount,
-                            'is_repeat': SharedExpense.query.filter_by(
-                                expense_id=expense.id,
-                                shared_with_id=user_id,
-                                is_bulk_share=False
-                            ).first() is not None
+                            'is_repeat': expense.id in individual_ids
                         } for expense in expenses]
                     }
             else:
@@ -287,11 +243,7 @@ def get_shared_with_me_expenses():
                 expense = Expense.query.get(share.expense_id)
                 if expense:
                     # Check if this expense is part of any bulk share
-                    is_repeat = SharedExpense.query.filter(
-                        SharedExpense.bulk_expense_ids.like(f'%{expense.id}%'),
-                        SharedExpense.shared_with_id == user_id,
-                        SharedExpense.is_bulk_share == True
-                    ).first() is not None
+                    is_repeat = bool(bulk_shared_ids('expense', [expense.id], user_id))
                     
                     # Get the user who shared this expense
                     shared_by_user = User.query.get(expense.user_id)
@@ -315,6 +267,21 @@ def get_shared_with_me_expenses():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@share_bp.route('/api/share/export', methods=['GET'])
+def export_shared_expenses():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    try:
+        filters = parse_list_args(request.args)
+        fmt = export.parse_format(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    statement = export.shared_records('expense', session['user']['id'], filters)
+    return export.export_response(statement, export.SHARED_COLUMNS, fmt,
+                                  'shared-expenses')
+
 @share_bp.route('/api/share/cancel', methods=['POST'])
 def cancel_shared_expense():
     if 'user' not in session:
@@ -333,8 +300,7 @@ def cancel_shared_expense():
     
     # For bulk shares, allow both the sharer and the recipient to cancel
     if shared_expense.is_bulk_share:
-        expense_ids = [int(id) for id in shared_expense.bulk_expense_ids.split(',')]
-        first_expense = Expense.query.get(expense_ids[0])
+        first_expense = Expense.query.get(shared_expense.item_ids[0])
         if not first_expense or (first_expense.user_id != user_id and shared_expense.shared_with_id != user_id):
             return jsonify({'error': 'Unauthorized to cancel this shared expense'}), 403
     else:
@@ -344,7 +310,7 @@ def cancel_shared_expense():
             return jsonify({'error': 'Unauthorized to cancel this shared expense'}), 403
 
     try:
-        db.session.delete(shared_expense)
+        delete_share('expense', shared_expense)
         db.session.commit()
         return jsonify({'message': 'Shared expense canceled successfully'})
     except Exception as e:
@@ -373,7 +339,7 @@ def bulk_cancel_shares():
 
     # Delete all shared expenses
     for shared_expense in shared_expenses:
-        db.session.delete(shared_expense)
+        delete_share('expense', shared_expense)
 
     db.session.commit()
 
@@ -45,4 +45,77 @@ document.addEventListener('DOMContentLoaded', function() {
     if (navbar) {
         navbar.classList.add('navbar-loaded');
     }
-});
\ No newline at end of file
+});
+// Keep a local copy of a record list in sync with a /changes endpoint.
+// The first call downloads everything (since=0); later calls only fetch
+// rows changed or deleted after the last version seen.
+function createDeltaSync(url) {
+    const state = { version: 0, records: new Map() };
+
+    return function sync(onUpdate) {
+        return $.get(url, { since: state.version }, function (data) {
+            data.changed.forEach((record) => state.records.set(record.id, record));
+            data.deleted.forEach((id) => state.records.delete(id));
+            state.version = data.version;
+            onUpdate(Array.from(state.records.values()));
+        });
+    };
+}
+
+// Upload a bank statement to an /import endpoint, reporting progress from
+// its streamed lines, then call reload once rows may have been added.
+async function uploadStatement(file, url, noun, reload) {
+    const formData = new FormData();
+    formData.append("file", file);
+    formData.append("csrf_token", $('input[name="csrf_token"]').val());
+    notifications.info(`Importing ${file.name}...`);
+
+    let last = null;
+    const problems = [];
+    const handleLine = (line) => {
+        last = JSON.parse(line);
+        (last.errors || []).forEach((e) => problems.push(`Row ${e.row}: ${e.error}`));
+    };
+
+    try {
+        const response = await fetch(url, { method: "POST", body: formData });
+        if (!response.ok) {
+            const error = await response.json().catch(() => ({}));
+            notifications.error(error.error || "Failed to import the statement");
+            return;
+        }
+        // One JSON line per saved chunk of rows
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split("\n");
+            buffer = lines.pop();
+            lines.filter((line) => line.trim()).forEach(handleLine);
+            if (last && last.total_bytes) {
+                const percent = Math.round((100 * last.bytes_read) / last.total_bytes);
+                notifications.info(`Imported ${last.inserted} of ${last.rows} rows (${percent}%)`);
+            }
+        }
+        if (buffer.trim()) handleLine(buffer);
+    } catch (e) {
+        notifications.error("An error occurred while importing the statement.");
+        return;
+    }
+
+    if (!last) return;
+    if (last.status === "failed") {
+        notifications.error(`Import stopped after ${last.inserted} rows: ${last.error}`);
+    } else if (problems.length > 0) {
+        notifications.warning(`Imported ${last.inserted} of ${last.rows} rows:\n` + problems.join("\n"));
+    } else {
+        notifications.success(
+            `Imported ${last.inserted} ${noun}` +
+                (last.duplicates ? `, skipped ${last.duplicates} already added` : "")
+        );
+    }
+    reload();
+}
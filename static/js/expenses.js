@@ -191,8 +191,10 @@ $(document).ready(function () {
         });
 });
 
+const syncExpenses = createDeltaSync("/api/expenses/changes");
+
 function loadExpenses() {
-    $.get("/api/expenses", function (expenses) {
+    syncExpenses(function (expenses) {
         currentExpenses = expenses;
         updateExpenseTable(expenses);
         filterAndSearchExpenses();
@@ -432,6 +434,7 @@ document.getElementById("uploadTemplate").addEventListener("change", function (e
 
         const errors = [];
         const validRows = [];
+        const rowNumbers = [];
 
         // Skip header row
         for (let i = 1; i < jsonData.length; i++) {
@@ -488,6 +491,7 @@ document.getElementById("uploadTemplate").addEventListener("change", function (e
             }
 
             validRows.push({ date: dateWithTime, category, description, amount });
+            rowNumbers.push(i + 1);
         }
 
         if (errors.length > 0) {
@@ -499,7 +503,15 @@ document.getElementById("uploadTemplate").addEventListener("change", function (e
                 contentType: "application/json",
                 data: JSON.stringify(validRows),
                 success: function (response) {
-                    notifications.success("Upload successful!");
+                    // Rows the server rejected are reported, the rest are saved
+                    if (response.errors.length > 0) {
+                        notifications.warning(
+                            `Added ${response.expenses.length} of ${validRows.length} rows:\n` +
+                                response.errors.map((e) => `Row ${rowNumbers[e.index]}: ${e.error}`).join("\n")
+                        );
+                    } else {
+                        notifications.success("Upload successful!");
+                    }
                     $("#expenseForm")[0].reset();
                     document.getElementById("date").value = getFormattedDateTime();
                     loadExpenses();
@@ -519,6 +531,11 @@ document.getElementById("uploadTemplate").addEventListener("change", function (e
 document.getElementById("uploadPicture").addEventListener("change", function (e) {
     const file = e.target.files[0];
     if (!file) return;
+    if (e.target.files.length > 1) {
+        uploadReceiptBatch(Array.from(e.target.files));
+        e.target.value = "";
+        return;
+    }
 
     const formData = new FormData();
     formData.append("file", file);
@@ -564,27 +581,192 @@ document.getElementById("uploadPicture").addEventListener("change", function (e)
             return xhr;
         },
         success: function (response) {
-            try {
-                if (response.error) {
-                    alert(`Error: ${response.error}`);
-                    return;
-                }
-                data = JSON.parse(response.result);
-                addExpense(data);
-            } catch (e) {
-                alert("An unexpected error occurred. Please try again.");
+            // The upload is done; OCR runs as a background job
+            document.body.removeChild(progressBar);
+            enableUI();
+            // Receipts seen before are answered straight from the cache
+            if (response.status === "done") {
+                showOcrResult(response);
+                return;
             }
+            notifications.info("Receipt uploaded, reading it now...");
+            pollOcrJob(response.job_id);
         },
         error: function (xhr) {
-            alert("An error occurred while processing the Picture.");
-        },
-        complete: function () {
             document.body.removeChild(progressBar);
             enableUI();
+            if (xhr.status === 503) {
+                notifications.error(xhr.responseJSON?.error || "OCR is busy, please try again shortly.");
+                return;
+            }
+            alert("An error occurred while processing the Picture.");
         },
     });
 });
 
+function pollOcrJob(jobId, delay = 1000) {
+    $.get(`/api/expenses/by-ocr/${jobId}`, function (job) {
+        if (job.status === "queued" || job.status === "running") {
+            setTimeout(() => pollOcrJob(jobId, Math.min(delay * 1.5, 5000)), delay);
+            return;
+        }
+        showOcrResult(job);
+    }).fail(function () {
+        alert("An error occurred while processing the Picture.");
+    });
+}
+
+// Rows read from the receipts in the batch modal, by table row
+let receiptBatchRows = [];
+
+async function uploadReceiptBatch(files) {
+    receiptBatchRows = [];
+    let read = 0;
+    const progress = (text) => $("#receiptBatchProgress").text(text || `Read ${read} of ${files.length} receipts`);
+    $("#receiptBatchRows").empty();
+    $("#receiptBatchAdd").prop("disabled", true);
+    progress();
+    $("#receiptBatchModal").modal("show");
+
+    // Each receipt's row is shown as soon as it is read
+    const showLine = (line) => {
+        read += 1;
+        progress();
+        const tr = $("<tr>").append($("<td>"), $("<td>").text(line.filename));
+        let expense = null;
+        let problem = line.error;
+        if (line.status === "done") {
+            try {
+                expense = JSON.parse(line.result);
+                if (!expense.amount || !expense.date) problem = "No amount or date found";
+            } catch (e) {
+                problem = "Unreadable result";
+            }
+        }
+        if (problem) {
+            tr.append($("<td colspan='4' class='text-danger'>").text(problem));
+        } else {
+            const check = $("<input type='checkbox' class='form-check-input' checked>").attr(
+                "data-row",
+                receiptBatchRows.length
+            );
+            tr.children().first().append(check);
+            tr.append(
+                $("<td>").text(expense.date.split("T")[0]),
+                $("<td>").text(expense.category),
+                $("<td>").text(expense.amount),
+                $("<td>").text(
+                    (expense.description || "") + (expense.source === "fallback" ? " (please check)" : "")
+                )
+            );
+            receiptBatchRows.push({ ...expense, filename: line.filename });
+        }
+        $("#receiptBatchRows").append(tr);
+    };
+
+    // Every receipt counts against the OCR queue's limits, so a selection
+    // larger than the server accepts is sent in parts, one after another
+    let maxFiles = files.length;
+    let waits = 0;
+    try {
+        for (let start = 0; start < files.length; ) {
+            const part = files.slice(start, start + maxFiles);
+            const formData = new FormData();
+            part.forEach((file) => formData.append("files", file));
+            formData.append("csrf_token", $('input[name="csrf_token"]').val());
+
+            const response = await fetch("/api/expenses/by-ocr/batch", { method: "POST", body: formData });
+            const body = await response.json().catch(() => ({}));
+            if (response.status === 400 && body.max_files && body.max_files < part.length) {
+                maxFiles = body.max_files;
+                continue;
+            }
+            if (response.status === 503 && waits < 5) {
+                waits += 1;
+                const seconds = parseInt(response.headers.get("Retry-After")) || 5;
+                progress(`${body.error || "OCR is busy"}; retrying in ${seconds}s...`);
+                await new Promise((resolve) => setTimeout(resolve, seconds * 1000));
+                continue;
+            }
+            if (!response.ok) {
+                notifications.error(body.error || "Failed to read receipts");
+                break;
+            }
+            waits = 0;
+            start += part.length;
+
+            // Ask for the lines finished since the last poll until all are in
+            let since = 0;
+            for (let delay = 1000; ; ) {
+                await new Promise((resolve) => setTimeout(resolve, delay));
+                const batch = await (await fetch(`/api/expenses/by-ocr/batch/${body.batch_id}?since=${since}`)).json();
+                batch.lines.forEach(showLine);
+                since = batch.next;
+                if (batch.status === "done") break;
+                delay = batch.lines.length > 0 ? 1000 : Math.min(delay * 1.5, 5000);
+            }
+        }
+    } catch (e) {
+        notifications.error("An error occurred while reading the receipts.");
+    }
+    progress();
+    $("#receiptBatchAdd").prop("disabled", receiptBatchRows.length === 0);
+}
+
+// Confirmed rows are added in one request
+$("#receiptBatchAdd").on("click", function () {
+    const rows = $("#receiptBatchRows input:checked")
+        .map((_, el) => receiptBatchRows[$(el).data("row")])
+        .get();
+    if (rows.length === 0) return;
+
+    $.ajax({
+        url: "/api/expenses/bulk",
+        method: "POST",
+        contentType: "application/json",
+        data: JSON.stringify(rows.map(({ amount, category, description, date }) => ({ amount, category, description, date }))),
+        success: function (response) {
+            if (response.errors.length > 0) {
+                notifications.warning(
+                    `Added ${response.expenses.length} of ${rows.length} expenses:\n` +
+                        response.errors.map((e) => `${rows[e.index].filename}: ${e.error}`).join("\n")
+                );
+            } else {
+                notifications.success(`Added ${rows.length} expenses`);
+            }
+            $("#receiptBatchModal").modal("hide");
+            loadExpenses();
+        },
+        error: function (xhr) {
+            notifications.error(xhr.responseJSON?.error || "Failed to add expenses");
+        },
+    });
+});
+
+function showOcrResult(job) {
+    if (job.status === "failed") {
+        alert(`Error: ${job.error}`);
+        return;
+    }
+    try {
+        const expense = JSON.parse(job.result);
+        if (expense.source === "fallback") {
+            // Read without the LLM: let the user check the guesses first
+            $("#amount").val(expense.amount || "");
+            $("#category").val(expense.category || "Other");
+            $("#description").val(expense.description || "");
+            if (expense.date) {
+                document.getElementById("date").value = expense.date;
+            }
+            notifications.warning("Receipt read without AI assistance, please check the details and save.");
+            return;
+        }
+        addExpense(expense);
+    } catch (e) {
+        alert("An unexpected error occurred. Please try again.");
+    }
+}
+
 async function addExpense(expenseData) {
     const formData = {
         amount: expenseData.amount,
@@ -627,6 +809,9 @@ document.addEventListener("DOMContentLoaded", function () {
     document.getElementById("uploadButton").addEventListener("click", function () {
         document.getElementById("uploadTemplate").click();
     });
+    document.getElementById("importButton").addEventListener("click", function () {
+        document.getElementById("uploadStatement").click();
+    });
     document.getElementById("ocrButton").addEventListener("click", function () {
         const fileInput = document.getElementById("uploadPicture");
         fileInput.click();
@@ -728,3 +913,9 @@ $("#processClipboardButton").on("click", function () {
         },
     });
 });
+
+document.getElementById("uploadStatement").addEventListener("change", function (e) {
+    const file = e.target.files[0];
+    e.target.value = "";
+    if (file) uploadStatement(file, "/api/expenses/import", "expenses", loadExpenses);
+});
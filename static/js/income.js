@@ -80,8 +80,10 @@ $(document).ready(function () {
     });
 });
 
+const syncIncomes = createDeltaSync("/api/incomes/changes");
+
 function loadData() {
-    $.get("/api/incomes", function (incomes) {
+    syncIncomes(function (incomes) {
         currentincomes = incomes;
         updateIncomeTable(incomes);
         filterAndSearchincomes();
@@ -181,6 +183,7 @@ document.getElementById("uploadTemplate").addEventListener("change", function (e
 
         const errors = [];
         const validRows = [];
+        const rowNumbers = [];
 
         // Skip header row
         for (let i = 1; i < jsonData.length; i++) {
@@ -235,6 +238,7 @@ document.getElementById("uploadTemplate").addEventListener("change", function (e
             }
 
             validRows.push({ date: dateWithTime, category, description, amount });
+            rowNumbers.push(i + 1);
         }
 
         if (errors.length > 0) {
@@ -246,7 +250,15 @@ document.getElementById("uploadTemplate").addEventListener("change", function (e
                 contentType: "application/json",
                 data: JSON.stringify(validRows),
                 success: function (response) {
-                    notifications.success("Upload successful!");
+                    // Rows the server rejected are reported, the rest are saved
+                    if (response.errors.length > 0) {
+                        notifications.warning(
+                            `Added ${response.incomes.length} of ${validRows.length} rows:\n` +
+                                response.errors.map((e) => `Row ${rowNumbers[e.index]}: ${e.error}`).join("\n")
+                        );
+                    } else {
+                        notifications.success("Upload successful!");
+                    }
                     $("#incomeForm")[0].reset();
                     document.getElementById("date").value = getFormattedDateTime();
                     loadData();
@@ -387,6 +399,9 @@ document.addEventListener("DOMContentLoaded", function () {
     document.getElementById("uploadButton").addEventListener("click", function () {
         document.getElementById("uploadTemplate").click();
     });
+    document.getElementById("importButton").addEventListener("click", function () {
+        document.getElementById("uploadStatement").click();
+    });
 });
 
 function filterAndSearchincomes() {
@@ -530,3 +545,9 @@ $(document)
     .on("mouseleave.remark-tooltip", ".remark-tooltip", function () {
         $(".custom-tooltip").remove();
     });
+
+document.getElementById("uploadStatement").addEventListener("change", function (e) {
+    const file = e.target.files[0];
+    e.target.value = "";
+    if (file) uploadStatement(file, "/api/incomes/import", "incomes", loadData);
+});
@@ -8,11 +8,9 @@ $(document).ready(() => {
 });
 });
 
-// Load all shared data
-function loadAllSharedData(cacheBuster) {
-    // Use current timestamp if no cache buster provided
-    cacheBuster = cacheBuster || new Date().getTime();
-    
+// Load all shared data. Responses carry ETags, so the browser revalidates
+// them and unchanged lists come back as cheap 304s.
+function loadAllSharedData() {
     // Clear all tables first
     $('#sharedByMeTableBody').empty();
     $('#sharedByMeIncomeTableBody').empty();
@@ -29,10 +27,9 @@ function loadAllSharedData(cacheBuster) {
     
     // Load shared by me data
     $.ajax({
-        url: '/api/share/by-me?_=' + cacheBuster,
+        url: '/api/share/by-me',
         method: 'GET',
         dataType: 'json',
-        cache: false,
         success: function(data) {
             renderTable(data, $('#sharedByMeTableBody'), '', false);
         },
@@ -44,10 +41,9 @@ function loadAllSharedData(cacheBuster) {
     
     // Load shared income by me data
     $.ajax({
-        url: '/api/share/income/by-me?_=' + cacheBuster,
+        url: '/api/share/income/by-me',
         method: 'GET',
         dataType: 'json',
-        cache: false,
         success: function(data) {
             renderTable(data, $('#sharedByMeIncomeTableBody'), 'Income', false);
         },
@@ -59,10 +55,9 @@ function loadAllSharedData(cacheBuster) {
     
     // Load shared with me data
     $.ajax({
-        url: '/api/share/with-me?_=' + cacheBuster,
+        url: '/api/share/with-me',
         method: 'GET',
         dataType: 'json',
-        cache: false,
         success: function(data) {
             renderTable(data, $('#sharedWithMeTableBody'), '', true);
         },
@@ -74,10 +69,9 @@ function loadAllSharedData(cacheBuster) {
     
     // Load shared income with me data
     $.ajax({
-        url: '/api/share/income/with-me?_=' + cacheBuster,
+        url: '/api/share/income/with-me',
         method: 'GET',
         dataType: 'json',
-        cache: false,
         success: function(data) {
             renderTable(data, $('#sharedWithMeIncomeTableBody'), 'Income', true);
         },
@@ -275,7 +269,7 @@ function cancelShare(button, sharedId, type) {
             success: function(response) {
                 notifications.success('Share canceled successfully');
                 // Reload all data after a successful operation
-                loadAllSharedData(new Date().getTime());
+                loadAllSharedData();
             },
             error: function(err) {
                 $(button).prop('disabled', false).html('<i class="fas fa-times"></i>');
@@ -1,6 +1,8 @@
+import time
+
 import pytest
 from app import create_app
-from models.models import db
+from models.models import db, DailyRollup, User
 
 
 @pytest.fixture(scope="module")
@@ -16,3 +18,41 @@ def app():
 @pytest.fixture
 def client(app):
     return app.test_client()
+
+
+def login_as(client, user):
+    """Log the test client in as user, as the login endpoint does."""
+    with client.session_transaction() as session:
+        session['user'] = {
+            'id': user.id,
+            'username': user.username,
+            'role': 'user',
+            'permission': 'basic'
+        }
+
+
+def login(client, username):
+    """Log the test client in as username, creating the user if needed."""
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        user = User(username=username, password='x', role='user')
+        db.session.add(user)
+        db.session.commit()
+    login_as(client, user)
+    return user
+
+
+def rollup_snapshot(user_id):
+    return sorted(
+        (r.kind, r.day.isoformat(), r.category, round(r.total, 2), r.count)
+        for r in DailyRollup.query.filter_by(user_id=user_id))
+
+
+def wait_for(client, job_id):
+    """Poll a receipt job until it is done or failed."""
+    for _ in range(100):
+        job = client.get('/api/expenses/by-ocr/' + job_id).get_json()
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError('job did not finish')
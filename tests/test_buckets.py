@@ -0,0 +1,110 @@
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from models.models import db, User, Expense
+from tests.conftest import login_as
+from utils.buckets import UNITS, bucket_of, bucket_range, bucket_start, label
+
+
+@pytest.mark.parametrize('unit', UNITS)
+def test_sql_buckets_match_python(app, unit):
+    user = User(username=f'bucket_{unit}', password='x', role='user')
+    db.session.add(user)
+    db.session.flush()
+    moments = [datetime(2024, 12, 28, 23, 30) + timedelta(days=3 * i, hours=i)
+               for i in range(150)]
+    db.session.add_all(Expense(user_id=user.id, amount=1, category='Food',
+                               date=moment) for moment in moments)
+    db.session.flush()
+
+    for week_start in range(7):
+        key = bucket_start(Expense.date, unit, week_start)
+        rows = db.session.query(Expense.date, key).filter(
+            Expense.user_id == user.id).all()
+        assert all(start == bucket_of(moment, unit, week_start)
+                   for moment, start in rows)
+    db.session.rollback()
+
+
+def test_postgresql_sql_and_helpers():
+    sql = str(bucket_start(Expense.date, 'week', 6).compile(
+        dialect=postgresql.dialect()))
+    assert sql == ("CAST(date_trunc('week', expense.date - INTERVAL '6 days') "
+                   "+ INTERVAL '6 days' AS DATE)")
+    assert str(bucket_start(Expense.date, 'quarter').compile(
+        dialect=postgresql.dialect())) == \
+        "CAST(date_trunc('quarter', expense.date) AS DATE)"
+
+    assert bucket_range(date(2025, 11, 15), 'quarter') == (
+        datetime(2025, 10, 1), datetime(2026, 1, 1))
+    assert label(date(2025, 4, 1), 'quarter') == 'Q2 2025'
+    with pytest.raises(ValueError):
+        bucket_start(Expense.date, 'fortnight')
+
+
+def test_comparison_by_week_and_month(client):
+    user = User(username='bucket_comparison', password='x', role='user')
+    db.session.add(user)
+    db.session.commit()
+    login_as(client, user)
+    client.post('/api/expenses/bulk', data=json.dumps([
+        {'date': '2025-03-02T10:00:00', 'amount': 5, 'category': 'Food'},
+        {'date': '2025-03-03T10:00:00', 'amount': 7, 'category': 'Food'},
+        {'date': '2025-04-01T10:00:00', 'amount': 9, 'category': 'Bills'},
+    ]), content_type='application/json')
+
+    def comparison(period):
+        return client.get('/api/income-expense-comparison?startDate=2025-01-01'
+                          f'&endDate=2025-06-30&period={period}').get_json()
+
+    weekly = comparison('weekly')
+    assert weekly['labels'] == ['Week of 2025-02-24', 'Week of 2025-03-03',
+                                'Week of 2025-03-31']
+    assert weekly['expense'] == [5.0, 7.0, 9.0]
+    # Months sort by date, not alphabetically
+    monthly = comparison('monthly')
+    assert monthly['labels'] == ['Mar 2025', 'Apr 2025']
+    assert monthly['expense'] == [12.0, 9.0]
+    assert comparison('quarterly')['labels'] == ['Q1 2025', 'Q2 2025']
+
+
+def test_period_summary_in_december(client, monkeypatch):
+    class December(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2025, 12, 17, 9, 30)
+
+    monkeypatch.setattr('routes.insights_routes.datetime', December)
+    user = User(username='bucket_december', password='x', role='user')
+    db.session.add(user)
+    db.session.commit()
+    login_as(client, user)
+    client.post('/api/expenses/bulk', data=json.dumps([
+        {'date': '2025-10-31T10:00:00', 'amount': 2, 'category': 'Food'},
+        {'date': '2025-11-30T10:00:00', 'amount': 3, 'category': 'Food'},
+        {'date': '2025-12-15T10:00:00', 'amount': 5, 'category': 'Food'},
+        {'date': '2025-12-31T23:00:00', 'amount': 7, 'category': 'Bills'},
+    ]), content_type='application/json')
+
+    def summary(period):
+        response = client.get(f'/api/insights/period-summary?period={period}')
+        assert response.status_code == 200
+        data = response.get_json()
+        return (data['dateRange']['startDate'], data['dateRange']['endDate'],
+                data['expense']['totalAmount'])
+
+    assert summary('month') == ('2025-12-01T00:00:00', '2026-01-01T00:00:00',
+                                12.0)
+    assert summary('prev-month') == ('2025-11-01T00:00:00',
+                                     '2025-12-01T00:00:00', 3.0)
+    assert summary('week') == ('2025-12-15T00:00:00', '2025-12-22T00:00:00',
+                               5.0)
+    assert summary('quarter') == ('2025-10-01T00:00:00',
+                                  '2026-01-01T00:00:00', 17.0)
+    assert summary('year')[:2] == ('2025-01-01T00:00:00',
+                                   '2026-01-01T00:00:00')
+    assert client.get('/api/insights/period-summary?period=decade'
+                      ).status_code == 400
@@ -0,0 +1,142 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import event
+
+from models.models import (db, User, Expense, DailyRollup, RecordChange,
+                           SharedExpense, SharedExpenseItem, ShareVisibility)
+from tests.conftest import login_as
+from utils.rollups import records_added
+from utils.shares import create_share
+
+
+def add_expenses(user, count, day=1):
+    expenses = [
+        Expense(user_id=user.id, amount=10, category='Food',
+                description='Bulk delete', date=datetime(2025, 3, day, 12))
+        for _ in range(count)
+    ]
+    db.session.add_all(expenses)
+    db.session.flush()
+    records_added(expenses)
+    db.session.commit()
+    return [e.id for e in expenses]
+
+
+def count_statements(fn):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context,
+                              executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute',
+                     before_cursor_execute)
+    assert response.status_code == 200, response.data
+    return len(statements)
+
+
+def create_pair(name):
+    owner = User(username=f'{name}_owner', password='x', role='user')
+    friend = User(username=f'{name}_friend', password='x', role='user')
+    db.session.add_all([owner, friend])
+    db.session.commit()
+    return owner, friend
+
+
+def test_bulk_delete_rewrites_shares(client):
+    owner, friend = create_pair('bulk_delete')
+    login_as(client, owner)
+    ids = add_expenses(owner, 5)
+
+    single = create_share('expense', [ids[3]], friend.id)
+    shrinking = create_share('expense', ids[:3], friend.id, is_bulk_share=True)
+    redundant = create_share('expense', ids[2:4], friend.id,
+                             is_bulk_share=True, is_repeat=True)
+    emptied = create_share('expense', [ids[0]], friend.id)
+    db.session.commit()
+    share_ids = [s.id for s in (single, shrinking, redundant, emptied)]
+    versions = {u.id: u.data_version for u in (owner, friend)}
+
+    response = client.post('/api/expenses/bulk-delete',
+                           data=json.dumps({'ids': ids[:3] + [999999]}),
+                           content_type='application/json')
+    assert response.status_code == 200
+    db.session.expire_all()
+
+    assert Expense.query.filter(Expense.id.in_(ids)).count() == 2
+    single, shrinking, redundant, emptied = [
+        db.session.get(SharedExpense, i) for i in share_ids]
+    # Shares that lost all their records are gone
+    assert emptied is None
+    assert shrinking is None
+    # Left with ids[3], which is already shared on its own
+    assert redundant is None
+    assert single.item_ids == [ids[3]]
+    assert SharedExpenseItem.query.filter(
+        SharedExpenseItem.expense_id.in_(ids[:3])).count() == 0
+
+    visibility = ShareVisibility.query.filter_by(recipient_id=friend.id).all()
+    assert [(v.item_id, v.share_count) for v in visibility] == [(ids[3], 1)]
+
+    tombstones = RecordChange.query.filter_by(user_id=owner.id,
+                                              deleted=True).all()
+    assert sorted(t.item_id for t in tombstones) == ids[:3]
+    assert db.session.get(User, owner.id).data_version == versions[owner.id] + 1
+    assert db.session.get(User, friend.id).data_version > versions[friend.id]
+
+    rollup = DailyRollup.query.filter_by(user_id=owner.id).one()
+    assert (rollup.total, rollup.count) == (20, 2)
+
+    # Deleting the rest leaves no empty rollups behind
+    client.post('/api/expenses/bulk-delete',
+                data=json.dumps({'ids': ids[3:]}),
+                content_type='application/json')
+    assert DailyRollup.query.filter_by(user_id=owner.id).count() == 0
+    assert SharedExpense.query.filter_by(shared_with_id=friend.id).count() == 0
+
+
+def test_bulk_delete_shrinks_bulk_share_to_single(client):
+    owner, friend = create_pair('bulk_shrink')
+    login_as(client, owner)
+    ids = add_expenses(owner, 4)
+    share = create_share('expense', ids[:3], friend.id, is_bulk_share=True)
+    other = create_share('expense', ids[1:], friend.id, is_bulk_share=True)
+    db.session.commit()
+    share_id, other_id = share.id, other.id
+
+    client.post('/api/expenses/bulk-delete',
+                data=json.dumps({'ids': ids[:2]}),
+                content_type='application/json')
+    db.session.expire_all()
+
+    share = db.session.get(SharedExpense, share_id)
+    assert not share.is_bulk_share and not share.is_repeat
+    assert share.expense_id == ids[2] and share.item_ids == [ids[2]]
+    # Processed after it, the other bulk share now overlaps a single share
+    other = db.session.get(SharedExpense, other_id)
+    assert other.is_bulk_share and other.is_repeat
+    assert other.expense_id == ids[2] and other.item_ids == ids[2:]
+
+
+def test_bulk_delete_statement_count_is_constant(client):
+    owner, friend = create_pair('bulk_constant')
+    login_as(client, owner)
+
+    counts = []
+    for count in (5, 50):
+        ids = add_expenses(owner, count, day=count % 28)
+        create_share('expense', ids[:count // 2], friend.id,
+                     is_bulk_share=True)
+        for expense_id in ids[count // 2:count // 2 + 3]:
+            create_share('expense', [expense_id], friend.id)
+        db.session.commit()
+        counts.append(count_statements(lambda: client.post(
+            '/api/expenses/bulk-delete',
+            data=json.dumps({'ids': ids}),
+            content_type='application/json')))
+    assert counts[0] == counts[1]
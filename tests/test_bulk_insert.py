@@ -0,0 +1,95 @@
+import json
+
+from models.models import db, User, Expense, Income
+from tests.conftest import login_as, rollup_snapshot
+from utils.rollups import rebuild_rollups
+
+
+def post_bulk(client, url, rows):
+    return client.post(url, data=json.dumps(rows),
+                       content_type='application/json')
+
+
+def test_bulk_insert_reports_bad_rows(client, app):
+    user = User(username='bulk_insert_user', password='x', role='user')
+    db.session.add(user)
+    db.session.commit()
+    login_as(client, user)
+
+    rows = [
+        {'date': '2025-03-01T09:30:00', 'amount': 12.5, 'category': 'Food',
+         'description': 'first'},
+        {'date': '2025-03-01T00:00', 'amount': '7.5', 'category': 'Food'},
+        {'date': '03/01/2025', 'amount': 1, 'category': 'Food'},
+        {'date': '2999-01-01T00:00:00', 'amount': 1, 'category': 'Food'},
+        {'date': '2025-03-02', 'amount': 'abc', 'category': 'Food'},
+        {'date': '2025-03-02', 'amount': 3, 'category': ''},
+        'not a row',
+        {'date': '2025-03-02', 'amount': 40, 'category': 'Bills',
+         'description': 'last'},
+    ]
+    app.config['BULK_INSERT_CHUNK_SIZE'] = 2
+    try:
+        response = post_bulk(client, '/api/expenses/bulk', rows)
+    finally:
+        app.config['BULK_INSERT_CHUNK_SIZE'] = 1000
+    assert response.status_code == 200
+    data = response.get_json()
+
+    assert [(e['index'], e['error']) for e in data['errors']] == [
+        (2, 'Invalid date format'),
+        (3, 'Date cannot be in the future'),
+        (4, 'Invalid amount'),
+        (5, 'Category is required'),
+        (6, 'Expected an object'),
+    ]
+    added = data['expenses']
+    assert [(e['amount'], e['date']) for e in added] == [
+        (12.5, '2025-03-01 09:30:00'),
+        (7.5, '2025-03-01 00:00:00'),
+        (40.0, '2025-03-02 00:00:00'),
+    ]
+    # Ids come back in the order the rows were sent, across chunks
+    for expense in added:
+        stored = db.session.get(Expense, expense['id'])
+        assert (stored.amount, stored.description, stored.type) == (
+            expense['amount'], expense['description'], 'expense')
+
+    assert rollup_snapshot(user.id) == [
+        ('expense', '2025-03-01', 'Food', 20.0, 2),
+        ('expense', '2025-03-02', 'Bills', 40.0, 1),
+    ]
+    changes = client.get('/api/expenses/changes?since=0').get_json()
+    assert {e['id'] for e in changes['changed']} == {e['id'] for e in added}
+
+    # A second batch adds to the existing rollups
+    response = post_bulk(client, '/api/expenses/bulk', [
+        {'date': '2025-03-01T18:00:00', 'amount': 5, 'category': 'Food'}])
+    assert response.status_code == 200
+    incremental = rollup_snapshot(user.id)
+    assert incremental[0] == ('expense', '2025-03-01', 'Food', 25.0, 3)
+    rebuild_rollups(user.id)
+    assert rollup_snapshot(user.id) == incremental
+
+
+def test_bulk_insert_rejects_batches_without_valid_rows(client):
+    user = User(username='bulk_insert_empty', password='x', role='user')
+    db.session.add(user)
+    db.session.commit()
+    login_as(client, user)
+
+    response = post_bulk(client, '/api/incomes/bulk', [
+        {'date': 'yesterday', 'amount': 1, 'category': 'Salary'}])
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [
+        {'index': 0, 'error': 'Invalid date format'}]
+
+    response = post_bulk(client, '/api/incomes/bulk', {'amount': 1})
+    assert response.status_code == 400
+    assert Income.query.filter_by(user_id=user.id).count() == 0
+
+    response = post_bulk(client, '/api/incomes/bulk', [
+        {'date': '2025-03-01T09:00:00', 'amount': 100, 'category': 'Salary'}])
+    assert response.status_code == 200
+    assert rollup_snapshot(user.id) == [
+        ('income', '2025-03-01', 'Salary', 100.0, 1)]
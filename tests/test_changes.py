@@ -0,0 +1,52 @@
+import json
+
+from models.models import db, User
+from tests.conftest import login_as
+
+
+def add_income(client, amount):
+    response = client.post('/api/incomes',
+                           data=json.dumps({
+                               'date': '2025-02-01T09:00:00',
+                               'amount': amount,
+                               'description': 'Sync income',
+                               'category': 'Salary',
+                           }),
+                           content_type='application/json')
+    return response.get_json()['income']['id']
+
+
+def test_changes_since_returns_only_new_rows_and_tombstones(client):
+    user = User(username='syncer', password='x', role='user')
+    db.session.add(user)
+    db.session.commit()
+    login_as(client, user)
+
+    first = add_income(client, 100)
+    second = add_income(client, 200)
+
+    data = client.get('/api/incomes/changes?since=0').get_json()
+    assert {i['id'] for i in data['changed']} == {first, second}
+    assert data['deleted'] == []
+    version = data['version']
+
+    # Nothing new since the last sync
+    data = client.get('/api/incomes/changes?since=%d' % version).get_json()
+    assert data == {'version': version, 'changed': [], 'deleted': []}
+
+    third = add_income(client, 300)
+    client.post('/api/incomes/delete',
+                data=json.dumps({'id': first}),
+                content_type='application/json')
+
+    data = client.get('/api/incomes/changes?since=%d' % version).get_json()
+    assert [i['id'] for i in data['changed']] == [third]
+    assert data['deleted'] == [first]
+    assert data['version'] == version + 2
+
+    # Expense changes are tracked separately
+    data = client.get('/api/expenses/changes?since=0').get_json()
+    assert data['changed'] == [] and data['deleted'] == []
+
+    response = client.get('/api/incomes/changes?since=abc')
+    assert response.status_code == 400
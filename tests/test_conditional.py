@@ -0,0 +1,59 @@
+import json
+
+from models.models import db, User
+from tests.conftest import login_as
+
+
+def test_unchanged_data_answers_304_until_a_write(client):
+    user = User(username='etag_user', password='x', role='user')
+    db.session.add(user)
+    db.session.commit()
+    login_as(client, user)
+    url = '/api/insights/summary?startDate=2025-01-01&endDate=2025-01-31'
+
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert not etag.startswith('W/')
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    # Different arguments never share a tag
+    response = client.get(url + '&x=1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+
+    client.post('/api/expenses',
+                data=json.dumps({
+                    'date': '2025-01-05T12:00:00',
+                    'amount': 12,
+                    'description': 'New',
+                    'category': 'Food',
+                }),
+                content_type='application/json')
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['totalAmount'] == 12
+
+
+def test_share_changes_recipient_etag(client):
+    owner = User.query.filter_by(username='etag_user').first()
+    friend = User(username='etag_friend', password='x', role='user')
+    db.session.add(friend)
+    db.session.commit()
+
+    login_as(client, friend)
+    etag = client.get('/api/share/with-me').headers['ETag']
+
+    login_as(client, owner)
+    expense_id = client.get('/api/expenses').get_json()[0]['id']
+    client.post('/api/share/%d' % expense_id,
+                data=json.dumps({'username': 'etag_friend'}),
+                content_type='application/json')
+
+    login_as(client, friend)
+    response = client.get('/api/share/with-me',
+                          headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert len(response.get_json()) == 1
@@ -0,0 +1,40 @@
+from sqlalchemy import event
+
+from models.models import db
+from tests.conftest import login
+from utils import diagnostics
+
+
+def test_date_range_runs_no_diagnostic_queries(client):
+    login(client, 'diag_user')
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get('/api/insights/summary?startDate=2025-01-01'
+                              '&endDate=2025-01-31')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response.headers
+    assert not any('count(' in s.lower() and 'daily_rollup' not in s.lower()
+                   for s in statements)
+
+
+def test_diagnostics_opt_in_reports_query_timings(client):
+    login(client, 'diag_user')
+    response = client.get('/api/insights/summary?startDate=2025-01-01'
+                          '&endDate=2025-01-31&diagnostics=1')
+    assert response.status_code == 200
+    timing = response.headers['Server-Timing']
+    assert timing.startswith('db;dur=')
+    assert ' queries"' in timing
+
+    # Listeners are removed once no diagnosed request is running
+    assert not diagnostics._listeners
+    assert not event.contains(db.engine, 'after_cursor_execute',
+                              diagnostics._after_cursor_execute)
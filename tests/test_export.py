@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from models.models import db, User, Expense, Income
+from tests.conftest import login_as
+from utils.shares import create_share
+
+
+def add_records(owner):
+    records = [
+        Expense(user_id=owner.id, amount=12.5, category='Food',
+                description='=HYPERLINK("x")', date=datetime(2025, 4, 1, 9)),
+        Expense(user_id=owner.id, amount=40, category='Bills',
+                description='Power, April', date=datetime(2025, 4, 2, 10)),
+        Expense(user_id=owner.id, amount=8, category='Food',
+                description='Lunch', date=datetime(2025, 5, 1, 12, 30)),
+        Income(user_id=owner.id, amount=1000, category='Salary',
+               description='Pay', date=datetime(2025, 4, 15)),
+    ]
+    db.session.add_all(records)
+    db.session.commit()
+    return records
+
+
+def test_export_own_expenses(client):
+    owner = User(username='export_owner', password='x', role='user')
+    db.session.add(owner)
+    db.session.commit()
+    expenses = add_records(owner)[:3]
+    login_as(client, owner)
+
+    response = client.get('/api/expenses/export?startDate=2025-04-01'
+                          '&endDate=2025-04-30')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert 'expenses.csv' in response.headers['Content-Disposition']
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows == [
+        ['id', 'date', 'category', 'description', 'amount'],
+        [str(expenses[1].id), '2025-04-02T10:00:00', 'Bills', 'Power, April',
+         '40.0'],
+        # Formulas are written as text
+        [str(expenses[0].id), '2025-04-01T09:00:00', 'Food',
+         '\'=HYPERLINK("x")', '12.5'],
+    ]
+
+    response = client.get('/api/expenses/export?format=ndjson&category=Food')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in
+             response.get_data(as_text=True).splitlines()]
+    assert [line['id'] for line in lines] == [expenses[2].id, expenses[0].id]
+    assert lines[0] == {'id': expenses[2].id, 'date': '2025-05-01T12:30:00',
+                        'category': 'Food', 'description': 'Lunch',
+                        'amount': 8.0}
+
+    response = client.get('/api/incomes/export?format=ndjson')
+    assert [json.loads(line)['category'] for line in
+            response.get_data(as_text=True).splitlines()] == ['Salary']
+
+    assert client.get('/api/expenses/export?format=xml').status_code == 400
+    assert client.get(
+        '/api/expenses/export?startDate=April').status_code == 400
+
+
+def test_export_shared_with_me(client):
+    owner = User(username='export_sharer', password='x', role='user')
+    viewer = User(username='export_viewer', password='x', role='user')
+    db.session.add_all([owner, viewer])
+    db.session.commit()
+    expenses = add_records(owner)[:3]
+    create_share('expense', [e.id for e in expenses[:2]], viewer.id,
+                 is_bulk_share=True)
+    db.session.commit()
+
+    login_as(client, viewer)
+    response = client.get('/api/share/export?category=Food')
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0][-1] == 'shared_by'
+    assert [(row[0], row[-1]) for row in rows[1:]] == [
+        (str(expenses[0].id), 'export_sharer')]
+
+    # Nothing of the viewer's own, and no incomes were shared
+    assert client.get('/api/expenses/export').get_data(
+        as_text=True).splitlines() == ['id,date,category,description,amount']
+    assert client.get('/api/share/income/export?format=ndjson').data == b''
+
+    with client.session_transaction() as session:
+        session.clear()
+    assert client.get('/api/share/export').status_code == 401
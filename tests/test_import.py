@@ -0,0 +1,193 @@
+import io
+import json
+from datetime import datetime, timezone
+
+from models.models import db, Expense, Income
+from tests.conftest import login, rollup_snapshot
+from utils.importer import parse_amount
+
+OFX = b"""OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250305120000[+8:AWST]<TRNAMT>-23.40
+<NAME>Cafe &amp; Co<MEMO>Card purchase</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250306<TRNAMT>2500.00
+<NAME>Payroll</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250307<TRNAMT>-9.99
+<MEMO>Streaming</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+QIF = b"""!Type:Cat
+NFood
+^
+!Type:Bank
+D03/08'25
+T-1,200.00
+PRent
+LHousing:Rent
+^
+D3/9/2025
+T45.00
+MRefund
+^
+D03/10/2025
+T-5.00
+L[Savings]
+^
+"""
+
+
+def post_import(client, url, data, filename, **form):
+    return client.post(url, data={'file': (io.BytesIO(data), filename),
+                                  **form},
+                       content_type='multipart/form-data')
+
+
+def read_lines(response):
+    assert response.status_code == 200, response.data
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in
+            response.get_data(as_text=True).splitlines()]
+
+
+def stored(model, user):
+    return [(r.date, r.amount, r.category, r.description) for r in
+            model.query.filter_by(user_id=user.id).order_by(model.date,
+                                                            model.id)]
+
+
+def test_parse_amount():
+    assert parse_amount('1,234.50') == 1234.5
+    assert parse_amount('1.234,50') == 1234.5
+    assert parse_amount('€1.234.567,89') == 1234567.89
+    assert parse_amount('12,50') == 12.5
+    assert parse_amount('(3.20)') == -3.2
+    assert parse_amount('  ') is None
+    assert parse_amount('abc') == 'abc'
+
+
+def test_import_csv_in_chunks(client, app):
+    user = login(client, 'import_csv')
+    db.session.add(Expense(user_id=user.id, amount=4.5, category='Food',
+                           description='Coffee',
+                           date=datetime(2025, 3, 1)))
+    db.session.commit()
+
+    statement = '\n'.join([
+        'Posted Date,Details,Value,Type',
+        '01/03/2025,Coffee,4.50,card',         # already stored
+        '02/03/2025,"Groceries, weekly","$1,020.10",card',
+        '03/03/2025,Bus,3,card',
+        '03/03/2025,Bus,3.00,card',            # same row twice
+        '04/03/2025,Lunch,abc,card',
+        '31/02/2025,Dinner,20,card',
+        '',
+        '2025-03-05T18:30:00,Cinema,$15,card',
+    ]).encode()
+    app.config['BULK_INSERT_CHUNK_SIZE'] = 3
+    try:
+        lines = read_lines(post_import(
+            client, '/api/expenses/import', statement, 'statement.csv',
+            mapping=json.dumps({'amount': 'Value'}), category='Imported'))
+    finally:
+        app.config['BULK_INSERT_CHUNK_SIZE'] = 1000
+
+    assert [line['status'] for line in lines] == ['progress'] * 3 + ['done']
+    # The second Bus row is in the next chunk, after the first was committed
+    assert [line['inserted'] for line in lines] == [2, 2, 3, 3]
+    assert lines[0]['bytes_read'] <= lines[0]['total_bytes'] == len(statement)
+    assert [e for line in lines[:-1] for e in line['errors']] == [
+        {'row': 6, 'error': 'Invalid amount'},
+        {'row': 7, 'error': 'Invalid date format'},
+    ]
+    assert lines[-1] == {'status': 'done', 'rows': 7, 'inserted': 3,
+                         'duplicates': 2, 'skipped': 0, 'failed': 2}
+
+    assert stored(Expense, user) == [
+        (datetime(2025, 3, 1), 4.5, 'Food', 'Coffee'),
+        (datetime(2025, 3, 2), 1020.1, 'Imported', 'Groceries, weekly'),
+        (datetime(2025, 3, 3), 3.0, 'Imported', 'Bus'),
+        (datetime(2025, 3, 5, 18, 30), 15.0, 'Imported', 'Cinema'),
+    ]
+    assert rollup_snapshot(user.id) == [
+        ('expense', '2025-03-02', 'Imported', 1020.1, 1),
+        ('expense', '2025-03-03', 'Imported', 3.0, 1),
+        ('expense', '2025-03-05', 'Imported', 15.0, 1),
+    ]
+
+    # Importing the same file again only finds duplicates
+    lines = read_lines(post_import(
+        client, '/api/expenses/import', statement, 'statement.csv',
+        mapping=json.dumps({'amount': 'Value'}), category='Imported'))
+    assert (lines[-1]['inserted'], lines[-1]['duplicates']) == (0, 5)
+
+
+def test_import_csv_debit_credit_columns(client):
+    user = login(client, 'import_signed')
+    statement = (b'\xef\xbb\xbfDate,Description,Debit,Credit\n'
+                 b'2025-03-01,Rent,800.00,\n'
+                 b'2025-03-02,Salary,,3000.00\n'
+                 b'2025-03-03,Groceries,55.20,\n')
+
+    lines = read_lines(post_import(client, '/api/incomes/import', statement,
+                                   'bank.csv', category='Salary'))
+    assert lines[-1]['inserted'] == 1 and lines[-1]['skipped'] == 2
+    lines = read_lines(post_import(client, '/api/expenses/import', statement,
+                                   'bank.csv'))
+    assert lines[-1]['inserted'] == 2 and lines[-1]['skipped'] == 1
+
+    assert stored(Income, user) == [
+        (datetime(2025, 3, 2), 3000.0, 'Salary', 'Salary')]
+    assert [(r[1], r[2]) for r in stored(Expense, user)] == [
+        (800.0, 'Other'), (55.2, 'Other')]
+
+
+def test_import_ofx_and_qif(client):
+    user = login(client, 'import_ofx')
+
+    lines = read_lines(post_import(client, '/api/expenses/import', OFX,
+                                   'march.qfx'))
+    assert lines[-1]['inserted'] == 2 and lines[-1]['skipped'] == 1
+    expenses = stored(Expense, user)
+    assert [(r[1], r[3]) for r in expenses] == [(23.4, 'Cafe & Co'),
+                                                 (9.99, 'Streaming')]
+    # Posted at noon in UTC+8, stored in local time
+    assert expenses[0][0] == datetime(
+        2025, 3, 5, 4, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+    lines = read_lines(post_import(client, '/api/incomes/import', QIF,
+                                   'march.qif'))
+    assert lines[-1]['inserted'] == 1
+    assert stored(Income, user) == [
+        (datetime(2025, 3, 9), 45.0, 'Other', 'Refund')]
+    read_lines(post_import(client, '/api/expenses/import', QIF, 'export.txt',
+                           format='qif'))
+    assert [(r[0], r[1], r[2]) for r in stored(Expense, user)][-2:] == [
+        (datetime(2025, 3, 8), 1200.0, 'Housing'),
+        (datetime(2025, 3, 10), 5.0, 'Other'),
+    ]
+
+
+def test_import_rejects_unusable_uploads(client):
+    login(client, 'import_bad')
+
+    response = post_import(client, '/api/expenses/import',
+                           b'When,Amount\n2025-03-01,5\n', 'a.csv')
+    assert response.status_code == 400
+    assert 'date column' in response.get_json()['error']
+    response = post_import(client, '/api/expenses/import',
+                           b'Date,Amount\n', 'a.csv',
+                           mapping=json.dumps({'amount': 'Total'}))
+    assert response.get_json()['error'] == 'Column not found: Total'
+    assert post_import(client, '/api/expenses/import', b'x', 'a.pdf'
+                       ).status_code == 400
+    assert client.post('/api/expenses/import', data={},
+                       content_type='multipart/form-data').status_code == 400
+
+    with client.session_transaction() as session:
+        session.clear()
+    assert post_import(client, '/api/incomes/import', b'Date,Amount\n',
+                       'a.csv').status_code == 401
@@ -0,0 +1,51 @@
+import json
+
+from models.models import db, User
+from tests.conftest import login_as
+from utils.cache import LRUTTLCache
+
+
+def test_lru_ttl_cache_evicts_and_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('utils.cache.time.monotonic', lambda: now[0])
+    cache = LRUTTLCache(max_entries=2, ttl=10)
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)  # 'b' is the least recently used
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+    now[0] += 11
+    assert cache.get('a') is None
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 2
+    assert cache.stats()['evictions'] == 1
+
+
+def test_insights_cache_hits_until_a_write(client):
+    user = User(username='cache_user', password='x', role='user')
+    db.session.add(user)
+    db.session.commit()
+    login_as(client, user)
+    url = '/api/insights/summary?startDate=2025-01-01&endDate=2025-01-31'
+
+    before = client.get('/api/insights/cache-stats').get_json()
+    client.get(url)
+    client.get(url)
+    stats = client.get('/api/insights/cache-stats').get_json()
+    assert stats['misses'] == before['misses'] + 1
+    assert stats['hits'] == before['hits'] + 1
+
+    client.post('/api/expenses',
+                data=json.dumps({
+                    'date': '2025-01-05T12:00:00',
+                    'amount': 30,
+                    'description': 'Cached',
+                    'category': 'Food',
+                }),
+                content_type='application/json')
+    assert client.get(url).get_json()['totalAmount'] == 30
+    stats = client.get('/api/insights/cache-stats').get_json()
+    assert stats['misses'] == before['misses'] + 2
@@ -0,0 +1,59 @@
+import json
+from datetime import datetime
+
+from models.models import db, User, Expense
+from tests.conftest import login_as
+
+
+def create_user_with_expenses():
+    user = User(username='lister', password='x', role='user')
+    db.session.add(user)
+    db.session.commit()
+    # Pairs of expenses share a timestamp so pages must break ties on id
+    for i in range(25):
+        db.session.add(
+            Expense(amount=i,
+                    category='Food' if i % 2 else 'Bills',
+                    description='Lunch %d' % i if i % 5 == 0 else 'Other',
+                    date=datetime(2025, 1, 1 + i // 2, 12, 0, 0),
+                    user_id=user.id))
+    db.session.commit()
+    return user
+
+
+def test_keyset_pages_cover_history_once(client):
+    user = create_user_with_expenses()
+    login_as(client, user)
+
+    legacy = client.get('/api/expenses').get_json()
+    assert isinstance(legacy, list) and len(legacy) == 25
+
+    seen = []
+    url = '/api/expenses?limit=7'
+    while True:
+        data = client.get(url).get_json()
+        assert len(data['expenses']) <= 7
+        seen.extend(e['id'] for e in data['expenses'])
+        if not data['has_more']:
+            assert data['next_cursor'] is None
+            break
+        url = '/api/expenses?limit=7&cursor=' + data['next_cursor']
+    assert seen == [e['id'] for e in legacy]
+
+    response = client.get('/api/expenses?limit=7&cursor=not-a-cursor')
+    assert response.status_code == 400
+
+
+def test_server_side_filters(client):
+    user = User.query.filter_by(username='lister').first()
+    login_as(client, user)
+
+    data = client.get('/api/expenses?category=Food&minAmount=5&maxAmount=15'
+                      '&startDate=2025-01-01&endDate=2025-01-06').get_json()
+    assert sorted(e['amount'] for e in data) == [5, 7, 9, 11]
+
+    data = client.get('/api/expenses?q=lunch&limit=50').get_json()
+    assert sorted(e['amount'] for e in data['expenses']) == [0, 5, 10, 15, 20]
+
+    response = client.get('/api/expenses?minAmount=abc')
+    assert response.status_code == 400
@@ -0,0 +1,173 @@
+import io
+import json
+import time
+
+import pytest
+
+from utils import llm
+from utils.jobs import JobQueue
+
+
+def test_backend_is_reused_per_settings():
+    settings = {'backend': 'openai', 'api_key': 'sk-test',
+                'model': 'gpt-4.1-nano', 'max_connections': 4}
+    backend = llm.get_backend(settings)
+    assert isinstance(backend, llm.OpenAIBackend)
+    assert llm.get_backend(dict(settings)) is backend
+    assert llm.get_backend({**settings, 'model': 'other'}) is not backend
+
+
+def test_local_backend_answers_after_latency():
+    settings = {'backend': 'local', 'latency': 0.05,
+                'response': '{"amount": 3}'}
+    start = time.perf_counter()
+    assert llm.process_receipt('TOTAL 3.00', settings) == '{"amount": 3}'
+    assert time.perf_counter() - start >= 0.05
+
+    default = llm.process_receipt('x', {'backend': 'local', 'latency': 0,
+                                        'response': None})
+    assert set(json.loads(default)) == {'amount', 'category', 'description',
+                                        'date'}
+
+
+def test_settings_follow_config(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'LLM_BACKEND', 'local')
+    monkeypatch.setitem(app.config, 'LLM_LOCAL_LATENCY', 0.0)
+    assert llm.settings_from_config(app.config)['backend'] == 'local'
+    assert json.loads(llm.process_receipt('TOTAL 1.00'))['category'] == 'Food'
+
+    monkeypatch.setitem(app.config, 'LLM_BACKEND', 'bogus')
+    with pytest.raises(ValueError):
+        llm.settings_from_config(app.config)
+
+
+class FlakyBackend:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def complete(self, prompt, timeout=None, count=1):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise TimeoutError('slow upstream')
+        return '{"amount": 1}'
+
+
+def test_retries_with_backoff_then_gives_up(monkeypatch):
+    monkeypatch.setattr(llm, 'backoff', lambda attempt: 0)
+    settings = {'backend': 'local', 'retries': 2, 'timeout': 1,
+                'deadline': 5, 'max_concurrent': 1}
+
+    flaky = FlakyBackend(failures=2)
+    monkeypatch.setattr(llm, 'get_backend', lambda settings: flaky)
+    assert llm.process_receipt('x', settings) == '{"amount": 1}'
+    assert flaky.calls == 3
+
+    flaky = FlakyBackend(failures=3)
+    with pytest.raises(llm.LLMUnavailable):
+        llm.process_receipt('x', settings)
+    assert flaky.calls == 3
+
+
+def test_local_backend_respects_deadline():
+    settings = {'backend': 'local', 'latency': 1.0, 'response': None,
+                'retries': 5, 'timeout': 0.05, 'deadline': 0.1,
+                'max_concurrent': 1}
+    start = time.perf_counter()
+    with pytest.raises(llm.LLMUnavailable):
+        llm.process_receipt('x', settings)
+    assert time.perf_counter() - start < 0.5
+
+
+def test_circuit_breaker_opens_and_recovers():
+    now = [0.0]
+    breaker = llm.CircuitBreaker(threshold=2, reset_timeout=10,
+                                 clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.retry_after() == 10
+
+    now[0] = 10
+    assert breaker.state == 'half_open'
+    assert breaker.allow()
+    # Only one trial call at a time while half-open
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+    now[0] = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.snapshot() == {'state': 'closed',
+                                  'consecutive_failures': 0, 'failures': 3,
+                                  'successes': 1, 'rejected': 2, 'opened': 2}
+
+
+def test_open_breaker_fails_fast_or_falls_back(app, client, monkeypatch):
+    from tests.conftest import login, wait_for
+    from utils.jobs import JobQueue
+
+    breaker = llm.CircuitBreaker(threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    monkeypatch.setitem(app.extensions, 'llm_breaker', breaker)
+    queue = JobQueue(executor='thread', max_workers=1)
+    monkeypatch.setitem(app.extensions, 'ocr_jobs', queue)
+    monkeypatch.setattr('utils.ocr.ocr_image',
+                        lambda data, preprocess=None: 'Corner Shop\nItem 4.20')
+    login(client, 'ocr_user')
+
+    def upload():
+        return client.post('/api/expenses/by-ocr',
+                           data={'file': (io.BytesIO(b'img'), 'r.jpg')},
+                           content_type='multipart/form-data')
+
+    monkeypatch.setitem(app.config, 'LLM_FALLBACK', False)
+    response = upload()
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '60'
+
+    monkeypatch.setitem(app.config, 'LLM_FALLBACK', True)
+    job = wait_for(client, upload().get_json()['job_id'])
+    queue.shutdown()
+    result = json.loads(job['result'])
+    assert result['source'] == 'fallback'
+    assert result['text'] == 'Corner Shop\nItem 4.20'
+    assert result['amount'] == 4.2
+
+    stats = client.get('/api/expenses/ocr-stats').get_json()
+    assert stats['llm_breaker']['state'] == 'open'
+    assert stats['llm_breaker']['rejected'] == 2
+
+
+def timed_receipt(settings, at):
+    # Runs in a spawned pool worker; both calls start together at `at`
+    time.sleep(max(0, at - time.time()))
+    llm.process_receipt('x', settings)
+    return time.time()
+
+
+def test_process_pool_shares_one_llm_limit():
+    settings = {'backend': 'local', 'latency': 0.3, 'response': None,
+                'retries': 0, 'timeout': 5, 'deadline': 5,
+                'max_concurrent': 1}
+    queue = JobQueue(executor='process', max_workers=2,
+                     llm_max_concurrent=1)
+    try:
+        at = time.time() + 3
+        jobs = [queue.submit(user_id, timed_receipt, settings, at)
+                for user_id in (1, 2)]
+        for _ in range(200):
+            states = [queue.status(job, user_id)
+                      for job, user_id in zip(jobs, (1, 2))]
+            if all(state['status'] == 'done' for state in states):
+                break
+            time.sleep(0.05)
+    finally:
+        queue.shutdown()
+    # Two workers, but the second call waited for the first
+    first, second = sorted(state['result'] for state in states)
+    assert second - first >= 0.25
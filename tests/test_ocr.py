@@ -0,0 +1,119 @@
+import io
+import multiprocessing
+import threading
+
+from PIL import Image
+
+from utils import ocr
+from utils.jobs import JobQueue
+from utils.ocr import ReaderRegistry, preprocess_image
+
+
+def photo_bytes(size, orientation=None):
+    image = Image.new('RGB', size, (200, 180, 160))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class FakeReader:
+    def __init__(self, languages):
+        self.languages = languages
+
+    def readtext(self, image, detail=0):
+        return ['TOTAL', '12.50']
+
+
+def test_readers_load_once_per_language_set():
+    loaded = []
+
+    def loader(languages):
+        loaded.append(languages)
+        return FakeReader(languages)
+
+    registry = ReaderRegistry(max_readers=2, loader=loader)
+    assert not registry.is_ready(['en'])
+
+    threads = [threading.Thread(target=registry.get, args=(['en'],))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loaded == [('en',)]
+    assert registry.is_ready(['en'])
+
+    # Language order does not matter; the oldest set is evicted past the limit
+    registry.get(['en', 'ch_sim'])
+    registry.get(['ch_sim', 'en'])
+    registry.get(['fr'])
+    assert loaded == [('en',), ('ch_sim', 'en'), ('fr',)]
+    assert not registry.is_ready(['en'])
+
+
+def test_ocr_image_reuses_registered_reader(monkeypatch):
+    registry = ReaderRegistry(loader=FakeReader)
+    monkeypatch.setattr(ocr, 'readers', registry)
+
+    image = photo_bytes((40, 30))
+    assert ocr.ocr_image(image) == 'TOTAL\n12.50'
+    reader, _ = registry.get(['en'])
+    assert ocr.ocr_image(image) == 'TOTAL\n12.50'
+    assert registry.get(['en'])[0] is reader
+
+
+def test_preprocess_rotates_downscales_and_grays():
+    # Orientation 6: the camera was rotated, so width and height swap
+    image = preprocess_image(photo_bytes((4000, 3000), orientation=6),
+                             {'target_long_side': 1600})
+    assert image.shape == (1600, 1200)
+
+    untouched = preprocess_image(photo_bytes((400, 300)), {
+        'exif_rotate': False,
+        'target_long_side': 0,
+        'grayscale': False,
+        'autocontrast': False
+    })
+    assert untouched.shape == (300, 400, 3)
+
+
+def test_pool_workers_warm_up_and_count_themselves(monkeypatch):
+    registry = ReaderRegistry(loader=FakeReader)
+    monkeypatch.setattr(ocr, 'readers', registry)
+    monkeypatch.setattr(ocr, '_warm_workers', None)
+
+    warm = multiprocessing.Value('i', 0)
+    ocr.init_worker(['en'], warm)
+    assert registry.is_ready(['en'])
+    assert warm.value == 1
+    # Counted once, not once per receipt
+    ocr.ocr_image(photo_bytes((40, 30)), preprocess=False)
+    assert warm.value == 1
+
+    # Without warm-up languages a worker counts once its first receipt is read
+    registry.clear()
+    ocr.init_worker([], warm)
+    assert warm.value == 1 and not registry.is_ready(['en'])
+    ocr.ocr_image(photo_bytes((40, 30)), preprocess=False)
+    assert warm.value == 2
+
+
+def test_readers_ready_reports_where_receipts_are_read(monkeypatch):
+    registry = ReaderRegistry(loader=FakeReader)
+    monkeypatch.setattr(ocr, 'readers', registry)
+
+    threads = JobQueue(executor='thread')
+    assert not threads.readers_ready(['en'])
+    registry.get(['en'])
+    assert threads.readers_ready(['en'])
+
+    # The web process's readers say nothing about process workers
+    processes = JobQueue(executor='process', max_workers=2)
+    assert not processes.readers_ready(['en'])
+    processes._warm_workers = multiprocessing.Value('i', 1)
+    assert not processes.readers_ready(['en'])
+    processes._warm_workers.value = 2
+    assert processes.readers_ready(['en'])
@@ -0,0 +1,66 @@
+import io
+import threading
+
+import pytest
+
+from tests.conftest import login, wait_for
+from utils.jobs import JobQueue
+
+
+@pytest.fixture
+def queue(app, monkeypatch):
+    release = threading.Event()
+
+    def fake_job(image_bytes, llm_settings, preprocess=None, cache=None,
+                 min_confidence=None, fallback=False):
+        release.wait(5)
+        if image_bytes == b'bad':
+            raise ValueError('Unreadable receipt')
+        return '{"amount": 12.5, "category": "Food"}'
+
+    queue = JobQueue(executor='thread', max_workers=1, max_pending=2,
+                     max_pending_per_user=2)
+    monkeypatch.setitem(app.extensions, 'ocr_jobs', queue)
+    monkeypatch.setattr('routes.expense_routes.run_receipt_job', fake_job)
+    yield queue, release
+    release.set()
+    queue.shutdown()
+
+
+def upload(client, content=b'image'):
+    return client.post('/api/expenses/by-ocr',
+                       data={'file': (io.BytesIO(content), 'receipt.jpg')},
+                       content_type='multipart/form-data')
+
+
+def test_ocr_upload_returns_job_and_result(client, queue):
+    _, release = queue
+    login(client, 'ocr_user')
+
+    response = upload(client)
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+    assert response.headers['Location'].endswith('/api/expenses/by-ocr/' + job_id)
+    assert client.get('/api/expenses/by-ocr/' + job_id).get_json()['status'] in (
+        'queued', 'running')
+
+    release.set()
+    job = wait_for(client, job_id)
+    assert job['status'] == 'done'
+    assert job['result'] == '{"amount": 12.5, "category": "Food"}'
+
+    failed = wait_for(client, upload(client, b'bad').get_json()['job_id'])
+    assert failed['status'] == 'failed'
+    assert failed['error'] == 'Unreadable receipt'
+
+    assert client.get('/api/expenses/by-ocr/unknown').status_code == 404
+
+
+def test_full_queue_applies_backpressure(client, queue):
+    login(client, 'ocr_user')
+    assert upload(client).status_code == 202
+    assert upload(client).status_code == 202
+
+    response = upload(client)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
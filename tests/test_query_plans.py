@@ -0,0 +1,128 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models.models import db, User, Expense, Income
+from tests.conftest import login_as
+from utils.rollups import rebuild_rollups
+from utils.shares import create_share
+
+# Tables whose rows grow with user history; any full scan on them is a bug
+TRACKED_TABLES = ('expense', 'income', 'shared_expense', 'shared_income',
+                  'shared_expense_item', 'shared_income_item', 'daily_rollup',
+                  'share_visibility')
+
+DATE_ARGS = 'startDate=2025-01-01&endDate=2025-03-31'
+
+INSIGHTS_URLS = [
+    '/api/expenses?limit=20',
+    '/api/expenses?limit=20&category=Food&' + DATE_ARGS,
+    '/api/incomes?limit=20&minAmount=110&' + DATE_ARGS,
+    '/api/insights?' + DATE_ARGS,
+    '/api/insights/summary?' + DATE_ARGS,
+    '/api/income-summary?' + DATE_ARGS,
+    '/api/income-expense-comparison?period=daily&' + DATE_ARGS,
+    '/api/income-expense-comparison?period=weekly&' + DATE_ARGS,
+    '/api/income-expense-comparison?period=monthly&' + DATE_ARGS,
+    '/api/income-by-month?' + DATE_ARGS,
+    '/api/expenses-by-month?' + DATE_ARGS,
+    '/api/insights/period-summary?period=month',
+    '/api/insights/today-debug',
+    '/api/insights/top-categories?' + DATE_ARGS,
+    '/api/insights/top-income-categories?' + DATE_ARGS,
+    '/api/shared-insights/users',
+    '/api/shared-insights/summary?sharer_id={owner}&' + DATE_ARGS,
+    '/api/shared-insights/top-categories?sharer_id={owner}&' + DATE_ARGS,
+    '/api/shared-insights/top-income-categories?sharer_id={owner}&' + DATE_ARGS,
+    '/api/shared-insights/by-month?sharer_id={owner}&type=expense&' + DATE_ARGS,
+    '/api/shared-insights/by-month?sharer_id={owner}&type=income&' + DATE_ARGS,
+    '/api/shared-insights/comparison?sharer_id={owner}&' + DATE_ARGS,
+    '/api/shared-insights/top-categories-all?' + DATE_ARGS,
+    '/api/shared-insights/top-income-categories-all?' + DATE_ARGS,
+    '/api/shared-insights/comparison-all?' + DATE_ARGS,
+    '/api/shared-insights/by-month-all?type=expense&' + DATE_ARGS,
+    '/api/shared-insights/summary-all?' + DATE_ARGS,
+    '/api/shared-insights/raw-data?sharer_id={owner}&' + DATE_ARGS,
+]
+
+
+@pytest.fixture(scope="module")
+def users(app):
+    owner = User(username='plan_owner', password='x', role='user')
+    viewer = User(username='plan_viewer', password='x', role='user')
+    db.session.add_all([owner, viewer])
+    db.session.commit()
+
+    start = datetime(2025, 1, 1, 12, 0, 0)
+    categories = ['Food', 'Bills', 'Shopping']
+    for user in (owner, viewer):
+        for i in range(60):
+            db.session.add(
+                Expense(amount=10 + i,
+                        category=categories[i % 3],
+                        description='Plan expense',
+                        date=start + timedelta(days=i),
+                        user_id=user.id))
+            db.session.add(
+                Income(amount=100 + i,
+                       category='Salary',
+                       description='Plan income',
+                       date=start + timedelta(days=i),
+                       user_id=user.id))
+    db.session.commit()
+    rebuild_rollups()
+
+    expense_ids = [e.id for e in Expense.query.filter_by(user_id=owner.id)]
+    income_ids = [i.id for i in Income.query.filter_by(user_id=owner.id)]
+    create_share('expense', expense_ids[:1], viewer.id)
+    create_share('expense', expense_ids[1:10], viewer.id, is_bulk_share=True)
+    create_share('income', income_ids[:1], viewer.id)
+    create_share('income', income_ids[1:10], viewer.id, is_bulk_share=True)
+    db.session.commit()
+    return owner, viewer
+
+
+def capture_statements(client, url):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context,
+                              executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute',
+                     before_cursor_execute)
+    assert response.status_code == 200, response.data
+    return statements
+
+
+def full_scans(statement, parameters):
+    connection = db.session.connection()
+    plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement,
+                                      parameters).fetchall()
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        words = detail.split()
+        if len(words) >= 2 and words[0] == 'SCAN' and words[1] in TRACKED_TABLES:
+            scans.append(detail)
+    return scans
+
+
+@pytest.mark.parametrize('url', INSIGHTS_URLS)
+def test_insights_queries_use_indexes(client, users, url):
+    owner, viewer = users
+    login_as(client, viewer)
+
+    statements = capture_statements(client, url.format(owner=owner.id))
+    assert statements
+
+    for statement, parameters in statements:
+        scans = full_scans(statement, parameters)
+        assert not scans, '%s\n%s' % (statement, json.dumps(scans))
@@ -0,0 +1,209 @@
+import io
+import json
+import threading
+import time
+
+import flask
+import pytest
+from flask_wtf.csrf import generate_csrf
+
+from models.models import Expense
+from tests.conftest import login
+from utils import llm
+from utils.jobs import JobQueue
+
+# Read confidently by the local parser, without the LLM
+RECEIPT = """WOOLWORTHS NEDLANDS
+03/04/2025 09:15
+MILK 2L 3.10
+BREAD 4.50
+SUBTOTAL 7.60
+TOTAL
+$7.60
+EFTPOS APPROVED"""
+
+TEXTS = {
+    b'parsed': RECEIPT,
+    b'one': 'corner shop\nitem 3.00',
+    b'two': 'market stall\nitem 4.00',
+    b'three': 'kiosk\nitem 5.00',
+}
+
+
+@pytest.fixture
+def batch_app(app, monkeypatch):
+    slow = threading.Event()
+
+    def fake_ocr(data, preprocess=None):
+        if data == b'slow':
+            slow.wait(5)
+            return TEXTS[b'one']
+        if data not in TEXTS:
+            raise ValueError('Unreadable receipt')
+        return TEXTS[data]
+
+    queue = JobQueue(executor='thread', max_workers=2, max_pending_per_user=8)
+    monkeypatch.setitem(app.extensions, 'ocr_jobs', queue)
+    monkeypatch.setitem(app.extensions, 'llm_breaker', llm.CircuitBreaker())
+    monkeypatch.setitem(app.config, 'LLM_BACKEND', 'local')
+    monkeypatch.setitem(app.config, 'LLM_LOCAL_LATENCY', 0.0)
+    monkeypatch.setitem(app.config, 'LLM_BATCH_SIZE', 2)
+    monkeypatch.setattr('utils.ocr.ocr_image', fake_ocr)
+    calls = []
+    complete = llm._complete
+    monkeypatch.setattr(llm, '_complete', lambda prompt, settings, count=1:
+                        calls.append(count) or complete(prompt, settings,
+                                                        count))
+    yield app, calls, slow
+    slow.set()
+    queue.shutdown()
+
+
+def post_batch(client, contents):
+    files = [(io.BytesIO(content), f'r{i}.jpg')
+             for i, content in enumerate(contents)]
+    return client.post('/api/expenses/by-ocr/batch', data={'files': files},
+                       content_type='multipart/form-data')
+
+
+def poll(client, batch_id, until):
+    """Collect a batch's lines with its cursor until until(batch) holds."""
+    lines = []
+    for _ in range(100):
+        batch = client.get(f'/api/expenses/by-ocr/batch/{batch_id}'
+                           f'?since={len(lines)}').get_json()
+        assert batch['next'] == len(lines) + len(batch['lines'])
+        lines += batch['lines']
+        if until(batch, lines):
+            return lines
+        time.sleep(0.02)
+    raise AssertionError('batch did not get there')
+
+
+def upload(client, contents):
+    response = post_batch(client, contents)
+    assert response.status_code == 202, response.data
+    lines = poll(client, response.get_json()['batch_id'],
+                 lambda batch, lines: batch['status'] == 'done')
+    return sorted(lines, key=lambda line: line['index'])
+
+
+def test_batch_reads_each_receipt_as_a_job(client, batch_app):
+    app, calls, _ = batch_app
+    login(client, 'ocr_user')
+
+    lines = upload(client, [b'parsed', b'one', b'bad', b'two', b'three'])
+    assert [line['filename'] for line in lines] == [
+        'r0.jpg', 'r1.jpg', 'r2.jpg', 'r3.jpg', 'r4.jpg']
+    assert json.loads(lines[0]['result'])['source'] == 'parser'
+    assert lines[2] == {'index': 2, 'filename': 'r2.jpg', 'status': 'failed',
+                        'result': None, 'error': 'Unreadable receipt',
+                        'source': None}
+    assert [lines[i]['source'] for i in (1, 3, 4)] == ['llm'] * 3
+    # One job per image, then the three texts the parser could not read
+    # go to the LLM as a batch of two and one of one
+    assert len(app.extensions['ocr_jobs']._jobs) == 7
+    assert sorted(calls) == [1, 2]
+
+    # Confirmed rows go through the bulk endpoint in one request
+    rows = [json.loads(line['result']) for line in lines
+            if line['status'] == 'done']
+    before = Expense.query.count()
+    assert client.post('/api/expenses/bulk', json=rows).status_code == 200
+    assert Expense.query.count() == before + 4
+
+
+def test_batch_lines_arrive_as_receipts_finish(client, batch_app):
+    _, _, slow = batch_app
+    login(client, 'ocr_user')
+
+    response = post_batch(client, [b'slow', b'parsed'])
+    assert response.status_code == 202
+    batch_id = response.get_json()['batch_id']
+    assert response.headers['Location'].endswith(batch_id)
+    early = poll(client, batch_id, lambda batch, lines: lines)
+    assert [line['filename'] for line in early] == ['r1.jpg']
+    assert client.get(f'/api/expenses/by-ocr/batch/{batch_id}'
+                      ).get_json()['status'] == 'running'
+
+    slow.set()
+    lines = poll(client, batch_id,
+                 lambda batch, lines: batch['status'] == 'done')
+    assert [line['filename'] for line in lines] == ['r1.jpg', 'r0.jpg']
+
+    login(client, 'other_user')
+    assert client.get(f'/api/expenses/by-ocr/batch/{batch_id}'
+                      ).status_code == 404
+
+
+def test_batch_falls_back_while_breaker_is_open(app, client, batch_app):
+    breaker = app.extensions['llm_breaker']
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+    login(client, 'ocr_user')
+
+    lines = upload(client, [b'one', b'two'])
+    assert [json.loads(line['result'])['source'] for line in lines] == [
+        'fallback', 'fallback']
+
+
+def test_batch_limits(app, client, batch_app, monkeypatch):
+    login(client, 'ocr_user')
+    monkeypatch.setitem(app.config, 'OCR_BATCH_MAX_FILES', 1)
+    response = post_batch(client, [b'one', b'two'])
+    assert response.status_code == 400
+    assert response.get_json()['max_files'] == 1
+    assert client.post('/api/expenses/by-ocr/batch').status_code == 400
+
+    # A batch larger than the per-user limit could never be accepted
+    monkeypatch.setitem(app.config, 'OCR_BATCH_MAX_FILES', 20)
+    app.extensions['ocr_jobs'].max_pending_per_user = 2
+    response = post_batch(client, [b'one', b'two', b'three'])
+    assert response.get_json()['max_files'] == 2
+
+
+def test_batch_counts_against_the_queue_limits(app, client, monkeypatch):
+    release = threading.Event()
+    queue = JobQueue(executor='thread', max_workers=1, max_pending=3,
+                     max_pending_per_user=2)
+    monkeypatch.setitem(app.extensions, 'ocr_jobs', queue)
+    monkeypatch.setitem(app.extensions, 'llm_breaker', llm.CircuitBreaker())
+    monkeypatch.setattr('utils.receipt_batch.read_receipt',
+                        lambda *args: release.wait(5) and {'result': '{}',
+                                                           'source': 'parser'})
+    login(client, 'ocr_user')
+    try:
+        # Each receipt is a pending job of its own
+        assert post_batch(client, [b'one', b'two']).status_code == 202
+        assert queue.pending() == 2
+        response = post_batch(client, [b'three'])
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '5'
+        assert queue.pending() == 2
+    finally:
+        release.set()
+        queue.shutdown()
+
+
+def test_batch_requires_csrf_token(app, client, batch_app, monkeypatch):
+    login(client, 'ocr_user')
+    # csrf_required is skipped in testing mode
+    monkeypatch.setitem(app.config, 'TESTING', False)
+
+    def post(**form):
+        return client.post('/api/expenses/by-ocr/batch',
+                           data={'files': [(io.BytesIO(b'one'), 'a.jpg')],
+                                 **form},
+                           content_type='multipart/form-data')
+
+    response = post()
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid CSRF token'
+    assert post(csrf_token='forged').status_code == 400
+
+    with app.test_request_context():
+        token = generate_csrf()
+        raw = flask.session['csrf_token']
+    with client.session_transaction() as session:
+        session['csrf_token'] = raw
+    assert post(csrf_token=token).status_code == 202
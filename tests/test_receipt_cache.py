@@ -0,0 +1,91 @@
+import io
+import os
+
+from tests.conftest import login
+from utils import receipt_cache
+from utils.jobs import run_receipt_job
+from utils.receipt_cache import DiskCache
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=250)
+    cache.set('ocr', 'a' * 64, 'x' * 100)
+    cache.set('ocr', 'b' * 64, 'y' * 100)
+    # Reading refreshes 'a', so 'b' is the oldest entry when 'c' arrives
+    path_b = cache._path('ocr', 'b' * 64)
+    os.utime(path_b, (1, 1))
+    assert cache.get('ocr', 'a' * 64) == 'x' * 100
+    cache.set('llm', 'c' * 64, 'z' * 100)
+
+    assert cache.get('ocr', 'b' * 64) is None
+    assert cache.get('ocr', 'a' * 64) == 'x' * 100
+    assert cache.get('llm', 'c' * 64) == 'z' * 100
+
+
+def test_disk_cache_scans_only_when_over_the_limit(tmp_path, monkeypatch):
+    walks = []
+    walk = os.walk
+    monkeypatch.setattr(os, 'walk', lambda top: walks.append(top) or walk(top))
+    (tmp_path / 'ocr').mkdir()
+    (tmp_path / 'ocr' / 'old').write_text('o' * 100)
+
+    cache = DiskCache(str(tmp_path), max_bytes=1000, low_water=0.5)
+    for i in range(8):
+        cache.set('ocr', f'{i:02d}' * 32, 'x' * 100)
+    # One scan counts what was there; rewriting an entry does not add to it
+    cache.set('ocr', '00' * 32, 'y' * 100)
+    assert len(walks) == 1 and cache._total == 900
+
+    cache.set('ocr', '08' * 32, 'x' * 100)
+    cache.set('ocr', '09' * 32, 'x' * 100)
+    # Over the limit: trimmed to low water, oldest first
+    assert len(walks) == 2
+    assert cache._total == sum(
+        path.stat().st_size for path in tmp_path.rglob('*') if path.is_file())
+    assert cache._total <= 500
+    assert not (tmp_path / 'ocr' / 'old').exists()
+    assert cache.get('ocr', '09' * 32) == 'x' * 100
+
+
+def test_keys_follow_content():
+    assert receipt_cache.text_key('TOTAL  12.50\n') == \
+        receipt_cache.text_key('TOTAL 12.50')
+    assert receipt_cache.image_key(b'img') != receipt_cache.image_key(b'img2')
+    assert receipt_cache.image_key(b'img') != receipt_cache.image_key(
+        b'img', preprocess={'crop': True})
+
+
+def test_receipt_job_reuses_cached_stages(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr('utils.ocr.ocr_image',
+                        lambda data, preprocess=None: calls.append('ocr')
+                        or 'TOTAL 12.50')
+    monkeypatch.setattr('utils.llm.process_receipt',
+                        lambda text, settings=None: calls.append('llm')
+                        or '{"amount": 12.5}')
+    settings = {'directory': str(tmp_path), 'max_bytes': 1024 * 1024}
+
+    assert run_receipt_job(b'img', 'key', None, settings) == '{"amount": 12.5}'
+    # A different photo of the same receipt only needs OCR
+    assert run_receipt_job(b'img2', 'key', None, settings) == '{"amount": 12.5}'
+    assert run_receipt_job(b'img', 'key', None, settings) == '{"amount": 12.5}'
+    assert calls == ['ocr', 'llm', 'ocr']
+
+
+def test_cached_receipt_skips_the_queue(app, client, tmp_path, monkeypatch):
+    settings = {'directory': str(tmp_path), 'max_bytes': 1024 * 1024}
+    monkeypatch.setitem(app.config, 'RECEIPT_CACHE', settings)
+    cache = receipt_cache.from_settings(settings)
+    preprocess = app.config.get('OCR_PREPROCESS')
+    cache.set('ocr', receipt_cache.image_key(b'seen', preprocess=preprocess),
+              'TOTAL 9.00')
+    cache.set('llm', receipt_cache.text_key('TOTAL 9.00'), '{"amount": 9}')
+
+    login(client, 'cache_user')
+
+    response = client.post('/api/expenses/by-ocr',
+                           data={'file': (io.BytesIO(b'seen'), 'r.jpg')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'done'
+    assert response.get_json()['result'] == '{"amount": 9}'
@@ -0,0 +1,72 @@
+import json
+
+from forms.auth_forms import ExpensesForm
+from utils import receipt_parser
+from utils.jobs import run_receipt_job
+from utils.receipt_parser import parse_receipt
+
+RECEIPT = """SPUDSHED CLAREMONT
+12/03/2025 14:22
+BANANAS 1KG 3.90
+SUBTOTAL 29.50
+GST 2.68
+TOTAL
+$29.50
+EFTPOS APPROVED"""
+
+
+def test_parses_well_structured_receipt():
+    record, confidence = parse_receipt(RECEIPT)
+    assert record == {
+        'amount': 29.5,
+        'category': 'Food',
+        'description': 'Groceries at Spudshed Claremont',
+        'date': '2025-03-12T14:22:00'
+    }
+    assert confidence == 1.0
+
+
+def test_merchant_and_date_variants():
+    record, _ = parse_receipt('Shell Coles Express\n2025-03-12 2:05 pm\n'
+                              'Unleaded 45.10L\nTOTAL AUD 1,234.56')
+    assert record['category'] == 'Transportation'
+    assert record['amount'] == 1234.56
+    assert record['date'] == '2025-03-12T14:05:00'
+
+    record, confidence = parse_receipt('Thanks for visiting\n4 May 25\n'
+                                       'Item 5.00\nItem 7.25')
+    assert record['amount'] == 7.25
+    assert record['category'] == 'Other'
+    assert record['date'] == '2025-05-04T00:00:00'
+    assert confidence < 0.8
+
+
+def test_categories_match_expense_form():
+    choices = {value for value, _ in ExpensesForm.category.kwargs['choices']}
+    assert set(receipt_parser.MERCHANT_KEYWORDS) <= choices
+
+
+def test_low_confidence_falls_through_to_llm(monkeypatch):
+    texts = iter([RECEIPT, 'smudged receipt 5.00'])
+    monkeypatch.setattr('utils.ocr.ocr_image',
+                        lambda data, preprocess=None: next(texts))
+    llm_calls = []
+    monkeypatch.setattr('utils.llm.process_receipt',
+                        lambda text, settings=None: llm_calls.append(text)
+                        or '{"amount": 5}')
+
+    fast = json.loads(run_receipt_job(b'a', 'key', None, None, 0.8))
+    assert fast['source'] == 'parser' and fast['amount'] == 29.5
+    assert run_receipt_job(b'b', 'key', None, None, 0.8) == '{"amount": 5}'
+    assert llm_calls == ['smudged receipt 5.00']
+
+
+def test_fast_path_stats():
+    stats = receipt_parser.FastPathStats()
+    assert stats.snapshot()['fast_path_rate'] is None
+    stats.record_result(receipt_parser.extract(RECEIPT, 0.8))
+    stats.record_result('{"amount": 5}')
+    stats.record_result('not json')
+    stats.record('cache')
+    assert stats.snapshot() == {'parser': 1, 'llm': 2, 'fallback': 0,
+                                'cache': 1, 'fast_path_rate': 0.333}
@@ -0,0 +1,67 @@
+import json
+
+from sqlalchemy import func
+
+from models.models import db, User, Expense
+from tests.conftest import login_as, rollup_snapshot
+from utils.rollups import rebuild_rollups
+
+
+def test_rollups_follow_adds_and_deletes(client):
+    user = User(username='rollup_user', password='x', role='user')
+    db.session.add(user)
+    db.session.commit()
+    login_as(client, user)
+
+    client.post('/api/expenses',
+                data=json.dumps({
+                    'date': '2025-02-01T09:00:00',
+                    'amount': 12.5,
+                    'category': 'Food',
+                }),
+                content_type='application/json')
+    response = client.post('/api/expenses/bulk',
+                           data=json.dumps([{
+                               'date': '2025-02-01T18:00:00',
+                               'amount': 7.5,
+                               'category': 'Food',
+                           }, {
+                               'date': '2025-02-02T10:00:00',
+                               'amount': 40,
+                               'category': 'Bills',
+                           }]),
+                           content_type='application/json')
+    bulk_ids = [e['id'] for e in response.get_json()['expenses']]
+    client.post('/api/incomes',
+                data=json.dumps({
+                    'date': '2025-02-01T09:00:00',
+                    'amount': 1000,
+                    'category': 'Salary',
+                }),
+                content_type='application/json')
+
+    assert rollup_snapshot(user.id) == [
+        ('expense', '2025-02-01', 'Food', 20.0, 2),
+        ('expense', '2025-02-02', 'Bills', 40.0, 1),
+        ('income', '2025-02-01', 'Salary', 1000.0, 1),
+    ]
+
+    client.post('/api/expenses/bulk-delete',
+                data=json.dumps({'ids': bulk_ids}),
+                content_type='application/json')
+    assert rollup_snapshot(user.id) == [
+        ('expense', '2025-02-01', 'Food', 12.5, 1),
+        ('income', '2025-02-01', 'Salary', 1000.0, 1),
+    ]
+
+    incremental = rollup_snapshot(user.id)
+    rebuild_rollups(user.id)
+    assert rollup_snapshot(user.id) == incremental
+
+    response = client.get(
+        '/api/insights/summary?startDate=2025-02-01&endDate=2025-02-28')
+    data = response.get_json()
+    raw_total = db.session.query(func.sum(Expense.amount)).filter(
+        Expense.user_id == user.id).scalar()
+    assert data['totalEntries'] == 1
+    assert data['totalAmount'] == raw_total
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+from models.models import db, User, Expense, Income
+from tests.conftest import login_as
+from utils.shares import create_share
+
+
+def test_shared_aggregates_count_each_record_once(client):
+    owner = User(username='agg_owner', password='x', role='user')
+    other = User(username='agg_other', password='x', role='user')
+    viewer = User(username='agg_viewer', password='x', role='user')
+    db.session.add_all([owner, other, viewer])
+    db.session.commit()
+
+    rows = [
+        (owner, 10, 'Food', datetime(2024, 3, 1, 9)),
+        (owner, 20, 'Food', datetime(2024, 3, 1, 18)),
+        (owner, 5, 'Bills', datetime(2024, 4, 2, 12)),
+        (other, 7, 'Food', datetime(2024, 4, 2, 12)),
+    ]
+    expenses = []
+    for user, amount, category, date in rows:
+        expense = Expense(amount=amount, category=category, description='agg',
+                          date=date, user_id=user.id)
+        db.session.add(expense)
+        expenses.append(expense)
+    income = Income(amount=100, category='Salary', description='agg',
+                    date=datetime(2024, 3, 1, 8), user_id=owner.id)
+    db.session.add(income)
+    db.session.commit()
+
+    # The first record is covered by both a single and a bulk share
+    create_share('expense', [expenses[0].id], viewer.id)
+    create_share('expense', [e.id for e in expenses[:3]], viewer.id,
+                 is_bulk_share=True, is_repeat=True)
+    create_share('expense', [expenses[3].id], viewer.id)
+    create_share('income', [income.id], viewer.id)
+    db.session.commit()
+
+    login_as(client, viewer)
+    dates = 'startDate=2024-03-01&endDate=2024-04-30'
+
+    data = client.get('/api/shared-insights/summary?sharer_id=%d&%s'
+                      % (owner.id, dates)).get_json()
+    assert data['expense']['totalEntries'] == 3
+    assert data['expense']['totalAmount'] == 35
+    distribution = data['expense']['categoryDistribution']
+    assert dict(zip(distribution['labels'], distribution['values'])) == {
+        'Bills': 5, 'Food': 30}
+    assert data['income']['totalAmount'] == 100
+
+    data = client.get('/api/shared-insights/by-month-all?type=expense&'
+                      + dates).get_json()
+    assert data['labels'] == ['Mar 2024', 'Apr 2024']
+    assert data['values'] == [30, 12]
+
+    data = client.get('/api/shared-insights/comparison?sharer_id=%d&%s'
+                      % (owner.id, dates)).get_json()
+    assert data['labels'] == ['2024-03-01', '2024-04-02']
+    assert data['expense'] == [30, 5]
+    assert data['income'] == [100, 0]
+
+    data = client.get('/api/shared-insights/top-categories-all?'
+                      + dates).get_json()
+    assert data['labels'] == ['Food', 'Bills']
+    assert data['values'] == [37, 5]
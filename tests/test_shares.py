@@ -0,0 +1,170 @@
+import json
+from datetime import datetime
+
+from models.models import (db, User, SharedExpense, SharedExpenseItem,
+                           ShareVisibility)
+from tests.conftest import login_as
+
+
+def create_users():
+    owner = User.query.filter_by(username='owner').first()
+    if not owner:
+        owner = User(username='owner', password='x', role='user')
+        friend = User(username='friend', password='x', role='user')
+        db.session.add_all([owner, friend])
+        db.session.commit()
+    return owner, User.query.filter_by(username='friend').first()
+
+
+def add_expenses(client, count):
+    ids = []
+    for i in range(count):
+        response = client.post('/api/expenses',
+                               data=json.dumps({
+                                   'date': '2025-01-0%dT12:00:00' % (i % 9 + 1),
+                                   'amount': 10 + i,
+                                   'description': 'Shared expense',
+                                   'category': 'Food',
+                               }),
+                               content_type='application/json')
+        ids.append(response.get_json()['expense']['id'])
+    return ids
+
+
+def test_bulk_share_creates_one_item_per_expense(client):
+    owner, friend = create_users()
+    login_as(client, owner)
+    ids = add_expenses(client, 3)
+
+    response = client.post('/api/share/bulk',
+                           data=json.dumps({
+                               'ids': ids,
+                               'username': 'friend'
+                           }),
+                           content_type='application/json')
+    assert response.status_code == 200
+
+    share = SharedExpense.query.get(response.get_json()['shared_id'])
+    assert share.is_bulk_share
+    assert share.item_ids == sorted(ids)
+
+    # Sharing the same combination again is rejected
+    response = client.post('/api/share/bulk',
+                           data=json.dumps({
+                               'ids': list(reversed(ids)),
+                               'username': 'friend'
+                           }),
+                           content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_delete_expense_shrinks_bulk_share(client):
+    owner, friend = create_users()
+    login_as(client, owner)
+    ids = add_expenses(client, 2)
+    response = client.post('/api/share/bulk',
+                           data=json.dumps({
+                               'ids': ids,
+                               'username': 'friend'
+                           }),
+                           content_type='application/json')
+    shared_id = response.get_json()['shared_id']
+
+    # Deleting the anchor expense keeps the share for the remaining one
+    response = client.post('/api/expenses/delete',
+                           data=json.dumps({'id': ids[0]}),
+                           content_type='application/json')
+    assert response.status_code == 200
+
+    share = SharedExpense.query.get(shared_id)
+    assert share is not None
+    assert not share.is_bulk_share
+    assert share.expense_id == ids[1]
+    assert share.item_ids == [ids[1]]
+    assert SharedExpenseItem.query.filter_by(expense_id=ids[0]).count() == 0
+
+
+def test_shared_with_me_does_not_match_partial_ids(client):
+    owner, friend = create_users()
+    login_as(client, owner)
+    ids = add_expenses(client, 12)
+    # Share the last expense only; its id contains the digits of earlier ids
+    client.post('/api/share/%d' % ids[-1],
+                data=json.dumps({'username': 'friend'}),
+                content_type='application/json')
+    client.post('/api/share/bulk',
+                data=json.dumps({
+                    'ids': ids[:2],
+                    'username': 'friend'
+                }),
+                content_type='application/json')
+
+    login_as(client, friend)
+    response = client.get('/api/share/with-me')
+    assert response.status_code == 200
+    singles = [s for s in response.get_json() if not s['is_bulk']]
+    assert any(s['id'] == ids[-1] and not s['is_repeat'] for s in singles)
+
+
+def test_visibility_survives_cancelling_overlapping_share(client):
+    owner, friend = create_users()
+    login_as(client, owner)
+    ids = add_expenses(client, 2)
+    single_id = client.post('/api/share/%d' % ids[0],
+                            data=json.dumps({'username': 'friend'}),
+                            content_type='application/json').get_json()['shared_id']
+    client.post('/api/share/bulk',
+                data=json.dumps({
+                    'ids': ids,
+                    'username': 'friend'
+                }),
+                content_type='application/json')
+
+    row = db.session.get(ShareVisibility, (friend.id, 'expense', ids[0]))
+    assert row.share_count == 2
+    assert row.owner_id == owner.id
+
+    # The bulk share still covers the first expense
+    response = client.post('/api/share/cancel',
+                           data=json.dumps({'shared_id': single_id}),
+                           content_type='application/json')
+    assert response.status_code == 200
+    assert db.session.get(ShareVisibility, (friend.id, 'expense', ids[0])).share_count == 1
+
+    login_as(client, friend)
+    response = client.get('/api/shared-insights/raw-data?sharer_id=%d'
+                          '&startDate=2025-01-01&endDate=2025-01-31' % owner.id)
+    visible = [r['id'] for r in response.get_json() if r['type'] == 'expense']
+    assert visible.count(ids[0]) == 1
+    assert ids[1] in visible
+
+
+def test_today_debug_lists_direct_and_bulk_shares_once(client):
+    owner, friend = create_users()
+    login_as(client, owner)
+    ids = []
+    for amount in (5, 6):
+        response = client.post('/api/expenses',
+                               data=json.dumps({
+                                   'date': datetime.now().strftime('%Y-%m-%dT%H:%M:%S'),
+                                   'amount': amount,
+                                   'description': 'Shared today',
+                                   'category': 'Food',
+                               }),
+                               content_type='application/json')
+        ids.append(response.get_json()['expense']['id'])
+    client.post('/api/share/%d' % ids[0],
+                data=json.dumps({'username': 'friend'}),
+                content_type='application/json')
+    client.post('/api/share/bulk',
+                data=json.dumps({'ids': ids, 'username': 'friend'}),
+                content_type='application/json')
+
+    login_as(client, friend)
+    response = client.get('/api/insights/today-debug')
+    assert response.status_code == 200
+    shared = response.get_json()['shared_data']['expenses']
+    assert sorted(d['id'] for d in shared['details']) == ids
+    assert shared['count'] == 2
+    assert [d['share_count'] for d in shared['details']
+            if d['id'] == ids[0]] == [2]
@@ -0,0 +1,31 @@
+import io
+import os
+import subprocess
+import sys
+
+from tests.conftest import login
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_create_app_does_not_import_receipt_libraries():
+    code = ("import sys\n"
+            "from app import create_app\n"
+            "create_app(testing=True)\n"
+            "print(sorted(m for m in ('torch', 'easyocr', 'openai', 'numpy')"
+            " if m in sys.modules))")
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, check=True,
+        capture_output=True, text=True,
+        env={**os.environ, 'SECRET_KEY': 'x', 'OCR_WARM_UP_LANGUAGES': ''})
+    assert output.stdout.strip().splitlines()[-1] == '[]'
+
+
+def test_receipt_reading_can_be_disabled(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'OCR_ENABLED', False)
+    login(client, 'ocr_user')
+    response = client.post('/api/expenses/by-ocr',
+                           data={'file': (io.BytesIO(b'img'), 'r.jpg')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 503
+    assert client.get('/api/expenses/ocr-status').get_json()['enabled'] is False
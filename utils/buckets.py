@@ -0,0 +1,129 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Date
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+UNITS = ('day', 'week', 'month', 'quarter', 'year')
+
+# Python weekday numbers: 0 is Monday, 6 is Sunday
+MONDAY, SUNDAY = 0, 6
+
+
+class bucket_start(ColumnElement):
+    """
+    First day of the day/week/month/quarter/year containing a date or
+    datetime column, as a DATE on every dialect.
+    Bucketing happens in SELECT and GROUP BY only; filter on the raw column
+    (see bucket_range) so indexes on it still apply.
+    """
+
+    __visit_name__ = 'bucket_start'
+    _traverse_internals = [
+        ('column', InternalTraversal.dp_clauseelement),
+        ('unit', InternalTraversal.dp_string),
+        ('week_start', InternalTraversal.dp_plain_obj),
+    ]
+    type = Date()
+
+    def __init__(self, column, unit, week_start=MONDAY):
+        if unit not in UNITS:
+            raise ValueError(f'Unknown time bucket: {unit}')
+        if week_start not in range(7):
+            raise ValueError(f'Invalid week start: {week_start}')
+        self.column = column
+        self.unit = unit
+        self.week_start = int(week_start)
+
+    @property
+    def _from_objects(self):
+        return self.column._from_objects
+
+
+@compiles(bucket_start)
+def _bucket_start_default(element, compiler, **kw):
+    raise NotImplementedError(
+        f'Time buckets are not supported on {compiler.dialect.name}')
+
+
+@compiles(bucket_start, 'sqlite')
+def _bucket_start_sqlite(element, compiler, **kw):
+    # SQLite keeps dates as ISO text; date() with modifiers returns the
+    # bucket's first day as 'YYYY-MM-DD'
+    column = compiler.process(element.column, **kw)
+    if element.unit == 'day':
+        return f'date({column})'
+    if element.unit == 'week':
+        # strftime('%w') counts from Sunday (0); shift to the week start
+        days_back = (f"((CAST(strftime('%w', {column}) AS INTEGER) + "
+                     f"{13 - element.week_start}) % 7)")
+        return f"date({column}, '-' || {days_back} || ' days')"
+    if element.unit == 'month':
+        return f"date({column}, 'start of month')"
+    if element.unit == 'quarter':
+        months_back = f"((CAST(strftime('%m', {column}) AS INTEGER) - 1) % 3)"
+        return (f"date({column}, 'start of month', "
+                f"'-' || {months_back} || ' months')")
+    return f"date({column}, 'start of year')"
+
+
+@compiles(bucket_start, 'postgresql')
+def _bucket_start_postgresql(element, compiler, **kw):
+    column = compiler.process(element.column, **kw)
+    if element.unit == 'day':
+        return f'CAST({column} AS DATE)'
+    if element.unit == 'week' and element.week_start != MONDAY:
+        # date_trunc weeks start on Monday; shift into and back out of them
+        shift = f"INTERVAL '{element.week_start} days'"
+        return (f"CAST(date_trunc('week', {column} - {shift}) + {shift} "
+                f"AS DATE)")
+    return f"CAST(date_trunc('{element.unit}', {column}) AS DATE)"
+
+
+def bucket_of(value, unit, week_start=MONDAY):
+    """The same bucket computed in Python, for a date or datetime."""
+    day = value.date() if isinstance(value, datetime) else value
+    if unit == 'day':
+        return day
+    if unit == 'week':
+        return day - timedelta(days=(day.weekday() - week_start) % 7)
+    if unit == 'month':
+        return day.replace(day=1)
+    if unit == 'quarter':
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    if unit == 'year':
+        return date(day.year, 1, 1)
+    raise ValueError(f'Unknown time bucket: {unit}')
+
+
+def next_bucket(start, unit):
+    """First day of the bucket after the one starting on `start`."""
+    if unit == 'day':
+        return start + timedelta(days=1)
+    if unit == 'week':
+        return start + timedelta(days=7)
+    months = {'month': 1, 'quarter': 3, 'year': 12}[unit]
+    month = start.month - 1 + months
+    return date(start.year + month // 12, month % 12 + 1, 1)
+
+
+def bucket_range(value, unit, week_start=MONDAY):
+    """[start, end) datetimes of the bucket containing value."""
+    start = bucket_of(value, unit, week_start)
+    end = next_bucket(start, unit)
+    return (datetime.combine(start, datetime.min.time()),
+            datetime.combine(end, datetime.min.time()))
+
+
+def label(start, unit):
+    """Chart label for the bucket starting on `start`."""
+    if unit == 'day':
+        return start.strftime('%Y-%m-%d')
+    if unit == 'week':
+        return f"Week of {start.strftime('%Y-%m-%d')}"
+    if unit == 'month':
+        return start.strftime('%b %Y')
+    if unit == 'quarter':
+        return f'Q{(start.month - 1) // 3 + 1} {start.year}'
+    return str(start.year)
@@ -0,0 +1,134 @@
+import math
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select
+
+from models.models import db, Expense
+from utils.changes import ids_changed, ids_deleted
+from utils.rollups import rows_added, rows_removed
+from utils.shares import detach_items
+
+# A validated row for insert_records; the fields are Expense/Income columns
+NewRecord = namedtuple(
+    'NewRecord', ['user_id', 'type', 'date', 'category', 'amount',
+                  'description'])
+
+
+def _kind(model):
+    return 'expense' if model is Expense else 'income'
+
+
+def parse_date(value):
+    """
+    A record date from ISO 8601 text, e.g. '2025-05-04T15:18:00'. Seconds
+    and the time may be left out; dates with a UTC offset are converted to
+    local time, which is how dates are stored.
+    """
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
+
+
+def _validate(model, user_id, data, now, limits):
+    if not isinstance(data, dict):
+        raise ValueError('Expected an object')
+    try:
+        amount = float(data.get('amount'))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid amount')
+    if not math.isfinite(amount):
+        raise ValueError('Invalid amount')
+
+    category = data.get('category')
+    if not isinstance(category, str) or not category.strip():
+        raise ValueError('Category is required')
+    if len(category) > limits['category']:
+        raise ValueError('Category is too long')
+    description = data.get('description') or ''
+    if not isinstance(description, str):
+        description = str(description)
+    if len(description) > limits['description']:
+        raise ValueError('Description is too long')
+
+    date = data.get('date')
+    if not isinstance(date, datetime):
+        try:
+            date = parse_date(date)
+        except (TypeError, ValueError):
+            raise ValueError('Invalid date format')
+    if date > now:
+        raise ValueError('Date cannot be in the future')
+
+    return NewRecord(user_id, _kind(model), date, category, amount,
+                     description)
+
+
+def validate_records(model, user_id, data_list):
+    """
+    Check a whole batch of submitted records before anything is written.
+    Returns (records, errors): a NewRecord per valid row, in order, and
+    {'index', 'error'} per invalid row, so one bad row does not fail the
+    rest.
+    """
+    now = datetime.now()
+    limits = {name: model.__table__.c[name].type.length
+              for name in ('category', 'description')}
+    records, errors = [], []
+    for index, data in enumerate(data_list):
+        try:
+            records.append(_validate(model, user_id, data, now, limits))
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+    return records, errors
+
+
+def insert_records(model, records, chunk_size=1000):
+    """
+    Insert validated records with one multi-row INSERT ... RETURNING per
+    chunk of chunk_size rows, then add them to the rollups and the change
+    log with a fixed number of statements. Returns the new ids in record
+    order; the caller commits.
+    """
+    # RETURNING rows may come back in any order, but ids are assigned in
+    # VALUES order, so sorting them pairs them with the records. Asking for
+    # sort_by_parameter_order instead makes SQLite insert one row at a time
+    statement = insert(model).returning(model.id)
+    ids = []
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        ids.extend(sorted(db.session.scalars(
+            statement, [record._asdict() for record in chunk])))
+
+    rows_added(model, records)
+    by_user = defaultdict(list)
+    for record, record_id in zip(records, ids):
+        by_user[record.user_id].append(record_id)
+    for user_id, user_ids in by_user.items():
+        ids_changed(_kind(model), user_id, user_ids)
+    return ids
+
+
+def delete_records(model, user_id, ids):
+    """
+    Delete the user's Expense or Income rows among ids, set-based: one
+    SELECT of the rows, the share cleanup of utils.shares.detach_items, the
+    change log tombstones, the rollup deltas and one DELETE ... WHERE id IN.
+    The number of statements does not grow with len(ids). Returns the ids
+    deleted; the caller commits.
+    """
+    rows = db.session.execute(
+        select(model.id, model.user_id, model.type, model.date,
+               model.category, model.amount).where(
+                   model.id.in_(ids), model.user_id == user_id)).all()
+    if not rows:
+        return []
+
+    found = [row.id for row in rows]
+    detach_items(_kind(model), found)
+    ids_deleted(_kind(model), user_id, found)
+    rows_removed(model, rows)
+    db.session.execute(delete(model).where(model.id.in_(found)),
+                       execution_options={'synchronize_session': False})
+    return found
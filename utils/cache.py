@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app
+
+from utils import diagnostics
+
+
+class NullCache:
+    """Backend that never stores anything; used to switch caching off."""
+
+    def __init__(self, **options):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {'backend': 'none', 'hits': self.hits, 'misses': self.misses}
+
+
+class LRUTTLCache:
+    """
+    Thread-safe in-process cache. Entries expire ttl seconds after being
+    stored, and the least recently used entry is evicted beyond max_entries.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl
+            }
+
+
+BACKENDS = {
+    'memory': LRUTTLCache,
+    'none': NullCache,
+}
+
+
+def create_cache(backend, **options):
+    """Build a cache from a registered backend name or a factory callable."""
+    factory = BACKENDS[backend] if isinstance(backend, str) else backend
+    return factory(**options)
+
+
+def get_cache():
+    return current_app.extensions['insights_cache']
+
+
+def cached_response(make_key):
+    """
+    Cache successful JSON responses of a view under make_key().
+    make_key returns None when the request should not be cached (e.g. it
+    is unauthenticated or has invalid arguments), and the view runs as is.
+    """
+
+    def decorator(view):
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = make_key()
+            if key is None:
+                return view(*args, **kwargs)
+
+            cache = get_cache()
+            body = cache.get(key)
+            diagnostics.note('insights_cache', 'miss' if body is None else 'hit')
+            if body is not None:
+                return Response(body, mimetype='application/json')
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and response.is_json:
+                cache.set(key, response.get_data())
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def init_app(app):
+    app.extensions['insights_cache'] = create_cache(
+        app.config.get('INSIGHTS_CACHE_BACKEND', 'memory'),
+        max_entries=app.config.get('INSIGHTS_CACHE_MAX_ENTRIES', 1024),
+        ttl=app.config.get('INSIGHTS_CACHE_TTL', 300))
@@ -0,0 +1,130 @@
+from collections import defaultdict
+
+from sqlalchemy import delete, insert, update
+
+from models.models import db, Expense, Income, RecordChange, User
+
+
+def _change_kind(record):
+    # Every Expense row is listed by /api/expenses, whatever its type
+    return 'expense' if isinstance(record, Expense) else 'income'
+
+
+def current_version(user_id):
+    """The user's data version; 0 for unknown users."""
+    return db.session.query(User.data_version).filter(
+        User.id == user_id).scalar() or 0
+
+
+def bump_version(user_id):
+    """Atomically advance and return the user's data version."""
+    db.session.execute(
+        update(User).where(User.id == user_id).values(
+            data_version=User.data_version + 1))
+    # A session for a user row that no longer exists has nothing to sync
+    return current_version(user_id)
+
+
+def bump_versions(user_ids):
+    """
+    Advance the data version of users whose views changed without any of
+    their own records changing, e.g. the recipients of a share.
+    """
+    user_ids = set(user_ids)
+    if user_ids:
+        db.session.execute(
+            update(User).where(User.id.in_(user_ids)).values(
+                data_version=User.data_version + 1))
+
+
+def _log(records):
+    grouped = defaultdict(list)
+    for record in records:
+        grouped[(record.user_id, _change_kind(record))].append(record.id)
+
+    versions = {}
+    for (user_id, kind), item_ids in grouped.items():
+        # One version per user per write, shared by all records it touched
+        if user_id not in versions:
+            versions[user_id] = bump_version(user_id)
+        version = versions[user_id]
+
+        existing = {
+            change.item_id: change
+            for change in RecordChange.query.filter(
+                RecordChange.user_id == user_id,
+                RecordChange.kind == kind,
+                RecordChange.item_id.in_(item_ids))
+        }
+        for item_id in item_ids:
+            change = existing.get(item_id)
+            if change is None:
+                change = RecordChange(user_id=user_id, kind=kind,
+                                      item_id=item_id)
+                db.session.add(change)
+            change.version = version
+            change.deleted = False
+
+
+def records_changed(records):
+    """Log new or updated records. Flushes so new records have ids."""
+    if records:
+        db.session.flush()
+        _log(records)
+
+
+def _log_ids(kind, user_id, item_ids, deleted):
+    # Ids can be reused after a delete, so older entries are replaced
+    version = bump_version(user_id)
+    table = RecordChange.__table__
+    db.session.execute(
+        delete(table).where(table.c.user_id == user_id, table.c.kind == kind,
+                            table.c.item_id.in_(item_ids)))
+    db.session.execute(insert(table), [{
+        'user_id': user_id,
+        'kind': kind,
+        'item_id': item_id,
+        'version': version,
+        'deleted': deleted
+    } for item_id in item_ids])
+
+
+def ids_changed(kind, user_id, item_ids):
+    """
+    Log many of one user's new records by id with a fixed number of
+    statements (see utils.bulk.insert_records).
+    """
+    if item_ids:
+        _log_ids(kind, user_id, item_ids, deleted=False)
+
+
+def ids_deleted(kind, user_id, item_ids):
+    """
+    Leave tombstones for many of one user's records about to be deleted,
+    with a fixed number of statements (see utils.bulk.delete_records).
+    """
+    if item_ids:
+        _log_ids(kind, user_id, item_ids, deleted=True)
+
+
+def changes_since(kind, user_id, since):
+    """
+    Return (current version, records changed after since, ids deleted after
+    since) for one of the user's record kinds.
+    """
+    model = Expense if kind == 'expense' else Income
+    version = current_version(user_id)
+
+    recent = (RecordChange.user_id == user_id, RecordChange.kind == kind,
+              RecordChange.version > since)
+    records = model.query.join(
+        RecordChange, RecordChange.item_id == model.id
+    ).filter(
+        *recent,
+        RecordChange.deleted == False
+    ).order_by(model.date.desc(), model.id.desc()).all()
+    deleted_ids = [
+        row[0] for row in db.session.query(RecordChange.item_id).filter(
+            *recent, RecordChange.deleted == True)
+    ]
+    return version, records, deleted_ids
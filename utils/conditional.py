@@ -0,0 +1,61 @@
+import hashlib
+from datetime import date
+
+from flask import current_app, g, make_response, request, session
+
+from utils.changes import current_version
+
+# Blueprints whose GET /api/ responses depend only on the requesting user's
+# data version, the URL and the current day
+CONDITIONAL_BLUEPRINTS = {'expense', 'income', 'insights', 'share',
+                          'shareIncome'}
+
+
+def exempt(view):
+    """Opt a view out of ETags when its output changes without writes."""
+    view.etag_exempt = True
+    return view
+
+
+def make_etag(user_id):
+    """
+    Strong ETag for the current request.
+    Default date ranges follow the calendar, so the day is part of the tag.
+    """
+    version = current_version(user_id)
+    digest = hashlib.sha256(
+        f'{request.full_path}|{date.today().isoformat()}'.encode()
+    ).hexdigest()[:16]
+    return f'{user_id}-{version}-{digest}'
+
+
+def _check():
+    if (request.method != 'GET' or 'user' not in session
+            or request.blueprint not in CONDITIONAL_BLUEPRINTS
+            or not request.path.startswith('/api/')):
+        return None
+    view = current_app.view_functions.get(request.endpoint)
+    if getattr(view, 'etag_exempt', False):
+        return None
+
+    g.etag = make_etag(session['user']['id'])
+    if request.if_none_match.contains(g.etag):
+        # Nothing changed: skip the view and its queries entirely
+        response = make_response('', 304)
+        response.set_etag(g.etag)
+        return response
+    return None
+
+
+def _tag(response):
+    etag = g.pop('etag', None)
+    if etag is not None and response.status_code == 200:
+        response.set_etag(etag)
+        # Browsers must revalidate, which turns repeat visits into 304s
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def init_app(app):
+    app.before_request(_check)
+    app.after_request(_tag)
@@ -1,6 +1,7 @@
 from functools import wraps
 from flask import current_app, request, jsonify
 from flask_wtf.csrf import validate_csrf, CSRFError
+from wtforms import ValidationError
 
 
 def csrf_required(f):
@@ -11,12 +12,16 @@ def csrf_required(f):
         if current_app.config.get("TESTING"):
             return f(*args, **kwargs)
 
+        # JSON bodies carry the token as a field; multipart uploads as a
+        # form field, or the X-CSRFToken header
         data = request.get_json(silent=True)
-        token = (data or {}).get('csrf_token')
+        token = ((data if isinstance(data, dict) else {}).get('csrf_token')
+                 or request.form.get('csrf_token')
+                 or request.headers.get('X-CSRFToken'))
 
         try:
             validate_csrf(token)
-        except CSRFError as e:
+        except (CSRFError, ValidationError):
             return jsonify({'error': 'Invalid CSRF token'}), 400
         return f(*args, **kwargs)
 
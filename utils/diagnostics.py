@@ -0,0 +1,131 @@
+import json
+import logging
+import random
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from models.models import db
+
+logger = logging.getLogger(__name__)
+
+# Engines currently instrumented, with the number of diagnosed requests using
+# them. Listeners are only attached while at least one such request runs, so
+# ordinary requests pay nothing.
+_lock = threading.Lock()
+_listeners = {}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    if has_request_context() and 'diagnostics' in g:
+        conn.info.setdefault('diagnostics_started', []).append(
+            time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    started = conn.info.get('diagnostics_started')
+    if not started or not has_request_context() or 'diagnostics' not in g:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = g.diagnostics
+    stats['queries'] += 1
+    stats['sql_seconds'] += elapsed
+    if cursor.rowcount is not None and cursor.rowcount >= 0:
+        stats['rows_affected'] += cursor.rowcount
+
+
+def _attach(engine):
+    with _lock:
+        if engine not in _listeners:
+            event.listen(engine, 'before_cursor_execute',
+                         _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            _listeners[engine] = 0
+        _listeners[engine] += 1
+
+
+def _detach(engine):
+    with _lock:
+        _listeners[engine] -= 1
+        if _listeners[engine] == 0:
+            event.remove(engine, 'before_cursor_execute',
+                         _before_cursor_execute)
+            event.remove(engine, 'after_cursor_execute', _after_cursor_execute)
+            del _listeners[engine]
+
+
+def _requested():
+    # An explicit ?diagnostics= or X-Diagnostics header wins over sampling
+    flag = request.args.get('diagnostics', request.headers.get('X-Diagnostics'))
+    if flag is not None:
+        return flag.lower() in ('1', 'true', 't')
+    rate = current_app.config.get('DIAGNOSTICS_SAMPLE_RATE', 0.0)
+    return rate > 0 and random.random() < rate
+
+
+def active():
+    """True when the current request is being diagnosed."""
+    return has_request_context() and 'diagnostics' in g
+
+
+def note(name, value):
+    """Attach a value to the current request's diagnostics report, if any."""
+    if active():
+        g.diagnostics['notes'][name] = value
+
+
+def _start():
+    if request.endpoint == 'static' or not _requested():
+        return
+    engine = db.engine
+    _attach(engine)
+    g.diagnostics = {
+        'engine': engine,
+        'started': time.perf_counter(),
+        'queries': 0,
+        'sql_seconds': 0.0,
+        'rows_affected': 0,
+        'notes': {}
+    }
+
+
+def _report(response):
+    if 'diagnostics' not in g:
+        return response
+    stats = g.diagnostics
+    total_ms = (time.perf_counter() - stats['started']) * 1000
+    sql_ms = stats['sql_seconds'] * 1000
+    response.headers['Server-Timing'] = (
+        f'db;dur={sql_ms:.2f};desc="{stats["queries"]} queries", '
+        f'total;dur={total_ms:.2f}')
+    logger.info('diagnostics %s %s', request.path, json.dumps({
+        'status': response.status_code,
+        'queries': stats['queries'],
+        'sql_ms': round(sql_ms, 2),
+        'total_ms': round(total_ms, 2),
+        'rows_affected': stats['rows_affected'],
+        'notes': stats['notes']
+    }, default=str))
+    return response
+
+
+def _finish(exc):
+    stats = g.pop('diagnostics', None)
+    if stats is not None:
+        _detach(stats['engine'])
+
+
+def init_app(app):
+    """
+    Enable opt-in request diagnostics: per request with ?diagnostics=1 or an
+    X-Diagnostics: 1 header, or for a DIAGNOSTICS_SAMPLE_RATE fraction of
+    requests. Diagnosed requests get query counts and timings in a
+    Server-Timing header and a log line.
+    """
+    app.before_request(_start)
+    app.after_request(_report)
+    app.teardown_request(_finish)
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+
+from flask import Response, stream_with_context
+from sqlalchemy import and_, select
+
+from models.models import db, Expense, Income, ShareVisibility, User
+from utils.listing import apply_filters
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# Rows fetched per round trip, and written per chunk of the response
+BATCH_SIZE = 1000
+
+COLUMNS = ['id', 'date', 'category', 'description', 'amount']
+SHARED_COLUMNS = COLUMNS + ['shared_by']
+
+# Spreadsheets run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def parse_format(args):
+    fmt = args.get('format', 'csv')
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    return fmt
+
+
+def _columns(model):
+    return (model.id, model.date, model.category, model.description,
+            model.amount)
+
+
+def own_records(model, user_id, filters):
+    """The user's own Expense or Income rows matching the listing filters."""
+    statement = select(*_columns(model)).where(model.user_id == user_id)
+    return apply_filters(statement, model, filters).order_by(
+        model.date.desc(), model.id.desc())
+
+
+def shared_records(kind, user_id, filters):
+    """Records of one kind shared with the user, with the sharer's name."""
+    model = Expense if kind == 'expense' else Income
+    statement = select(*_columns(model), User.username).join(
+        ShareVisibility,
+        and_(ShareVisibility.item_id == model.id, ShareVisibility.kind == kind)
+    ).join(
+        User, User.id == ShareVisibility.owner_id
+    ).where(ShareVisibility.recipient_id == user_id)
+    return apply_filters(statement, model, filters).order_by(
+        model.date.desc(), model.id.desc())
+
+
+def _values(row):
+    return [row[0], row[1].strftime('%Y-%m-%dT%H:%M:%S'), *row[2:]]
+
+
+def _partitions(statement):
+    # yield_per streams the result (a server-side cursor where the driver
+    # has one) and keeps nothing in the session, so memory stays constant
+    result = db.session.execute(statement,
+                                execution_options={'yield_per': BATCH_SIZE})
+    yield from result.partitions()
+
+
+def _cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_chunks(columns, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_cell(value) for value in _values(row)]
+                         for row in rows)
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(columns, partitions):
+    for rows in partitions:
+        yield ''.join(json.dumps(dict(zip(columns, _values(row)))) + '\n'
+                      for row in rows)
+
+
+def export_response(statement, columns, fmt, filename):
+    """Stream the statement's rows as a CSV or NDJSON download."""
+    partitions = _partitions(statement)
+    chunks = (_csv_chunks if fmt == 'csv' else _ndjson_chunks)(columns,
+                                                               partitions)
+    response = Response(stream_with_context(chunks), mimetype=FORMATS[fmt])
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename={filename}.{fmt}')
+    return response
@@ -0,0 +1,422 @@
+import codecs
+import csv
+import hashlib
+import html
+import io
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from sqlalchemy import select
+
+from models.models import db, Expense
+from utils.bulk import insert_records, parse_date, validate_records
+
+FORMATS = ('csv', 'ofx', 'qif')
+EXTENSIONS = {'.csv': 'csv', '.ofx': 'ofx', '.qfx': 'ofx', '.qif': 'qif'}
+
+# Header names a CSV column is recognised by without a mapping (lower
+# case). Separate debit and credit columns make a signed amount.
+HEADER_ALIASES = {
+    'date': ('date', 'transaction date', 'posted date', 'posting date',
+             'value date'),
+    'amount': ('amount', 'transaction amount', 'value'),
+    'debit': ('debit', 'debit amount', 'withdrawal', 'withdrawals',
+              'money out'),
+    'credit': ('credit', 'credit amount', 'deposit', 'deposits', 'money in'),
+    'description': ('description', 'narrative', 'details',
+                    'transaction details', 'memo', 'payee', 'name'),
+    'category': ('category',),
+}
+
+# Tried after ISO 8601 when no date_format is given: CSV statements are
+# read day-first like receipts, QIF files month-first as the format defines
+CSV_DATE_FORMATS = ('%d/%m/%Y', '%d/%m/%y', '%d-%m-%Y', '%d.%m.%Y')
+QIF_DATE_FORMATS = ('%m/%d/%Y', '%m/%d/%y')
+
+# QIF sections holding transactions (account lists, categories etc. are not)
+QIF_SECTIONS = {'type:bank', 'type:cash', 'type:ccard', 'type:oth a',
+                'type:oth l'}
+
+# OFX is decoded OFX_CHUNK bytes at a time; one element's text may not
+# exceed MAX_OFX_TEXT characters
+OFX_CHUNK = 64 * 1024
+MAX_OFX_TEXT = 1024 * 1024
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+OFX_DATE = re.compile(
+    r'(\d{8})(\d{6})?(?:\.\d+)?(?:\[([+-]?\d+(?:\.\d+)?)(?::[^\]]*)?\])?')
+
+
+def _flag(form, name, default):
+    return form.get(name, default).lower() in ('true', '1', 't', 'on')
+
+
+def parse_amount(value):
+    """
+    A number from statement text such as '1,234.50', '1.234,50', '$12',
+    '12,50' or '(3.20)'; None when empty, and the text itself when unreadable.
+    """
+    text = (value or '').strip()
+    if not text:
+        return None
+    if ',' in text and '.' in text:
+        # The separator that comes last is the decimal one: '1.234,50'
+        if text.rindex(',') > text.rindex('.'):
+            text = text.replace('.', '').replace(',', '.')
+    elif ',' in text and re.search(r',\d{1,2}$', text):
+        text = text.replace(',', '.')
+    try:
+        amount = float(re.sub(r'[^\d.+-]', '', text))
+    except ValueError:
+        return text
+    return -amount if text.startswith('(') and text.endswith(')') else amount
+
+
+def _parse_day(text, formats, date_format=None):
+    # The text itself when unreadable, which validation then reports
+    text = (text or '').strip()
+    for fmt in ([date_format] if date_format else [None, *formats]):
+        try:
+            return parse_date(text) if fmt is None else datetime.strptime(
+                text, fmt)
+        except ValueError:
+            continue
+    return text
+
+
+def _text(stream):
+    # Readers detach() the wrapper when done: closing it, as happens when it
+    # is garbage collected, would close the upload that progress reads from
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace',
+                            newline='')
+
+
+def _map_columns(header, mapping):
+    names = [name.strip().lower() for name in header]
+    unknown = set(mapping) - set(HEADER_ALIASES)
+    if unknown:
+        raise ValueError(
+            f"Unknown field in mapping: {', '.join(sorted(unknown))}")
+
+    columns = {}
+    for field, aliases in HEADER_ALIASES.items():
+        if mapping.get(field):
+            wanted = str(mapping[field]).strip().lower()
+            if wanted not in names:
+                raise ValueError(f'Column not found: {mapping[field]}')
+            columns[field] = names.index(wanted)
+            continue
+        for alias in aliases:
+            if alias in names and names.index(alias) not in columns.values():
+                columns[field] = names.index(alias)
+                break
+
+    if 'date' not in columns:
+        raise ValueError('No date column found, map one in mapping')
+    if not {'amount', 'debit', 'credit'} & columns.keys():
+        raise ValueError('No amount column found, map one in mapping')
+    return columns
+
+
+def csv_rows(stream, mapping=None, date_format=None):
+    """
+    Read a CSV file with a header row from a binary stream.
+    The header is read now (ValueError if no date or amount column is found
+    or mapped); returns (records, signed) where records lazily yields
+    (line number, record dict) and signed tells whether amounts come from
+    separate debit and credit columns.
+    :param mapping: {field: header} for columns not named as in
+                    HEADER_ALIASES
+    """
+    text = _text(stream)
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        raise ValueError('The file is empty')
+    columns = _map_columns(header, mapping or {})
+
+    def cell(row, field):
+        index = columns.get(field)
+        if index is None or index >= len(row):
+            return ''
+        return row[index].strip()
+
+    def records():
+        try:
+            for row in reader:
+                if not any(value.strip() for value in row):
+                    continue
+                if 'amount' in columns:
+                    amount = parse_amount(cell(row, 'amount'))
+                else:
+                    debit = parse_amount(cell(row, 'debit'))
+                    credit = parse_amount(cell(row, 'credit'))
+                    if isinstance(debit, str) or isinstance(credit, str):
+                        amount = debit if isinstance(debit, str) else credit
+                    elif debit is None and credit is None:
+                        amount = None
+                    else:
+                        amount = (credit or 0.0) - abs(debit or 0.0)
+                yield reader.line_num, {
+                    'date': _parse_day(cell(row, 'date'), CSV_DATE_FORMATS,
+                                       date_format),
+                    'amount': amount,
+                    'description': cell(row, 'description'),
+                    'category': cell(row, 'category') or None,
+                }
+        finally:
+            text.detach()
+
+    return records(), 'amount' not in columns
+
+
+def _qif_record(fields, date_format):
+    category = fields.get('L', '')
+    # 'Food:Groceries' is a subcategory; '[Savings]' a transfer
+    category = None if category.startswith('[') else category.split(':')[0]
+    return {
+        # Quicken writes 2025 dates as 3/8'25 and pads with spaces
+        'date': _parse_day(
+            fields.get('D', '').replace("'", '/').replace(' ', ''),
+            QIF_DATE_FORMATS, date_format),
+        'amount': parse_amount(fields.get('T') or fields.get('U')),
+        'description': fields.get('P') or fields.get('M') or '',
+        'category': category or None,
+    }
+
+
+def qif_rows(stream, date_format=None):
+    """Lazily yield (transaction number, record dict) from a QIF file."""
+    section = None
+    fields = {}
+    number = 0
+    text = _text(stream)
+    try:
+        for line in text:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('!'):
+                section = line[1:].strip().lower()
+                fields = {}
+            elif line.startswith('^'):
+                if fields and section in QIF_SECTIONS:
+                    number += 1
+                    yield number, _qif_record(fields, date_format)
+                fields = {}
+            else:
+                # Split lines repeat their codes; the first value is the total
+                fields.setdefault(line[0], line[1:].strip())
+        if fields and section in QIF_SECTIONS:
+            yield number + 1, _qif_record(fields, date_format)
+    finally:
+        text.detach()
+
+def _ofx_tokens(stream):
+    # (closing, tag, text) for every element, decoding the file in chunks;
+    # text runs up to the next '<', so anything after the last one waits
+    # for the next chunk
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    buffer = ''
+    while True:
+        data = stream.read(OFX_CHUNK)
+        buffer += decoder.decode(data, final=not data)
+        if data:
+            cut = buffer.rfind('<')
+            if cut <= 0:
+                if len(buffer) > MAX_OFX_TEXT:
+                    raise ValueError('Malformed OFX file')
+                continue
+            complete, buffer = buffer[:cut], buffer[cut:]
+        else:
+            complete, buffer = buffer, ''
+        for match in OFX_TAG.finditer(complete):
+            yield match[1] == '/', match[2].upper(), match[3].strip()
+        if not data:
+            return
+
+
+def _ofx_date(text):
+    match = OFX_DATE.fullmatch(text or '')
+    if match is None:
+        return text
+    try:
+        moment = datetime.strptime(match[1] + (match[2] or '000000'),
+                                   '%Y%m%d%H%M%S')
+    except ValueError:
+        return text
+    if match[3]:
+        # Statement time zone -> local time, as dates are stored
+        offset = timezone(timedelta(hours=float(match[3])))
+        moment = moment.replace(tzinfo=offset).astimezone().replace(
+            tzinfo=None)
+    return moment
+
+
+def ofx_rows(stream):
+    """
+    Lazily yield (transaction number, record dict) from an OFX/QFX file,
+    SGML (version 1) or XML (version 2).
+    """
+    fields = None
+    number = 0
+    for closing, tag, text in _ofx_tokens(stream):
+        if tag == 'STMTTRN':
+            if fields is not None:
+                number += 1
+                yield number, {
+                    'date': _ofx_date(fields.get('DTPOSTED')),
+                    'amount': parse_amount(fields.get('TRNAMT')),
+                    'description': (fields.get('NAME') or fields.get('MEMO')
+                                    or ''),
+                    'category': None,
+                }
+            fields = None if closing else {}
+        elif fields is not None and not closing:
+            # SGML and XML OFX both escape &, < and > in text
+            fields[tag] = html.unescape(text)
+
+
+def row_hash(date, amount, description):
+    """Duplicate-detection hash of a record's date, amount and description."""
+    key = '|'.join([date.strftime('%Y-%m-%dT%H:%M:%S'), f'{amount:.2f}',
+                    ' '.join((description or '').split()).lower()])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _existing_hashes(model, user_id, records):
+    # Statements are in date order, so a chunk spans a short date range
+    dates = [record.date for record in records]
+    rows = db.session.execute(
+        select(model.date, model.amount, model.description).where(
+            model.user_id == user_id,
+            model.date >= min(dates),
+            model.date <= max(dates)))
+    return {row_hash(*row) for row in rows}
+
+
+def import_records(model, user_id, records, signed=False,
+                   default_category='Other', skip_duplicates=True,
+                   chunk_size=1000, progress=None):
+    """
+    Validate, deduplicate and insert records chunk_size at a time,
+    committing each chunk, so memory use does not grow with the file.
+    Yields a progress dict with running totals and the chunk's row errors
+    after every chunk, then one with status 'done' (or 'failed').
+    :param records: (row number, record dict) pairs from a *_rows reader
+    :param signed: Amounts are statement amounts: an expense import keeps
+                   the debits (negative) and an income import the credits,
+                   stored as positive amounts; other rows count as skipped
+    :param skip_duplicates: Leave out records whose row_hash matches one of
+                            the user's rows or an earlier row of the file
+    :param progress: Callable returning extra fields for each progress line
+    """
+    totals = {'rows': 0, 'inserted': 0, 'duplicates': 0, 'skipped': 0,
+              'failed': 0}
+    records = iter(records)
+    try:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            numbers, data = [], []
+            for number, record in chunk:
+                amount = record['amount']
+                if signed and isinstance(amount, float):
+                    if (amount < 0) != (model is Expense) or amount == 0:
+                        totals['skipped'] += 1
+                        continue
+                    amount = abs(amount)
+                numbers.append(number)
+                data.append({
+                    **record, 'amount': amount,
+                    'category': record['category'] or default_category})
+            totals['rows'] += len(chunk)
+
+            valid, errors = validate_records(model, user_id, data)
+            if skip_duplicates and valid:
+                seen = _existing_hashes(model, user_id, valid)
+                fresh = []
+                for record in valid:
+                    key = row_hash(record.date, record.amount,
+                                   record.description)
+                    if key not in seen:
+                        seen.add(key)
+                        fresh.append(record)
+                totals['duplicates'] += len(valid) - len(fresh)
+                valid = fresh
+            if valid:
+                insert_records(model, valid, chunk_size=chunk_size)
+            db.session.commit()
+
+            totals['inserted'] += len(valid)
+            totals['failed'] += len(errors)
+            yield {'status': 'progress', **totals,
+                   **(progress() if progress else {}),
+                   'errors': [{'row': numbers[e['index']], 'error': e['error']}
+                              for e in errors]}
+    except Exception as e:
+        # Chunks committed so far stay imported
+        db.session.rollback()
+        yield {'status': 'failed', **totals, 'error': str(e)}
+        return
+    yield {'status': 'done', **totals}
+
+
+def parse_options(form):
+    """Import options from the upload form; ValueError on bad input."""
+    mapping = form.get('mapping') or None
+    if mapping is not None:
+        try:
+            mapping = json.loads(mapping)
+        except ValueError:
+            raise ValueError('mapping must be a JSON object')
+        if not isinstance(mapping, dict):
+            raise ValueError('mapping must be a JSON object')
+    fmt = form.get('format') or None
+    if fmt is not None and fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    return {
+        'format': fmt,
+        'mapping': mapping,
+        'date_format': form.get('date_format') or None,
+        'category': form.get('category') or 'Other',
+        'signed': _flag(form, 'signed', 'false'),
+        'skip_duplicates': _flag(form, 'skip_duplicates', 'true'),
+    }
+
+
+def start_import(model, user_id, upload, form, chunk_size=1000):
+    """
+    Open an uploaded statement (a werkzeug FileStorage, which Flask spools
+    to disk when large) and return the import_records progress generator.
+    Problems found before any row is read (options, file type, CSV header)
+    raise ValueError.
+    """
+    options = parse_options(form)
+    fmt = options['format'] or EXTENSIONS.get(
+        os.path.splitext(upload.filename or '')[1].lower())
+    if fmt is None:
+        raise ValueError('Unknown file type, pass format (csv, ofx or qif)')
+
+    stream = upload.stream
+    total_bytes = stream.seek(0, os.SEEK_END)
+    stream.seek(0)
+    if fmt == 'csv':
+        records, signed = csv_rows(stream, options['mapping'],
+                                   options['date_format'])
+    elif fmt == 'ofx':
+        records, signed = ofx_rows(stream), True
+    else:
+        records, signed = qif_rows(stream, options['date_format']), True
+
+    return import_records(
+        model, user_id, records,
+        signed=signed or options['signed'],
+        default_category=options['category'],
+        skip_duplicates=options['skip_duplicates'],
+        chunk_size=chunk_size,
+        progress=lambda: {'bytes_read': stream.tell(),
+                          'total_bytes': total_bytes})
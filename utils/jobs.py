@@ -0,0 +1,276 @@
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from flask import current_app
+
+from utils import llm, ocr, receipt_cache, receipt_parser
+
+
+class QueueFull(Exception):
+    """Raised when a job cannot be accepted; the client should retry later."""
+
+
+def receipt_text(image_bytes, preprocess=None, cache=None):
+    """OCR text of a receipt image, from the receipt cache when possible."""
+    cache = receipt_cache.from_settings(cache)
+    image_key = receipt_cache.image_key(image_bytes, preprocess=preprocess)
+    text = cache and cache.get(receipt_cache.OCR_NAMESPACE, image_key)
+    if text is None:
+        text = ocr.ocr_image(image_bytes, preprocess=preprocess)
+        receipt_cache.safe_set(cache, receipt_cache.OCR_NAMESPACE, image_key,
+                               text)
+    return text
+
+
+def run_receipt_job(image_bytes, llm_settings, preprocess=None, cache=None,
+                    min_confidence=None, fallback=False):
+    """
+    OCR a receipt image and extract the expense.
+    Runs in a pool worker, outside any Flask app context, so settings are
+    passed in. Each stage is looked up in the receipt cache first: OCR text
+    by the image's hash, the extraction by the hash of the OCR text. The
+    local parser answers when it reaches min_confidence; otherwise, or when
+    min_confidence is None, the LLM does. With llm_settings None (the
+    circuit breaker is open) or when the LLM fails, fallback returns the
+    raw OCR text with the parser's guesses instead of failing the job.
+    """
+    text = receipt_text(image_bytes, preprocess, cache)
+    cache = receipt_cache.from_settings(cache)
+    text_key = receipt_cache.text_key(text)
+    result = cache and cache.get(receipt_cache.LLM_NAMESPACE, text_key)
+    if result is None and min_confidence is not None:
+        result = receipt_parser.extract(text, min_confidence)
+    if result is None:
+        try:
+            if llm_settings is None:
+                raise llm.LLMUnavailable('Receipt extraction is paused')
+            result = llm.process_receipt(text, llm_settings)
+        except llm.LLMUnavailable as e:
+            if not fallback:
+                raise
+            # Degraded results are not cached
+            return receipt_parser.fallback(text, str(e))
+        receipt_cache.safe_set(cache, receipt_cache.LLM_NAMESPACE, text_key,
+                               result)
+    return result
+
+
+def receipt_job_callback(breaker, llm_allowed):
+    """
+    on_done for receipt jobs: count how the receipt was answered and feed
+    the LLM's outcome to the circuit breaker. Jobs the breaker did not let
+    through (llm_allowed False) say nothing about the LLM.
+    """
+    def on_done(result, error):
+        source = None
+        if error is None:
+            source = receipt_parser.result_source(result)
+            receipt_parser.stats.record(source)
+        if not llm_allowed:
+            return
+        if isinstance(error, llm.LLMUnavailable) or source == 'fallback':
+            breaker.record_failure()
+        elif source == 'llm':
+            breaker.record_success()
+        else:
+            # Answered without the LLM, e.g. by the parser
+            breaker.release()
+    return on_done
+
+
+def init_worker(languages, warm_workers, llm_slots):
+    """Process pool initializer: warm the OCR readers, share the LLM limit."""
+    if llm_slots is not None:
+        llm.share_limit(llm_slots)
+    ocr.init_worker(languages, warm_workers)
+
+
+class JobQueue:
+    """
+    Bounded background job runner. Jobs run on a process (or thread) pool;
+    their state is kept in this process for result_ttl seconds after they
+    finish. Submissions beyond max_pending in total, or max_pending_per_user
+    for one user, are refused with QueueFull. Process workers load the OCR
+    readers for warm_up_languages before taking jobs, and share one limit
+    of llm_max_concurrent LLM calls (thread workers share their process's).
+    """
+
+    def __init__(self, executor='process', max_workers=2, max_pending=8,
+                 max_pending_per_user=2, result_ttl=600,
+                 warm_up_languages=None, llm_max_concurrent=None):
+        self.executor_kind = executor
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self.result_ttl = result_ttl
+        self.warm_up_languages = list(warm_up_languages or [])
+        self.llm_max_concurrent = llm_max_concurrent
+        self._executor = None
+        self._warm_workers = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Workers are started on first use, not at import or app creation;
+        # callers hold self._lock
+        if self._executor is None:
+            if self.executor_kind == 'process':
+                # Spawned workers do not inherit the server's threads or
+                # torch state, which fork does not handle safely, nor its
+                # readers: each worker loads its own
+                context = multiprocessing.get_context('spawn')
+                self._warm_workers = context.Value('i', 0)
+                # Each worker would otherwise allow llm_max_concurrent calls
+                llm_slots = (context.BoundedSemaphore(self.llm_max_concurrent)
+                             if self.llm_max_concurrent else None)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=context,
+                    initializer=init_worker,
+                    initargs=(self.warm_up_languages, self._warm_workers,
+                              llm_slots))
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers)
+        return self._executor
+
+    def start(self):
+        """Start every worker now rather than with the first jobs."""
+        with self._lock:
+            executor = self._get_executor()
+            # Workers are started as tasks arrive; a no-op each starts them
+            for _ in range(self.max_workers):
+                executor.submit(int)
+
+    def readers_ready(self, lang_list=('en',)):
+        """
+        Whether receipts are read without first loading an OCR reader: in
+        this process for a thread pool, in every worker for a process pool.
+        """
+        if self.executor_kind != 'process':
+            return ocr.readers.is_ready(lang_list)
+        with self._lock:
+            warm = self._warm_workers
+            return warm is not None and warm.value >= self.max_workers
+
+    def _purge(self):
+        now = time.monotonic()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished'] and now - job['finished'] > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def pending(self, user_id=None):
+        with self._lock:
+            return sum(1 for job in self._jobs.values()
+                       if not job['finished']
+                       and (user_id is None or job['user_id'] == user_id))
+
+    def submit(self, user_id, fn, *args, on_done=None):
+        """
+        Queue fn(*args) for user_id and return the job id. on_done is called
+        in this process with (result, exception) when the job finishes.
+        """
+        return self.submit_many(user_id, [(fn, args, on_done)])[0]
+
+    def submit_many(self, user_id, calls):
+        """
+        Queue several (fn, args, on_done) jobs for user_id and return their
+        ids. Each counts against the pending limits; either all of them are
+        accepted or, with QueueFull, none.
+        """
+        with self._lock:
+            self._purge()
+            pending = [job for job in self._jobs.values() if not job['finished']]
+            if len(pending) + len(calls) > self.max_pending:
+                raise QueueFull('OCR queue is full, please try again shortly')
+            if sum(1 for job in pending if job['user_id'] == user_id
+                   ) + len(calls) > self.max_pending_per_user:
+                raise QueueFull('Too many receipts in progress, please wait')
+
+            submitted = []
+            for fn, args, on_done in calls:
+                job_id = uuid.uuid4().hex
+                job = {
+                    'user_id': user_id,
+                    'future': None,
+                    'finished': None,
+                    'result': None,
+                    'error': None
+                }
+                self._jobs[job_id] = job
+                job['future'] = self._get_executor().submit(fn, *args)
+                submitted.append((job_id, job['future'], on_done))
+
+        for job_id, future, on_done in submitted:
+            future.add_done_callback(
+                lambda future, job_id=job_id, on_done=on_done:
+                self._finish(job_id, future, on_done))
+        return [job_id for job_id, _, _ in submitted]
+
+    def _finish(self, job_id, future, on_done=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            exception = None
+            try:
+                job['result'] = future.result()
+            except Exception as e:
+                logging.error(f"Job {job_id} failed: {e}")
+                job['error'] = str(e)
+                exception = e
+            job['finished'] = time.monotonic()
+        if on_done is not None:
+            try:
+                on_done(job['result'], exception)
+            except Exception as e:
+                logging.error(f"Job {job_id} callback failed: {e}")
+
+    def status(self, job_id, user_id):
+        """Return the job's public state, or None if unknown to this user."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['user_id'] != user_id:
+                return None
+            if job['finished']:
+                state = 'failed' if job['error'] is not None else 'done'
+            elif job['future'].running():
+                state = 'running'
+            else:
+                state = 'queued'
+            return {
+                'job_id': job_id,
+                'status': state,
+                'result': job['result'],
+                'error': job['error']
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def get_queue():
+    return current_app.extensions['ocr_jobs']
+
+
+def init_app(app):
+    languages = (app.config.get('OCR_WARM_UP_LANGUAGES') or []
+                 if app.config.get('OCR_ENABLED', True) else [])
+    queue = app.extensions['ocr_jobs'] = JobQueue(
+        executor=app.config.get('OCR_JOB_EXECUTOR', 'process'),
+        max_workers=app.config.get('OCR_JOB_WORKERS', 2),
+        max_pending=app.config.get('OCR_JOB_MAX_PENDING', 8),
+        max_pending_per_user=app.config.get('OCR_JOB_MAX_PENDING_PER_USER', 2),
+        result_ttl=app.config.get('OCR_JOB_RESULT_TTL', 600),
+        warm_up_languages=languages,
+        llm_max_concurrent=app.config.get('LLM_MAX_CONCURRENT', 4))
+    # Warm-up happens in the workers, so they are started with the app;
+    # otherwise the pool starts with the first receipt
+    if languages and queue.executor_kind == 'process':
+        queue.start()
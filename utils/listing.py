@@ -0,0 +1,119 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _parse_amount(value, name):
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f'Invalid {name}')
+
+
+def _parse_day(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'Invalid {name}. Use YYYY-MM-DD.')
+
+
+def encode_cursor(record):
+    """Opaque keyset cursor pointing just past record in (date, id) order."""
+    payload = json.dumps({'d': record.date.isoformat(), 'i': record.id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(payload['d']), int(payload['i'])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def parse_list_args(args):
+    """
+    Read listing filters and paging from request args.
+    Raises ValueError with a client-facing message on bad input.
+    """
+    filters = {
+        'categories': [c for c in args.getlist('category') if c],
+        'start': None,
+        'end': None,
+        'min_amount': None,
+        'max_amount': None,
+        'search': (args.get('q') or '').strip(),
+        'paginated': 'limit' in args or 'cursor' in args,
+        'limit': DEFAULT_PAGE_SIZE,
+        'cursor': None
+    }
+    if args.get('startDate'):
+        filters['start'] = _parse_day(args['startDate'], 'startDate')
+    if args.get('endDate'):
+        # endDate is inclusive of the whole day
+        filters['end'] = _parse_day(args['endDate'], 'endDate') + timedelta(days=1)
+    if args.get('minAmount'):
+        filters['min_amount'] = _parse_amount(args['minAmount'], 'minAmount')
+    if args.get('maxAmount'):
+        filters['max_amount'] = _parse_amount(args['maxAmount'], 'maxAmount')
+    if args.get('limit'):
+        try:
+            filters['limit'] = int(args['limit'])
+        except ValueError:
+            raise ValueError('Invalid limit')
+        if not 1 <= filters['limit'] <= MAX_PAGE_SIZE:
+            raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    if args.get('cursor'):
+        filters['cursor'] = decode_cursor(args['cursor'])
+    return filters
+
+
+def apply_filters(query, model, filters):
+    """Narrow a query or select() over model to the listing filters."""
+    if filters['categories']:
+        query = query.filter(model.category.in_(filters['categories']))
+    if filters['start'] is not None:
+        query = query.filter(model.date >= filters['start'])
+    if filters['end'] is not None:
+        query = query.filter(model.date < filters['end'])
+    if filters['min_amount'] is not None:
+        query = query.filter(model.amount >= filters['min_amount'])
+    if filters['max_amount'] is not None:
+        query = query.filter(model.amount <= filters['max_amount'])
+    if filters['search']:
+        query = query.filter(model.description.ilike(f"%{filters['search']}%"))
+    return query
+
+
+def filtered_query(model, user_id, filters):
+    """
+    A user's records matching the filters, newest first with id as the
+    tie-breaker so keyset pages are stable.
+    """
+    query = apply_filters(model.query.filter(model.user_id == user_id),
+                          model, filters)
+    return query.order_by(model.date.desc(), model.id.desc())
+
+
+def fetch_page(model, query, filters):
+    """
+    Return (records, next_cursor) for one keyset page of query.
+    next_cursor is None on the last page.
+    """
+    if filters['cursor'] is not None:
+        date, record_id = filters['cursor']
+        # date <= d keeps the index range scan; the OR only splits ties
+        query = query.filter(
+            model.date <= date,
+            or_(model.date < date, and_(model.date == date, model.id < record_id)))
+    records = query.limit(filters['limit'] + 1).all()
+    if len(records) <= filters['limit']:
+        return records, None
+    records = records[:filters['limit']]
+    return records, encode_cursor(records[-1])
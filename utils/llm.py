@@ -1,14 +1,14 @@
-from openai import OpenAI
-from flask import current_app
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
 
-def create_openai_client():
-    return OpenAI(
-        api_key=current_app.config["OPENAI_API_KEY"]
-    )
+from flask import current_app
 
-def process_receipt(content):
-    client = create_openai_client()
-    prompt = """Extract a single record from the receipt OCR text below and return only a JSON object with the following format:
+PROMPT = """Extract a single record from the receipt OCR text below and return only a JSON object with the following format:
     {
       "amount": total amount as a number,
       "category": the most appropriate category from [Food, Transportation, Entertainment, Shopping, Bills, Other],
@@ -17,12 +17,343 @@ def process_receipt(content):
     }
     Here is the OCR text:
     """
-    completion = client.chat.completions.create(
-        model="gpt-4.1-nano",
-        store=True,
-        messages=[
-            {"role": "user", "content": prompt + content}
-        ]
+
+BATCH_PROMPT = """Extract one record per receipt from the OCR texts below and return only a JSON array with one object per receipt, in the same order, each with the following format:
+    {
+      "amount": total amount as a number,
+      "category": the most appropriate category from [Food, Transportation, Entertainment, Shopping, Bills, Other],
+      "description": a brief summary, such as the store name and type (e.g. "Groceries at Spudshed"),
+      "date": timestamp in the format "2025-05-04T15:18:00"
+    }
+    Here are the OCR texts:
+    """
+
+# Returned by the local backend when no canned response is configured
+LOCAL_RESPONSE = json.dumps({
+    'amount': 12.5,
+    'category': 'Food',
+    'description': 'Groceries at Local Store',
+    'date': '2025-05-04T15:18:00'
+})
+
+
+def create_openai_client(api_key=None, max_connections=10):
+    # The SDK is imported on first use, not at app startup
+    import httpx
+    from openai import DefaultHttpxClient, OpenAI
+
+    # Pool workers have no app context and pass the key explicitly
+    return OpenAI(
+        api_key=api_key or current_app.config["OPENAI_API_KEY"],
+        http_client=DefaultHttpxClient(limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections))
     )
-    # Parse the response content to ensure it's a JSON object
-    return completion.choices[0].message.content
\ No newline at end of file
+
+
+class OpenAIBackend:
+    """
+    Chat completions through one client per process, so its HTTP
+    connections are kept alive and reused across receipts.
+    """
+
+    def __init__(self, api_key=None, model='gpt-4.1-nano', max_connections=10):
+        self.model = model
+        self.client = create_openai_client(api_key, max_connections)
+
+    def complete(self, prompt, timeout=None, count=1):
+        # Retries are ours (see process_receipt), not the client's
+        client = self.client.with_options(timeout=timeout, max_retries=0)
+        completion = client.chat.completions.create(
+            model=self.model,
+            store=True,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        )
+        return completion.choices[0].message.content
+
+
+class LocalBackend:
+    """
+    Offline stand-in that answers with canned JSON after a fixed delay, for
+    load tests and benchmarks of the OCR pipeline without network access.
+    """
+
+    def __init__(self, latency=0.0, response=None):
+        self.latency = latency
+        self.response = response or LOCAL_RESPONSE
+
+    def complete(self, prompt, timeout=None, count=1):
+        if timeout is not None and self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError('Local backend timed out')
+        if self.latency:
+            time.sleep(self.latency)
+        # A batched prompt (count receipts) is answered with a JSON array
+        if count > 1:
+            return '[' + ', '.join([self.response] * count) + ']'
+        return self.response
+
+
+BACKENDS = {'openai': OpenAIBackend, 'local': LocalBackend}
+BACKEND_OPTIONS = {
+    'openai': ('api_key', 'model', 'max_connections'),
+    'local': ('latency', 'response'),
+}
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+_semaphores = {}
+# Set in process pool workers: the pool-wide limit (see share_limit)
+_shared_semaphore = None
+
+
+class LLMUnavailable(Exception):
+    """Raised when the LLM could not answer within the call's deadline."""
+
+
+class CircuitBreaker:
+    """
+    Stops sending receipts to the LLM after `threshold` consecutive
+    failures. While open, allow() is False; after reset_timeout seconds one
+    trial call is allowed (half-open) and its outcome closes or reopens it.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self.successes = 0
+        self.total_failures = 0
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if self.clock() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial:
+                self._trial = True
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_after(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            return max(0, self.reset_timeout - (self.clock() - self._opened_at))
+
+    def release(self):
+        """Give back a half-open trial that never reached the LLM."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.total_failures += 1
+            self._failures += 1
+            if self._trial or (self._opened_at is None
+                               and self._failures >= self.threshold):
+                if self._opened_at is None:
+                    logging.warning("LLM circuit breaker opened")
+                self.opened += 1
+                self._opened_at = self.clock()
+            self._trial = False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self._state(),
+                'consecutive_failures': self._failures,
+                'failures': self.total_failures,
+                'successes': self.successes,
+                'rejected': self.rejected,
+                'opened': self.opened
+            }
+
+
+def settings_from_config(config):
+    """The backend settings from app config, picklable for pool workers."""
+    name = config.get('LLM_BACKEND', 'openai')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {name}")
+    settings = {
+        'backend': name,
+        'timeout': config.get('LLM_TIMEOUT', 15.0),
+        'deadline': config.get('LLM_DEADLINE', 30.0),
+        'retries': config.get('LLM_RETRIES', 2),
+        'max_concurrent': config.get('LLM_MAX_CONCURRENT', 4)
+    }
+    if name == 'local':
+        settings.update({
+            'latency': config.get('LLM_LOCAL_LATENCY', 0.0),
+            'response': config.get('LLM_LOCAL_RESPONSE')
+        })
+    else:
+        settings.update({
+            'api_key': config.get('OPENAI_API_KEY'),
+            'model': config.get('LLM_MODEL', 'gpt-4.1-nano'),
+            'max_connections': config.get('LLM_MAX_CONNECTIONS', 10)
+        })
+    return settings
+
+
+def get_backend(settings):
+    """The process's backend for these settings, created on first use."""
+    name = settings['backend']
+    options = {k: settings[k] for k in BACKEND_OPTIONS[name] if k in settings}
+    key = (name, tuple(sorted(options.items())))
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            backend = BACKENDS[name](**options)
+            _backends[key] = backend
+        return backend
+
+
+def retryable_errors():
+    # Errors worth another attempt; anything else (bad key, bad request) is not
+    errors = (TimeoutError,)
+    if 'openai' in sys.modules:
+        # Only an OpenAI backend, which has imported the SDK, raises these
+        import openai
+        errors += (openai.APITimeoutError, openai.APIConnectionError,
+                   openai.RateLimitError, openai.InternalServerError)
+    return errors
+
+
+def share_limit(semaphore):
+    """
+    Use a multiprocessing semaphore, created by the pool and passed to each
+    worker's initializer, for max_concurrent instead of a per-process one,
+    so the limit holds across all of a process pool's workers.
+    """
+    global _shared_semaphore
+    _shared_semaphore = semaphore
+
+
+def _semaphore(limit):
+    # One limit per process, where requests and pool threads share it, or
+    # per process pool
+    if _shared_semaphore is not None:
+        return _shared_semaphore
+    with _backends_lock:
+        return _semaphores.setdefault(limit, threading.BoundedSemaphore(limit))
+
+
+def backoff(attempt, base=0.5, cap=4.0):
+    """Full-jitter exponential backoff before retry number `attempt`."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _complete(prompt, settings, count=1):
+    """
+    One backend call under the concurrency limit, timeouts and retries.
+    At most max_concurrent calls run at once per process, or per process
+    pool when the pool shares its limit (share_limit); each attempt is
+    limited to `timeout` seconds and retryable errors are retried with
+    jittered backoff until `retries` or the overall `deadline` runs out,
+    then LLMUnavailable is raised.
+    """
+    backend = get_backend(settings)
+    deadline = time.monotonic() + settings.get('deadline', 30.0)
+    semaphore = _semaphore(settings.get('max_concurrent', 4))
+
+    if not semaphore.acquire(timeout=settings.get('deadline', 30.0)):
+        raise LLMUnavailable('Too many receipts are being read, try again')
+    try:
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMUnavailable('Receipt extraction timed out')
+            try:
+                return backend.complete(
+                    prompt,
+                    timeout=min(settings.get('timeout', 15.0), remaining),
+                    count=count)
+            except retryable_errors() as e:
+                delay = backoff(attempt)
+                attempt += 1
+                if (attempt > settings.get('retries', 2)
+                        or time.monotonic() + delay >= deadline):
+                    raise LLMUnavailable(f'Receipt extraction failed: {e}')
+                logging.warning(f"LLM call failed ({e}), retrying")
+                time.sleep(delay)
+    finally:
+        semaphore.release()
+
+
+def process_receipt(content, settings=None):
+    """
+    Extract the expense from receipt OCR text as a JSON string.
+    :param settings: From settings_from_config; pool workers have no app
+                     context and pass them explicitly
+    """
+    if settings is None:
+        settings = settings_from_config(current_app.config)
+    return _complete(PROMPT + content, settings)
+
+
+def process_receipts(contents, settings=None):
+    """
+    Extract several receipts with one call; returns a JSON string per text.
+    If the answer is not a JSON array of the right length, each receipt is
+    asked for on its own instead.
+    """
+    if settings is None:
+        settings = settings_from_config(current_app.config)
+    if len(contents) == 1:
+        return [process_receipt(contents[0], settings)]
+
+    prompt = BATCH_PROMPT + ''.join(
+        f"\n### Receipt {i}\n{content}\n"
+        for i, content in enumerate(contents, start=1))
+    answer = _complete(prompt, settings, count=len(contents))
+    try:
+        records = json.loads(re.sub(r'^```(?:json)?|```$', '',
+                                    answer.strip()).strip())
+        if (isinstance(records, list) and len(records) == len(contents)
+                and all(isinstance(r, dict) for r in records)):
+            return [json.dumps(record) for record in records]
+    except ValueError:
+        pass
+    logging.warning("Batched receipt answer was unusable, asking one by one")
+    return [process_receipt(content, settings) for content in contents]
+
+
+def get_breaker():
+    return current_app.extensions['llm_breaker']
+
+
+def init_app(app):
+    app.extensions['llm_breaker'] = CircuitBreaker(
+        threshold=app.config.get('LLM_BREAKER_THRESHOLD', 5),
+        reset_timeout=app.config.get('LLM_BREAKER_RESET', 30))
@@ -1,12 +1,207 @@
-import easyocr
+import io
+import logging
+import threading
+from collections import OrderedDict
 
-def ocr_image(file_stream, lang_list=['en']) -> str:
+# Preprocessing applied before readtext; each stage can be switched off.
+# target_long_side is the downscale target in pixels (about 200 DPI for a
+# typical 8 inch receipt); 0 keeps the original size.
+PREPROCESS_DEFAULTS = {
+    'exif_rotate': True,
+    'target_long_side': 1600,
+    'grayscale': True,
+    'autocontrast': True,
+    'crop': False,
+}
+
+
+def _crop_to_receipt(image):
+    import numpy as np
+
+    # Receipts are bright paper on a darker background: keep the bounding box
+    # of rows/columns that are mostly bright, unless that box looks wrong
+    gray = np.asarray(image.convert('L'), dtype=np.float32)
+    bright = gray > np.percentile(gray, 90) * 0.75
+    rows = np.where(bright.mean(axis=1) > 0.3)[0]
+    cols = np.where(bright.mean(axis=0) > 0.3)[0]
+    if len(rows) == 0 or len(cols) == 0:
+        return image
+    top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+    if (bottom - top) * (right - left) < 0.2 * gray.size:
+        return image
+    return image.crop((left, top, right, bottom))
+
+
+def preprocess_image(image_bytes, options=None):
+    """
+    Prepare an uploaded receipt photo for OCR.
+    Returns a numpy array readtext accepts; the stages run in order
+    EXIF rotation, crop, downscale, grayscale, contrast normalisation.
+    """
+    # Imaging libraries load with the first receipt, not at app startup
+    import numpy as np
+    from PIL import Image, ImageOps
+
+    options = {**PREPROCESS_DEFAULTS, **(options or {})}
+    image = Image.open(io.BytesIO(image_bytes))
+    if options['exif_rotate']:
+        image = ImageOps.exif_transpose(image)
+    image = image.convert('RGB')
+
+    if options['crop']:
+        image = _crop_to_receipt(image)
+
+    target = options['target_long_side']
+    if target and max(image.size) > target:
+        scale = target / max(image.size)
+        image = image.resize((max(1, round(image.width * scale)),
+                              max(1, round(image.height * scale))),
+                             Image.LANCZOS)
+
+    if options['grayscale']:
+        image = image.convert('L')
+    if options['autocontrast']:
+        image = ImageOps.autocontrast(image, cutoff=1)
+    return np.asarray(image)
+
+
+def _load_reader(languages):
+    # easyocr imports torch, so it is only loaded with the first reader
+    import easyocr
+    return easyocr.Reader(list(languages), gpu=False)  # Use CPU
+
+
+class ReaderRegistry:
+    """
+    Process-wide EasyOCR readers, loaded once per language set.
+    Loading a reader reads its detection and recognition models from disk,
+    so readers are kept and reused; beyond max_readers the least recently
+    used language set is dropped.
+    """
+
+    def __init__(self, max_readers=2, loader=_load_reader):
+        self.max_readers = max_readers
+        self.loader = loader
+        self._readers = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    @staticmethod
+    def key(lang_list):
+        return tuple(sorted(set(lang_list)))
+
+    def get(self, lang_list):
+        """Return (reader, lock) for the language set, loading it if needed."""
+        key = self.key(lang_list)
+        with self._lock:
+            if key in self._readers:
+                self._readers.move_to_end(key)
+                return self._readers[key]
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other language sets stay usable;
+        # concurrent callers for the same set wait for the first load
+        with load_lock:
+            with self._lock:
+                if key in self._readers:
+                    self._readers.move_to_end(key)
+                    return self._readers[key]
+            entry = (self.loader(key), threading.Lock())
+            with self._lock:
+                self._readers[key] = entry
+                self._loading.pop(key, None)
+                while len(self._readers) > self.max_readers:
+                    evicted, _ = self._readers.popitem(last=False)
+                    logging.info(f"Evicted OCR reader for {evicted}")
+            return entry
+
+    def is_ready(self, lang_list=('en',)):
+        with self._lock:
+            return self.key(lang_list) in self._readers
+
+    def warm_up(self, lang_list=('en',)):
+        self.get(lang_list)
+
+    def clear(self):
+        with self._lock:
+            self._readers.clear()
+
+
+readers = ReaderRegistry()
+
+# In pool workers: a counter shared with the web process, incremented once
+# the worker has a reader loaded (see init_worker)
+_warm_workers = None
+
+
+def _count_warm():
+    global _warm_workers
+    if _warm_workers is not None:
+        with _warm_workers.get_lock():
+            _warm_workers.value += 1
+        # Each worker is counted once
+        _warm_workers = None
+
+
+def init_worker(languages, warm_workers):
+    """
+    Process pool initializer: load the readers for languages before the
+    worker takes its first job. warm_workers (a shared multiprocessing
+    Value) counts the workers that have a reader loaded, here or with their
+    first receipt.
+    """
+    global _warm_workers
+    _warm_workers = warm_workers
+    if not languages:
+        return
+    try:
+        readers.warm_up(languages)
+    except Exception as e:
+        logging.error(f"OCR warm-up failed: {e}")
+        return
+    logging.info(f"OCR reader for {languages} is ready")
+    _count_warm()
+
+
+def ocr_image(file_stream, lang_list=['en'], preprocess=None) -> str:
     """
     Perform OCR using EasyOCR (no external dependencies like Tesseract).
     :param file_stream: File stream of the image
     :param lang_list: List of language codes (e.g. ['en'], ['en', 'ch_sim'])
+    :param preprocess: Overrides for PREPROCESS_DEFAULTS, or False to pass
+                       the bytes through untouched
     :return: Full extracted text
     """
-    reader = easyocr.Reader(lang_list, gpu=False)  # Use CPU
-    results = reader.readtext(file_stream, detail=0)  # Pass file stream directly
+    image = file_stream
+    if preprocess is not False:
+        image = preprocess_image(file_stream, preprocess)
+    reader, lock = readers.get(lang_list)
+    _count_warm()
+    # A reader's models are shared, so one inference runs at a time per reader
+    with lock:
+        results = reader.readtext(image, detail=0)
     return "\n".join(results)
+
+
+def init_app(app):
+    """
+    Size the reader registry and optionally load the default readers in the
+    background so the first receipt does not pay for model loading.
+    With the default process pool, receipts are read in the pool's workers,
+    which load their own readers instead (see jobs.init_app).
+    """
+    readers.max_readers = app.config.get('OCR_MAX_READERS', 2)
+    languages = app.config.get('OCR_WARM_UP_LANGUAGES') or []
+    if not languages or not app.config.get('OCR_ENABLED', True):
+        return
+    if app.config.get('OCR_JOB_EXECUTOR', 'process') == 'process':
+        return
+
+    def warm_up():
+        try:
+            readers.warm_up(languages)
+            logging.info(f"OCR reader for {languages} is ready")
+        except Exception as e:
+            logging.error(f"OCR warm-up failed: {e}")
+
+    threading.Thread(target=warm_up, name='ocr-warm-up', daemon=True).start()
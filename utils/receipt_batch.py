@@ -0,0 +1,257 @@
+import threading
+import time
+import uuid
+
+from flask import current_app
+
+from utils import llm, receipt_cache, receipt_parser
+from utils.jobs import QueueFull, receipt_text
+
+# Line sources counted in receipt_parser.stats; 'unavailable' marks
+# receipts that failed because the LLM did not answer
+ANSWERED = ('cache', 'parser', 'llm', 'fallback')
+
+
+def _line(index, filename, result=None, error=None, source=None):
+    return {
+        'index': index,
+        'filename': filename,
+        'status': 'failed' if error is not None else 'done',
+        'result': result,
+        'error': error,
+        'source': source
+    }
+
+
+def read_receipt(image_bytes, preprocess=None, cache_settings=None,
+                 min_confidence=None):
+    """
+    Pool job for one image of a batch: OCR it and answer it without the LLM
+    where possible. Returns {'result', 'source'} when answered from the
+    cache or by the parser, otherwise {'text'} for a follow-up
+    extract_receipts job.
+    """
+    text = receipt_text(image_bytes, preprocess, cache_settings)
+    cache = receipt_cache.from_settings(cache_settings)
+    result = cache and cache.get(receipt_cache.LLM_NAMESPACE,
+                                 receipt_cache.text_key(text))
+    if result is not None:
+        return {'result': result, 'source': 'cache'}
+    if min_confidence is not None:
+        result = receipt_parser.extract(text, min_confidence)
+        if result is not None:
+            return {'result': result, 'source': 'parser'}
+    return {'text': text}
+
+
+def extract_receipts(texts, llm_settings, cache_settings=None, fallback=False,
+                     unavailable=None):
+    """
+    Pool job extracting several OCR texts with one LLM call; returns one
+    {'result', 'error', 'source'} dict per text. With llm_settings None (the
+    circuit breaker is open) or an unavailable message (an earlier call of
+    the batch failed), the LLM is not called.
+    """
+    try:
+        if llm_settings is None:
+            raise llm.LLMUnavailable('Receipt extraction is paused')
+        if unavailable is not None:
+            # Would only wait out the same deadline again
+            raise llm.LLMUnavailable(unavailable)
+        results = llm.process_receipts(texts, llm_settings)
+    except llm.LLMUnavailable as e:
+        if fallback:
+            return [{'result': receipt_parser.fallback(text, str(e)),
+                     'error': None, 'source': 'fallback'} for text in texts]
+        return [{'result': None, 'error': str(e), 'source': 'unavailable'}
+                for _ in texts]
+
+    cache = receipt_cache.from_settings(cache_settings)
+    for text, result in zip(texts, results):
+        receipt_cache.safe_set(cache, receipt_cache.LLM_NAMESPACE,
+                               receipt_cache.text_key(text), result)
+    return [{'result': result, 'error': None, 'source': 'llm'}
+            for result in results]
+
+
+class ReceiptBatch:
+    """
+    Receipts uploaded together: one read_receipt job per image, then
+    extract_receipts jobs over the texts the LLM has to read, batch_size at
+    a time. Lines are kept in the order receipts finish, so a client can
+    show each one as it arrives. on_complete(lines, None) is called once
+    every receipt has its line.
+    """
+
+    def __init__(self, queue, user_id, filenames, llm_settings,
+                 cache_settings=None, fallback=False, batch_size=5,
+                 on_complete=None):
+        self.batch_id = uuid.uuid4().hex
+        self.queue = queue
+        self.user_id = user_id
+        self.filenames = list(filenames)
+        self.llm_settings = llm_settings
+        self.cache_settings = cache_settings
+        self.fallback = fallback
+        self.batch_size = batch_size
+        self.on_complete = on_complete
+        self.lines = []
+        self.finished = None
+        self._read = 0
+        self._to_read = 0
+        self._texts = []
+        self._unavailable = None
+        self._lock = threading.Lock()
+
+    def add_line(self, index, result=None, error=None, source=None):
+        """Record a receipt's line, e.g. one answered before any job."""
+        with self._lock:
+            self._add(index, result, error, source)
+        self._check_complete()
+
+    def _add(self, index, result, error, source):
+        self.lines.append(_line(index, self.filenames[index], result, error,
+                                source))
+
+    def read_jobs(self, images, preprocess=None, min_confidence=None):
+        """(fn, args, on_done) read_receipt jobs for JobQueue.submit_many."""
+        with self._lock:
+            self._to_read = len(images)
+        return [(read_receipt,
+                 (image_bytes, preprocess, self.cache_settings,
+                  min_confidence),
+                 self._on_read(index))
+                for index, image_bytes in images]
+
+    def _on_read(self, index):
+        def on_done(value, error):
+            with self._lock:
+                self._read += 1
+                if error is not None:
+                    self._add(index, None, str(error), None)
+                elif 'text' in value:
+                    self._texts.append((index, value['text']))
+                else:
+                    self._add(index, value['result'], None, value['source'])
+                chunks = self._take_texts()
+            self._extract(chunks)
+            self._check_complete()
+        return on_done
+
+    def _take_texts(self):
+        # Full chunks as texts arrive; the rest once every image is read
+        chunks = []
+        while (len(self._texts) >= self.batch_size
+               or (self._texts and self._read >= self._to_read)):
+            chunks.append(self._texts[:self.batch_size])
+            self._texts = self._texts[self.batch_size:]
+        return [(chunk, self._unavailable) for chunk in chunks]
+
+    def _extract(self, chunks):
+        # Submitted outside self._lock: a job that already finished calls
+        # its on_done right away
+        for chunk, unavailable in chunks:
+            try:
+                self.queue.submit(
+                    self.user_id, extract_receipts,
+                    [text for _, text in chunk], self.llm_settings,
+                    self.cache_settings, self.fallback, unavailable,
+                    on_done=self._on_extracted(chunk))
+            except QueueFull as e:
+                with self._lock:
+                    for index, _ in chunk:
+                        self._add(index, None, str(e), None)
+                self._check_complete()
+
+    def _on_extracted(self, chunk):
+        def on_done(results, error):
+            with self._lock:
+                if error is not None:
+                    results = [{'result': None, 'error': str(error),
+                                'source': None}] * len(chunk)
+                for (index, _), line in zip(chunk, results):
+                    if line['source'] == 'unavailable':
+                        self._unavailable = line['error']
+                    self._add(index, line['result'], line['error'],
+                              line['source'])
+            self._check_complete()
+        return on_done
+
+    def _check_complete(self):
+        with self._lock:
+            if self.finished or len(self.lines) < len(self.filenames):
+                return
+            self.finished = time.monotonic()
+            lines = list(self.lines)
+        if self.on_complete is not None:
+            self.on_complete(lines, None)
+
+    def status(self, since=0):
+        """Lines finished since the given count, and the count to ask next."""
+        with self._lock:
+            return {
+                'batch_id': self.batch_id,
+                'status': 'done' if self.finished else 'running',
+                'files': len(self.filenames),
+                'lines': self.lines[max(since, 0):],
+                'next': len(self.lines)
+            }
+
+
+class BatchRegistry:
+    """Receipt batches by id, kept for result_ttl seconds once finished."""
+
+    def __init__(self, result_ttl=600):
+        self.result_ttl = result_ttl
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def add(self, batch):
+        with self._lock:
+            now = time.monotonic()
+            expired = [batch_id for batch_id, b in self._batches.items()
+                       if b.finished and now - b.finished > self.result_ttl]
+            for batch_id in expired:
+                del self._batches[batch_id]
+            self._batches[batch.batch_id] = batch
+        return batch.batch_id
+
+    def get(self, batch_id, user_id):
+        """The batch, or None if unknown to this user."""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+        if batch is None or batch.user_id != user_id:
+            return None
+        return batch
+
+
+def batch_job_callback(breaker, llm_allowed):
+    """
+    on_complete for receipt batches: count how each receipt was answered
+    and feed the LLM's outcome to the circuit breaker, as
+    receipt_job_callback does for single receipts.
+    """
+    def on_done(lines, error):
+        sources = [line['source'] for line in lines or []]
+        for source in sources:
+            if source in ANSWERED:
+                receipt_parser.stats.record(source)
+        if not llm_allowed:
+            return
+        if 'fallback' in sources or 'unavailable' in sources:
+            breaker.record_failure()
+        elif 'llm' in sources:
+            breaker.record_success()
+        else:
+            # Answered without the LLM, e.g. by the parser
+            breaker.release()
+    return on_done
+
+
+def get_batches():
+    return current_app.extensions['receipt_batches']
+
+
+def init_app(app):
+    app.extensions['receipt_batches'] = BatchRegistry(
+        result_ttl=app.config.get('OCR_JOB_RESULT_TTL', 600))
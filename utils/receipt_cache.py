@@ -0,0 +1,144 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+
+OCR_NAMESPACE = 'ocr'
+LLM_NAMESPACE = 'llm'
+
+
+class DiskCache:
+    """
+    Size-bounded on-disk key/value store for text, shared by every process
+    pointing at the same directory. Reads refresh an entry's mtime and,
+    once the total size exceeds max_bytes, the oldest entries are deleted
+    until it is under low_water of max_bytes.
+    The total is counted with one scan of the directory at the first write,
+    then kept up to date by this instance's writes; only going over
+    max_bytes scans (and resynchronises with other processes' writes) again.
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, low_water=0.9):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self._total = None
+        self._lock = threading.Lock()
+
+    def _path(self, namespace, key):
+        return os.path.join(self.directory, namespace, key[:2], key)
+
+    def get(self, namespace, key):
+        path = self._path(namespace, key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                value = f.read()
+            os.utime(path)
+            return value
+        except OSError:
+            return None
+
+    def set(self, namespace, key, value):
+        path = self._path(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = 0
+        # Write to a temporary file first so readers never see partial values
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(value)
+        size = os.stat(tmp_path).st_size
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total is None:
+                # Already includes the entry just written
+                self._total = sum(size for _, size, _ in self._entries())
+            else:
+                self._total += size - replaced
+            if self._total > self.max_bytes:
+                self.evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def evict(self):
+        """Delete the oldest entries until the total is under low water."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * self.low_water
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self._total = total
+
+
+def image_key(image_bytes, lang_list=('en',), preprocess=None):
+    """SHA-256 of the image bytes, qualified by the OCR settings."""
+    settings = json.dumps([sorted(set(lang_list)), preprocess], sort_keys=True)
+    return '%s-%s' % (hashlib.sha256(image_bytes).hexdigest(),
+                      hashlib.sha256(settings.encode()).hexdigest()[:12])
+
+
+def normalize_text(text):
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def text_key(text):
+    """SHA-256 of the OCR text with whitespace normalised."""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def from_settings(settings):
+    """
+    The process's cache for {'directory', 'max_bytes'}, created on first
+    use so its running size total is kept across jobs; None disables it.
+    """
+    if not settings or not settings.get('directory') or not settings.get('max_bytes'):
+        return None
+    key = (settings['directory'], settings['max_bytes'])
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = DiskCache(*key)
+        return _caches[key]
+
+
+def cached_extraction(cache, image_bytes, lang_list=('en',), preprocess=None):
+    """The cached LLM result for an image, if both stages are cached."""
+    if cache is None:
+        return None
+    text = cache.get(OCR_NAMESPACE, image_key(image_bytes, lang_list, preprocess))
+    if text is None:
+        return None
+    return cache.get(LLM_NAMESPACE, text_key(text))
+
+
+def safe_set(cache, namespace, key, value):
+    # A full or read-only disk must not fail the receipt itself
+    if cache is None or value is None:
+        return
+    try:
+        cache.set(namespace, key, value)
+    except OSError as e:
+        logging.warning(f"Receipt cache write failed: {e}")
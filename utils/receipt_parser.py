@@ -0,0 +1,235 @@
+import json
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+
+# Merchant keywords per ExpensesForm category, with the label used in the
+# description ("Groceries at Spudshed"). Keywords match whole words.
+MERCHANT_KEYWORDS = {
+    'Food': {
+        'Groceries': ['woolworths', 'coles', 'aldi', 'iga', 'spudshed',
+                      'foodworks', 'supermarket', 'grocer'],
+        'Dining': ['cafe', 'coffee', 'restaurant', 'bakery', 'pizza', 'sushi',
+                   'mcdonalds', "mcdonald's", 'kfc', 'subway',
+                   'hungry jacks', "hungry jack's", 'dominos', 'grill'],
+    },
+    'Transportation': {
+        'Fuel': ['shell', 'bp', 'caltex', 'ampol', 'puma', 'fuel', 'petrol',
+                 'unleaded', 'diesel'],
+        'Transport': ['uber', 'taxi', 'transperth', 'smartrider', 'parking',
+                      'wilson parking', 'didi', 'ola'],
+    },
+    'Entertainment': {
+        'Entertainment': ['cinema', 'cinemas', 'hoyts', 'movie', 'ticketek',
+                          'ticketmaster', 'bowling', 'netflix', 'spotify',
+                          'steam'],
+    },
+    'Shopping': {
+        'Shopping': ['kmart', 'target', 'big w', 'bunnings', 'jb hi-fi',
+                     'officeworks', 'myer', 'david jones', 'uniqlo', 'ikea',
+                     'harvey norman', 'chemist warehouse', 'priceline'],
+    },
+    'Bills': {
+        'Bills': ['synergy', 'water corporation', 'alinta', 'telstra', 'optus',
+                  'vodafone', 'electricity', 'internet', 'insurance',
+                  'invoice'],
+    },
+}
+
+# Confidence earned by each field; a result below the caller's threshold
+# falls through to the LLM
+WEIGHTS = {'total': 0.5, 'amount': 0.2, 'date': 0.25, 'category': 0.25}
+
+AMOUNT = re.compile(
+    r'(?<![\d.,/])\$?\s?(\d{1,3}(?:,\d{3})+|\d+)[.,](\d{2})(?![.,/]?\d)')
+TOTAL_LINE = re.compile(
+    r'\b(grand total|total due|amount due|balance due|total)\b', re.I)
+NOT_TOTAL = re.compile(r'\b(sub[\s-]?total|total savings|gst|tax)\b', re.I)
+TIME = re.compile(r'\b([01]?\d|2[0-3]):([0-5]\d)(?::([0-5]\d))?\s*([ap]m)?\b',
+                  re.I)
+MONTHS = {name: i for i, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun',
+     'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)}
+DATES = [
+    # 2025-03-12
+    (re.compile(r'\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b'),
+     lambda m: (int(m[1]), int(m[2]), int(m[3]))),
+    # 12/03/2025 or 12/03/25, day first as on Australian receipts
+    (re.compile(r'\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{4}|\d{2})\b'),
+     lambda m: (_year(m[3]), int(m[2]), int(m[1]))),
+    # 12 Mar 2025 or 12-MAR-25
+    (re.compile(r'\b(\d{1,2})[\s-]([a-z]{3})[a-z]*[\s-](\d{4}|\d{2})\b', re.I),
+     lambda m: (_year(m[3]), MONTHS.get(m[2].lower(), 0), int(m[1]))),
+]
+
+
+def _year(text):
+    return int(text) + 2000 if len(text) == 2 else int(text)
+
+
+def _amount(line):
+    matches = AMOUNT.findall(line)
+    if not matches:
+        return None
+    whole, cents = matches[-1]
+    return float(whole.replace(',', '') + '.' + cents)
+
+
+def find_total(lines):
+    """The amount on the last TOTAL line, or on the line after it."""
+    for i in range(len(lines) - 1, -1, -1):
+        line = lines[i]
+        if not TOTAL_LINE.search(line) or NOT_TOTAL.search(line):
+            continue
+        amount = _amount(line)
+        if amount is None and i + 1 < len(lines):
+            # OCR often splits "TOTAL" and the figure into separate boxes
+            amount = _amount(lines[i + 1])
+        if amount is not None:
+            return amount
+    return None
+
+
+def find_date(text):
+    """The first valid date in the text, with the first time of day if any."""
+    for pattern, parts in DATES:
+        for match in pattern.finditer(text):
+            try:
+                day = datetime(*parts(match))
+            except ValueError:
+                continue
+            time = TIME.search(text)
+            if time:
+                hour = int(time[1]) % 12 if time[4] else int(time[1])
+                if time[4] and time[4].lower() == 'pm':
+                    hour += 12
+                day = day.replace(hour=hour, minute=int(time[2]),
+                                  second=int(time[3] or 0))
+            return day
+    return None
+
+
+def find_merchant(lines):
+    """(category, label, merchant line) for the first known keyword."""
+    for line in lines:
+        lowered = line.lower()
+        found = []
+        for category, labels in MERCHANT_KEYWORDS.items():
+            for label, keywords in labels.items():
+                for keyword in keywords:
+                    match = re.search(
+                        r'(?<!\w)' + re.escape(keyword) + r'(?!\w)', lowered)
+                    if match:
+                        found.append((match.start(), category, label))
+        if found:
+            # "Shell Coles Express" is a petrol station, not a supermarket
+            _, category, label = min(found)
+            return category, label, line
+    return None
+
+
+def parse_receipt(text):
+    """
+    Extract amount, date, category and description from receipt OCR text.
+    Returns (record, confidence) where record has the same shape as the LLM
+    output and confidence is between 0 and 1.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    confidence = 0.0
+
+    amount = find_total(lines)
+    if amount is not None:
+        confidence += WEIGHTS['total']
+    else:
+        # Without a TOTAL line the largest figure is a guess
+        amounts = [a for a in map(_amount, lines) if a is not None]
+        if amounts:
+            amount = max(amounts)
+            confidence += WEIGHTS['amount']
+
+    day = find_date(text)
+    if day is not None:
+        confidence += WEIGHTS['date']
+
+    merchant = find_merchant(lines)
+    if merchant:
+        category, label, line = merchant
+        confidence += WEIGHTS['category']
+        description = f"{label} at {line.title()}"
+    else:
+        category = 'Other'
+        description = lines[0].title() if lines else ''
+
+    record = {
+        'amount': amount,
+        'category': category,
+        'description': description,
+        'date': day.strftime('%Y-%m-%dT%H:%M:%S') if day else None
+    }
+    return record, round(confidence, 2)
+
+
+def extract(text, min_confidence):
+    """
+    The parser's result as JSON if it reaches min_confidence, else None so
+    the caller can ask the LLM.
+    """
+    record, confidence = parse_receipt(text)
+    if confidence < min_confidence:
+        return None
+    return json.dumps({**record, 'source': 'parser'})
+
+
+def fallback(text, reason):
+    """
+    Best-effort result when the LLM is unavailable: the parser's guesses
+    plus the raw OCR text, for the user to check before saving.
+    """
+    record, confidence = parse_receipt(text)
+    return json.dumps({**record, 'source': 'fallback', 'confidence': confidence,
+                       'text': text, 'error': reason})
+
+
+def result_source(result):
+    """'parser' or 'fallback' for results built here, else 'llm'."""
+    try:
+        source = json.loads(result).get('source')
+    except (TypeError, ValueError, AttributeError):
+        source = None
+    return source if source in ('parser', 'fallback') else 'llm'
+
+
+class FastPathStats:
+    """How receipt extractions were answered: parser, llm, fallback or cache."""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, source):
+        with self._lock:
+            self._counts[source] += 1
+
+    def record_result(self, result):
+        self.record(result_source(result))
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        extracted = counts.get('parser', 0) + counts.get('llm', 0)
+        return {
+            'parser': counts.get('parser', 0),
+            'llm': counts.get('llm', 0),
+            'fallback': counts.get('fallback', 0),
+            'cache': counts.get('cache', 0),
+            'fast_path_rate': (round(counts.get('parser', 0) / extracted, 3)
+                               if extracted else None)
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = FastPathStats()
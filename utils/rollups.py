@@ -0,0 +1,153 @@
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from models.models import db, DailyRollup, Expense, Income
+
+
+def _rollup_kind(record, model=None):
+    # Expense rows carry their own type (unset until flushed); every Income
+    # row counts as income
+    if isinstance(record, Expense) or model is Expense:
+        return record.type or 'expense'
+    return 'income'
+
+
+def _collect(records, sign, model=None):
+    deltas = defaultdict(lambda: [0.0, 0])
+    for record in records:
+        key = (record.user_id, _rollup_kind(record, model), record.date.date(),
+               record.category)
+        deltas[key][0] += sign * float(record.amount)
+        deltas[key][1] += sign
+    return deltas
+
+
+def _apply(deltas):
+    for (user_id, kind, day, category), (amount, count) in deltas.items():
+        rollup = db.session.get(DailyRollup, (user_id, kind, day, category))
+        if rollup is None:
+            rollup = DailyRollup(user_id=user_id,
+                                 kind=kind,
+                                 day=day,
+                                 category=category,
+                                 total=0.0,
+                                 count=0)
+            db.session.add(rollup)
+        rollup.total += amount
+        rollup.count += count
+        if rollup.count <= 0:
+            db.session.delete(rollup)
+
+
+def records_added(records):
+    """Add new Expense/Income rows to the rollups in the current transaction."""
+    _apply(_collect(records, 1))
+
+
+def _key_params(key):
+    user_id, kind, day, category = key
+    return {'b_user_id': user_id, 'b_kind': kind, 'b_day': day,
+            'b_category': category}
+
+
+def _update_totals(table, deltas):
+    # One executemany UPDATE for every touched rollup
+    db.session.execute(
+        update(table).where(
+            table.c.user_id == bindparam('b_user_id'),
+            table.c.kind == bindparam('b_kind'),
+            table.c.day == bindparam('b_day'),
+            table.c.category == bindparam('b_category')).values(
+                total=table.c.total + bindparam('b_total'),
+                count=table.c.count + bindparam('b_count')),
+        [{**_key_params(key), 'b_total': amount, 'b_count': count}
+         for key, (amount, count) in deltas.items()])
+
+
+def rows_added(model, rows):
+    """
+    Add rows inserted in bulk: one SELECT of the rollups that already
+    exist, then one executemany UPDATE and one executemany INSERT.
+    :param rows: Objects with user_id, date, category, amount and, for
+                 Expense, type (see utils.bulk.NewRecord)
+    """
+    deltas = _collect(rows, 1, model)
+    if not deltas:
+        return
+    table = DailyRollup.__table__
+    days = [key[2] for key in deltas]
+    existing = {tuple(row) for row in db.session.execute(
+        select(table.c.user_id, table.c.kind, table.c.day,
+               table.c.category).where(
+                   table.c.user_id.in_({key[0] for key in deltas}),
+                   table.c.kind.in_({key[1] for key in deltas}),
+                   table.c.day.between(min(days), max(days))))}
+
+    updates = {key: delta for key, delta in deltas.items() if key in existing}
+    if updates:
+        _update_totals(table, updates)
+    created = [key for key in deltas if key not in existing]
+    if created:
+        db.session.execute(insert(table), [
+            dict(zip(('user_id', 'kind', 'day', 'category'), key),
+                 total=deltas[key][0], count=deltas[key][1])
+            for key in created
+        ])
+
+
+def rows_removed(model, rows):
+    """
+    Subtract rows about to be deleted in bulk: one executemany UPDATE for
+    all touched rollups, then one DELETE of the rollups left empty.
+    :param rows: Result rows (not ORM objects) with user_id, date, category,
+                 amount and, for Expense, type
+    """
+    deltas = _collect(rows, -1, model)
+    if not deltas:
+        return
+    table = DailyRollup.__table__
+    _update_totals(table, deltas)
+    db.session.execute(
+        delete(table).where(
+            table.c.user_id.in_({key[0] for key in deltas}),
+            table.c.kind.in_({key[1] for key in deltas}),
+            table.c.count <= 0))
+
+
+def rebuild_rollups(user_id=None):
+    """
+    Recompute the rollup table from the raw Expense/Income rows.
+    Pass user_id to rebuild a single user, otherwise every user is rebuilt.
+    Returns the number of rollup rows written.
+    """
+    query = DailyRollup.query
+    if user_id is not None:
+        query = query.filter(DailyRollup.user_id == user_id)
+    query.delete(synchronize_session=False)
+
+    written = 0
+    for model in (Expense, Income):
+        kind = model.type if model is Expense else db.literal('income')
+        day = db.func.date(model.date)
+        rows = db.session.query(model.user_id, kind, day, model.category,
+                                db.func.sum(model.amount),
+                                db.func.count(model.id))
+        if user_id is not None:
+            rows = rows.filter(model.user_id == user_id)
+        rows = rows.group_by(model.user_id, kind, day, model.category)
+
+        for row_user_id, row_kind, row_day, category, total, count in rows:
+            if isinstance(row_day, str):
+                row_day = date.fromisoformat(row_day)
+            db.session.add(
+                DailyRollup(user_id=row_user_id,
+                            kind=row_kind,
+                            day=row_day,
+                            category=category,
+                            total=float(total),
+                            count=count))
+            written += 1
+    db.session.commit()
+    return written
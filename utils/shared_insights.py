@@ -0,0 +1,114 @@
+from sqlalchemy import and_, func
+
+from models.models import db, Expense, Income, ShareVisibility
+from utils.buckets import UNITS, bucket_start, label
+
+# Top-N cut-off used by the shared top-categories charts
+TOP_CATEGORY_LIMIT = 10
+
+
+def _model(kind):
+    return Expense if kind == 'expense' else Income
+
+
+def _group_keys(model, group_by):
+    if group_by is None:
+        return ()
+    if group_by == 'category':
+        return (model.category,)
+    if group_by in UNITS:
+        return (bucket_start(model.date, group_by),)
+    raise ValueError(f'Unknown grouping: {group_by}')
+
+
+def _bucket(group_by, keys):
+    # Days are used as chart labels, other time buckets as start dates
+    if group_by == 'day':
+        return keys[0].strftime('%Y-%m-%d')
+    return keys[0] if keys else None
+
+
+def aggregate(kind, user_id, start_date, end_date, group_by=None,
+              sharer_id=None):
+    """
+    Sum the records of one kind shared with user_id in [start_date, end_date).
+    group_by is None, 'category' or a time bucket (utils.buckets.UNITS);
+    returns a list of (bucket, total, count) tuples ordered by bucket. Only
+    the aggregates leave the database.
+    """
+    model = _model(kind)
+    keys = _group_keys(model, group_by)
+    query = db.session.query(
+        *keys,
+        func.coalesce(func.sum(model.amount), 0.0),
+        func.count(model.id)
+    ).join(
+        ShareVisibility,
+        and_(ShareVisibility.item_id == model.id, ShareVisibility.kind == kind)
+    ).filter(
+        ShareVisibility.recipient_id == user_id,
+        model.date >= start_date,
+        model.date < end_date
+    )
+    if sharer_id is not None:
+        query = query.filter(ShareVisibility.owner_id == sharer_id)
+    if keys:
+        query = query.group_by(*keys).order_by(*keys)
+
+    width = len(keys)
+    return [(_bucket(group_by, row[:width]), float(row[width]), int(row[width + 1]))
+            for row in query.all()]
+
+
+def summary(kind, user_id, start_date, end_date, sharer_id=None):
+    """Entry count, total and category distribution for one kind."""
+    rows = aggregate(kind, user_id, start_date, end_date, 'category',
+                     sharer_id)
+    return {
+        'totalEntries': sum(count for _, _, count in rows),
+        'totalAmount': sum(total for _, total, _ in rows),
+        'categoryDistribution': {
+            'labels': [category for category, _, _ in rows],
+            'values': [total for _, total, _ in rows]
+        }
+    }
+
+
+def top_categories(kind, user_id, start_date, end_date, sharer_id=None,
+                   limit=TOP_CATEGORY_LIMIT):
+    """Largest categories by total; returns (labels, values, entry count)."""
+    rows = aggregate(kind, user_id, start_date, end_date, 'category',
+                     sharer_id)
+    entries = sum(count for _, _, count in rows)
+    rows = sorted(rows, key=lambda row: row[1], reverse=True)[:limit]
+    return ([category for category, _, _ in rows],
+            [total for _, total, _ in rows], entries)
+
+
+def by_month(kind, user_id, start_date, end_date, sharer_id=None):
+    """Monthly totals; returns ("Mon YYYY" labels, values, entry count)."""
+    rows = aggregate(kind, user_id, start_date, end_date, 'month', sharer_id)
+    return ([label(month, 'month') for month, _, _ in rows],
+            [total for _, total, _ in rows],
+            sum(count for _, _, count in rows))
+
+
+def comparison(user_id, start_date, end_date, sharer_id=None):
+    """
+    Daily income and expense totals over the union of days with data.
+    Returns (labels, income values, expense values, expense count,
+    income count).
+    """
+    expense_rows = aggregate('expense', user_id, start_date, end_date, 'day',
+                             sharer_id)
+    income_rows = aggregate('income', user_id, start_date, end_date, 'day',
+                            sharer_id)
+    expense_by_day = {day: total for day, total, _ in expense_rows}
+    income_by_day = {day: total for day, total, _ in income_rows}
+
+    labels = sorted(set(expense_by_day) | set(income_by_day))
+    return (labels,
+            [income_by_day.get(day, 0) for day in labels],
+            [expense_by_day.get(day, 0) for day in labels],
+            sum(count for _, _, count in expense_rows),
+            sum(count for _, _, count in income_rows))
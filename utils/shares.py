@@ -0,0 +1,242 @@
+from collections import defaultdict
+
+from sqlalchemy import bindparam, delete, select, update
+
+from models.models import (db, Expense, Income, SharedExpense,
+                           SharedExpenseItem, SharedIncome, SharedIncomeItem,
+                           ShareVisibility)
+from utils.changes import bump_versions
+
+# kind -> (shared record model, share group model, share item model,
+#          item foreign key column)
+SHARE_KINDS = {
+    'expense': (Expense, SharedExpense, SharedExpenseItem, 'expense_id'),
+    'income': (Income, SharedIncome, SharedIncomeItem, 'income_id'),
+}
+
+
+def _owners(kind, item_ids):
+    record_model = SHARE_KINDS[kind][0]
+    return dict(
+        db.session.query(record_model.id, record_model.user_id).filter(
+            record_model.id.in_(item_ids)).all())
+
+
+def _grant_visibility(kind, recipient_id, item_ids):
+    owners = _owners(kind, item_ids)
+    existing = {
+        row.item_id: row
+        for row in ShareVisibility.query.filter(
+            ShareVisibility.recipient_id == recipient_id,
+            ShareVisibility.kind == kind,
+            ShareVisibility.item_id.in_(item_ids))
+    }
+    for item_id in item_ids:
+        row = existing.get(item_id)
+        if row is None:
+            row = ShareVisibility(recipient_id=recipient_id,
+                                  kind=kind,
+                                  item_id=item_id,
+                                  owner_id=owners[item_id],
+                                  share_count=0)
+            db.session.add(row)
+        row.share_count += 1
+
+
+def _revoke_visibility(kind, recipient_id, item_ids):
+    if not item_ids:
+        return
+    rows = ShareVisibility.query.filter(
+        ShareVisibility.recipient_id == recipient_id,
+        ShareVisibility.kind == kind,
+        ShareVisibility.item_id.in_(item_ids))
+    for row in rows:
+        row.share_count -= 1
+        if row.share_count <= 0:
+            db.session.delete(row)
+
+
+def create_share(kind, item_ids, shared_with_id, is_bulk_share=False,
+                 is_repeat=False):
+    """
+    Create a share group with one membership item per shared record.
+    The group keeps the lowest item id as its anchor record.
+    """
+    _, share_model, item_model, fk = SHARE_KINDS[kind]
+    item_ids = sorted(set(int(i) for i in item_ids))
+
+    share = share_model(shared_with_id=shared_with_id,
+                        is_bulk_share=is_bulk_share,
+                        is_repeat=is_repeat,
+                        **{fk: item_ids[0]})
+    share.items = [
+        item_model(shared_with_id=shared_with_id, **{fk: item_id})
+        for item_id in item_ids
+    ]
+    db.session.add(share)
+    _grant_visibility(kind, shared_with_id, item_ids)
+    # Both sides see the share in their lists and insights
+    bump_versions([shared_with_id, *_owners(kind, item_ids).values()])
+    return share
+
+
+def delete_share(kind, share):
+    """Cancel a share group and withdraw the access it granted."""
+    _revoke_visibility(kind, share.shared_with_id, share.item_ids)
+    bump_versions([share.shared_with_id,
+                   *_owners(kind, share.item_ids).values()])
+    db.session.delete(share)
+
+
+def _membership_query(kind, item_ids, shared_with_id, is_bulk_share):
+    _, share_model, item_model, fk = SHARE_KINDS[kind]
+    return db.session.query(getattr(item_model, fk)).join(
+        share_model, share_model.id == item_model.share_id).filter(
+            getattr(item_model, fk).in_(item_ids),
+            item_model.shared_with_id == shared_with_id,
+            share_model.is_bulk_share == is_bulk_share)
+
+
+def individually_shared_ids(kind, item_ids, shared_with_id):
+    """Return the subset of item_ids that have a single share with the user."""
+    rows = _membership_query(kind, item_ids, shared_with_id, False).all()
+    return {row[0] for row in rows}
+
+
+def bulk_shared_ids(kind, item_ids, shared_with_id):
+    """Return the subset of item_ids that are part of a bulk share with the user."""
+    rows = _membership_query(kind, item_ids, shared_with_id, True).all()
+    return {row[0] for row in rows}
+
+
+def find_bulk_share(kind, item_ids, shared_with_id):
+    """Find a bulk share with the user covering exactly the given items."""
+    _, share_model, item_model, fk = SHARE_KINDS[kind]
+    item_ids = sorted(set(int(i) for i in item_ids))
+
+    candidates = share_model.query.join(
+        item_model, item_model.share_id == share_model.id).filter(
+            getattr(item_model, fk) == item_ids[0],
+            item_model.shared_with_id == shared_with_id,
+            share_model.is_bulk_share == True).all()
+    for share in candidates:
+        if share.item_ids == item_ids:
+            return share
+    return None
+
+
+def detach_items(kind, item_ids):
+    """
+    Remove deleted records from every share that references them.
+    Bulk shares left with a single record become single shares (or are
+    dropped if that record is already shared individually), empty shares
+    are deleted and the rest are re-anchored on a remaining record.
+    Runs a fixed number of set-based statements however many records and
+    shares are involved; ORM objects already loaded for these shares are
+    not refreshed until the caller commits.
+    Must run before the records themselves are deleted.
+    """
+    _, share_model, item_model, fk = SHARE_KINDS[kind]
+    removed = set(int(i) for i in item_ids)
+    if not removed:
+        return
+    item_fk = getattr(item_model, fk)
+    unsynchronized = {'synchronize_session': False}
+
+    # Deleted records are no longer visible to anyone
+    db.session.execute(
+        delete(ShareVisibility).where(ShareVisibility.kind == kind,
+                                      ShareVisibility.item_id.in_(removed)),
+        execution_options=unsynchronized)
+
+    shares = db.session.execute(
+        select(share_model.id, share_model.shared_with_id,
+               share_model.is_bulk_share, getattr(share_model, fk)).where(
+                   share_model.id.in_(
+                       select(item_model.share_id).where(
+                           item_fk.in_(removed)))).order_by(
+                               share_model.id)).all()
+    if not shares:
+        return
+
+    # The owner's version moves with the deletion itself; recipients lose
+    # the records from their shared views
+    bump_versions(share.shared_with_id for share in shares)
+
+    db.session.execute(delete(item_model).where(item_fk.in_(removed)),
+                       execution_options=unsynchronized)
+    remaining = defaultdict(list)
+    for share_id, item_id in db.session.execute(
+            select(item_model.share_id, item_fk).where(
+                item_model.share_id.in_([share.id for share in shares])
+            ).order_by(item_fk)):
+        remaining[share_id].append(item_id)
+
+    # (record, recipient) pairs that still have a single share
+    bulk_items = {item_id for share in shares if share.is_bulk_share
+                  for item_id in remaining[share.id]}
+    singles = set()
+    if bulk_items:
+        singles = {tuple(row) for row in db.session.execute(
+            select(item_fk, item_model.shared_with_id).join(
+                share_model, share_model.id == item_model.share_id).where(
+                    item_fk.in_(bulk_items),
+                    share_model.is_bulk_share == False))}
+
+    dropped, revoked, anchors = [], [], []
+    flags = {'single': [], 'repeat': [], 'not_repeat': []}
+    for share in shares:
+        items = remaining[share.id]
+        if not items:
+            dropped.append(share.id)
+            continue
+        if share.is_bulk_share and len(items) == 1:
+            if (items[0], share.shared_with_id) in singles:
+                # Already shared on its own: the leftover share is redundant
+                dropped.append(share.id)
+                revoked.append({'recipient': share.shared_with_id,
+                                'item': items[0]})
+                continue
+            flags['single'].append(share.id)
+            singles.add((items[0], share.shared_with_id))
+        elif share.is_bulk_share:
+            repeat = any((item_id, share.shared_with_id) in singles
+                         for item_id in items)
+            flags['repeat' if repeat else 'not_repeat'].append(share.id)
+        if getattr(share, fk) in removed:
+            anchors.append({'id': share.id, fk: items[0]})
+
+    if revoked:
+        visibility = ShareVisibility.__table__
+        db.session.execute(
+            update(visibility).where(
+                visibility.c.recipient_id == bindparam('recipient'),
+                visibility.c.kind == kind,
+                visibility.c.item_id == bindparam('item')).values(
+                    share_count=visibility.c.share_count - 1), revoked)
+        db.session.execute(
+            delete(visibility).where(
+                visibility.c.recipient_id.in_(
+                    {row['recipient'] for row in revoked}),
+                visibility.c.kind == kind,
+                visibility.c.item_id.in_({row['item'] for row in revoked}),
+                visibility.c.share_count <= 0))
+    if dropped:
+        db.session.execute(
+            delete(item_model).where(item_model.share_id.in_(dropped)),
+            execution_options=unsynchronized)
+        db.session.execute(
+            delete(share_model).where(share_model.id.in_(dropped)),
+            execution_options=unsynchronized)
+    if anchors:
+        # Bulk UPDATE by primary key: one executemany for every share
+        db.session.execute(update(share_model), anchors)
+    for name, values in (('single', {'is_bulk_share': False,
+                                     'is_repeat': False}),
+                         ('repeat', {'is_repeat': True}),
+                         ('not_repeat', {'is_repeat': False})):
+        if flags[name]:
+            db.session.execute(
+                update(share_model).where(
+                    share_model.id.in_(flags[name])).values(**values),
+                execution_options=unsynchronized)